@@ -82,25 +82,15 @@ echo Building nodes with zdbsp (UDMF)...
 if errorlevel 1 exit /b 1
 
 echo Building defs PK3 (DECORATE/MAPINFO)...
-set "DEFS_STAGE=build\_defs_pk3"
 set "DEFS_PK3=build\hostel_defs.pk3"
+set "ACS_OUT=build\_defs_pk3\acs\h9_intro.o"
 
-if exist "%DEFS_STAGE%" rmdir /S /Q "%DEFS_STAGE%"
-mkdir "%DEFS_STAGE%"
-mkdir "%DEFS_STAGE%\decorate"
-mkdir "%DEFS_STAGE%\mapinfo"
-mkdir "%DEFS_STAGE%\acs"
-
-copy /Y "src\decorate\decorate.txt" "%DEFS_STAGE%\decorate.txt" >nul
-copy /Y "src\decorate\player.txt" "%DEFS_STAGE%\decorate\player.txt" >nul
-copy /Y "src\mapinfo.txt" "%DEFS_STAGE%\mapinfo.txt" >nul
-copy /Y "src\mapinfo\mapinfo.txt" "%DEFS_STAGE%\mapinfo\mapinfo.txt" >nul
-copy /Y "src\acs\h9_intro.acs" "%DEFS_STAGE%\acs\h9_intro.acs" >nul
+if not exist "build\_defs_pk3\acs" mkdir "build\_defs_pk3\acs"
 
 echo Compiling ACS (intro text)...
 if exist "%ACC%" (
   echo Using ACC: "%ACC%"
-  "%ACC%" -i "%ACS_INC%" "src\acs\h9_intro.acs" "%DEFS_STAGE%\acs\h9_intro.o"
+  "%ACC%" -i "%ACS_INC%" "src\acs\h9_intro.acs" "%ACS_OUT%"
   if errorlevel 1 (
     echo Error: ACS compile failed
     exit /b 1
@@ -109,20 +99,12 @@ if exist "%ACC%" (
   echo Warning: acc.exe not found.
   echo - Checked relative to ZDBSP: %UDB_COMPILERS_DIR%\ACS\acc.exe
   echo - Checked PATH via: where acc.exe
-  echo Skipping ACS compilation; intro text will not appear.
-)
-
-REM If the previous PK3 is still locked (e.g., UZDoom still closing), wait briefly.
-if exist "%DEFS_PK3%" (
-  for /L %%R in (1,1,10) do (
-    del /F /Q "%DEFS_PK3%" >nul 2>nul
-    if not exist "%DEFS_PK3%" goto :DEFS_UNLOCKED
-    timeout /T 1 /NOBREAK >nul
-  )
+  echo Skipping ACS compilation; the last compiled intro script is packed if present.
 )
-:DEFS_UNLOCKED
 
-powershell -NoProfile -ExecutionPolicy Bypass -Command "Compress-Archive -Path '%DEFS_STAGE%\*' -DestinationPath '%DEFS_PK3%' -Force" >nul
+REM pk3_writer.py zips the sources directly (fixed order and timestamps) and
+REM replaces the PK3 atomically, retrying while UZDoom still holds the old one.
+%PY% tools\pk3_writer.py
 if errorlevel 1 (
   echo Error: failed to create %DEFS_PK3%
   exit /b 1
@@ -1,23 +1,24 @@
 import sys
 import os
 
-# Add omgifol to path
+# Add tools/ to path (lazy mmap WAD reader; no omgifol load needed)
 current_dir = os.path.dirname(os.path.abspath(__file__))
-omgifol_path = os.path.abspath(os.path.join(current_dir, "tools/omgifol"))
-if omgifol_path not in sys.path:
-    sys.path.append(omgifol_path)
+tools_path = os.path.abspath(os.path.join(current_dir, "tools"))
+if tools_path not in sys.path:
+    sys.path.append(tools_path)
 
-from omg import *
+from wad_reader import WadReader
 
 def check_wad(wad_path):
     print(f"Checking WAD: {wad_path}")
     try:
-        wad = WAD(wad_path)
+        with WadReader(wad_path) as wad:
+            ztextures = wad.namespace("TX")
         print("ZTextures:")
-        for name in wad.ztextures:
+        for name in ztextures:
             print(f"  {name}")
         
-        if "PLUTOSGN" in wad.ztextures:
+        if "PLUTOSGN" in ztextures:
             print("SUCCESS: PLUTOSGN found in ztextures.")
         else:
             print("FAILURE: PLUTOSGN NOT found in ztextures.")
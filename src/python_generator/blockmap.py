@@ -0,0 +1,87 @@
+"""Doom-format BLOCKMAP for the UDMF map, written next to ZNODES by `WadBuilder.save()`.
+
+The map is cut into 128x128 blocks starting 8 units below/left of the
+lowest vertex; each block lists the linedefs crossing it (`0, line..., -1`).
+Identical lists (most commonly the empty one) are stored once.
+
+Offsets in the lump are 16-bit word offsets, so a blockmap that grows past
+65535 words cannot be expressed; `build_blockmap()` then returns None and
+the engine builds its own at load time, exactly as it does when the lump is
+missing.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Optional
+
+
+BLOCK_SIZE = 128
+BLOCK_MARGIN = 8
+MAX_WORDS = 0xFFFF
+
+
+def _line_blocks(x1: float, y1: float, x2: float, y2: float, ox: int, oy: int) -> list[tuple[int, int]]:
+    """(column, row) of every block the segment touches (block edges included)."""
+    c1 = int((min(x1, x2) - ox) // BLOCK_SIZE)
+    c2 = int((max(x1, x2) - ox) // BLOCK_SIZE)
+    r1 = int((min(y1, y2) - oy) // BLOCK_SIZE)
+    r2 = int((max(y1, y2) - oy) // BLOCK_SIZE)
+    if x1 == x2 or y1 == y2:
+        return [(c, r) for r in range(r1, r2 + 1) for c in range(c1, c2 + 1)]
+    dx = x2 - x1
+    dy = y2 - y1
+    out = []
+    for r in range(r1, r2 + 1):
+        by0 = oy + r * BLOCK_SIZE
+        by1 = by0 + BLOCK_SIZE
+        for c in range(c1, c2 + 1):
+            bx0 = ox + c * BLOCK_SIZE
+            bx1 = bx0 + BLOCK_SIZE
+            # The line crosses the box unless all four corners are strictly on one side.
+            sides = [dx * (cy - y1) - dy * (cx - x1) for cx, cy in ((bx0, by0), (bx1, by0), (bx0, by1), (bx1, by1))]
+            if min(sides) <= 0 <= max(sides):
+                out.append((c, r))
+    return out
+
+
+def build_blockmap(umap) -> Optional[bytes]:
+    """BLOCKMAP lump data for `umap` (a `UMapEditor`), or None if it would overflow."""
+    vertexes = umap.vertexes
+    linedefs = umap.linedefs
+    if not vertexes or len(linedefs) >= 0xFFFF:
+        return None
+    xs = [float(v.x) for v in vertexes]
+    ys = [float(v.y) for v in vertexes]
+    ox = int(min(xs)) - BLOCK_MARGIN
+    oy = int(min(ys)) - BLOCK_MARGIN
+    cols = int((max(xs) - ox) // BLOCK_SIZE) + 1
+    rows = int((max(ys) - oy) // BLOCK_SIZE) + 1
+    if ox < -32768 or oy < -32768 or cols > 0xFFFF or rows > 0xFFFF:
+        return None
+
+    blocks: list[list[int]] = [[] for _ in range(cols * rows)]
+    for j, ld in enumerate(linedefs):
+        a = int(ld.v1)
+        b = int(ld.v2)
+        for c, r in _line_blocks(xs[a], ys[a], xs[b], ys[b], ox, oy):
+            blocks[r * cols + c].append(j)
+
+    header_words = 4 + cols * rows
+    offsets: list[int] = []
+    lists: dict[tuple[int, ...], int] = {}
+    body: list[int] = []
+    for block in blocks:
+        key = tuple(block)
+        off = lists.get(key)
+        if off is None:
+            off = header_words + len(body)
+            lists[key] = off
+            body.append(0)
+            body.extend(key)
+            body.append(0xFFFF)
+        offsets.append(off)
+        if header_words + len(body) > MAX_WORDS:
+            return None
+
+    return struct.pack(f'<hhHH{len(offsets)}H{len(body)}H', ox, oy, cols, rows, *offsets, *body)
@@ -1,16 +1,23 @@
-import sys
 import os
 import random
+from copy import copy
 
-# Add omgifol to path
-current_dir = os.path.dirname(os.path.abspath(__file__))
-omgifol_path = os.path.abspath(os.path.join(current_dir, "../../tools/omgifol"))
-if omgifol_path not in sys.path:
-    sys.path.append(omgifol_path)
-
-from omg import *
-from omg.mapedit import MapEditor, Vertex, Linedef, Sidedef, Sector, Thing
+import omg_bootstrap  # noqa: F401  (puts omgifol on sys.path; see omg_bootstrap.py)
+from omg.lump import Flat, Graphic
+from omg.mapedit import MapEditor, Vertex, Linedef, Sidedef, Sector
 from omg.udmf import UMapEditor
+from omg.wad import WAD
+
+from thing_buffer import ThingBuffer
+from provenance import ProvenanceTable, SectorHandle
+from floors3d import Floor3DManager, FloorPlatform
+
+# The write-stage modules (lint, SQLite export, simplify, reorder, TEXTMAP
+# writer, nodes, BLOCKMAP, REJECT) are imported inside `write_udmf()`: they
+# pull in numpy, sqlite3 and multiprocessing, which short runs never need.
+
+# Size of a 3D-floor control sector (see Floor3DManager).
+FLOOR3D_CELL = Floor3DManager.CELL
 
 class WadBuilder:
     def __init__(self):
@@ -18,6 +25,11 @@ class WadBuilder:
         # Create a new map (MAP01)
         self.editor = MapEditor()
 
+        # Things live in a columnar buffer (not `editor.things`) and are emitted
+        # straight into UDMF by `save()`. Each thing records the provenance
+        # owner active when it was added.
+        self.things = ThingBuffer(owner_of=lambda: self.provenance.current())
+
         # Record imported image sizes so we can apply UDMF sidedef texture scaling
         # (e.g. to fit large PNG/JPEG signs onto short wall spans).
         # Map: texture name -> (width_px, height_px)
@@ -37,9 +49,8 @@ class WadBuilder:
         #   planeanchor: alignment mode
         self._udmf_line_portal_specs: list[dict] = []
 
-        # Teleport destination postprocess: in classic Doom format, things don't
-        # have TIDs. We record the teleport destination coordinates during build
-        # and assign the UDMF thing `id` after conversion.
+        # Teleport destinations registered by coordinates (for callers that add
+        # the thing without a TID). Resolved against `self.things` in `save()`.
         self._udmf_teleport_dest_specs: list[dict] = []
 
         # Extra sector tags that should also receive the in-building 3D floor.
@@ -59,6 +70,24 @@ class WadBuilder:
         # Unique ids for UDMF postprocess control linedefs.
         self._next_control_line_id: int = 10000
 
+        # Deduped 3D-floor platforms; control sectors are drawn in `save()`.
+        self.floors3d = Floor3DManager()
+        # Platforms whose control sectors are already in the editor (drawn by
+        # the first `to_udmf()`; later conversions reuse them).
+        self._drawn_3d_floor_controls: int | None = None
+
+        # Which Room/Connector emitted each sector/line/side (see `owned_by`).
+        self.provenance = ProvenanceTable()
+
+        # Segment -> first linedef drawn on it (endpoints unordered), so
+        # `draw_sector` merges shared edges without scanning every linedef.
+        self._segment_lines: dict[tuple[tuple[int, int], tuple[int, int]], int] = {}
+        self._segments_indexed: int = 0
+
+    def owned_by(self, obj):
+        """Context manager attributing geometry drawn inside it to `obj`."""
+        return self.provenance.track(obj, self.editor)
+
     def alloc_sector_tag(self) -> int:
         tag = int(self._next_sector_tag)
         self._next_sector_tag += 1
@@ -107,59 +136,90 @@ class WadBuilder:
     def add_3d_floor_platform(self, *, target_sector_tag: int, z: int, thickness: int = 16,
                               floor_tex: str = "FLOOR4_8", ceil_tex: str = "CEIL3_5", wall_tex: str = "STARTAN3",
                               alpha: int = 255, flags: int = 0):
-        """Create a simple solid 3D-floor platform (ZDoom UDMF) inside target sectors.
+        """Request a simple solid 3D-floor platform (ZDoom UDMF) inside target sectors.
 
-        This draws an off-map control sector and marks one control linedef with a
-        unique id. During `save()`, that linedef is converted to Sector_Set3dFloor
-        to apply the 3D floor to all sectors tagged with `target_sector_tag`.
+        Requests go through `self.floors3d`: identical platforms share one
+        off-map control sector (drawn in a packed grid during `save()`), whose
+        control linedef becomes Sector_Set3dFloor for every requested tag.
+        Returns the control line id (shared by identical platforms).
         """
+        platform = FloorPlatform(
+            z=int(z),
+            thickness=int(thickness),
+            floor_tex=str(floor_tex),
+            ceil_tex=str(ceil_tex),
+            wall_tex=str(wall_tex),
+            type=1,
+            flags=int(flags),
+            alpha=int(alpha),
+        )
+        return self.floors3d.add(platform, int(target_sector_tag), self._alloc_control_line_id)
+
+    def _alloc_control_line_id(self) -> int:
         control_line_id = self._next_control_line_id
         self._next_control_line_id += 1
+        return control_line_id
 
-        # Off-map control sector location.
-        cx = 20000 + (control_line_id - 10000) * 128
-        cy = 20000
-        w = 64
-        h = 64
-
-        sector_index = len(self.editor.sectors)
-        self.draw_rectangle(
-            cx,
-            cy,
-            w,
-            h,
-            floor_tex=floor_tex,
-            ceil_tex=ceil_tex,
-            wall_tex=wall_tex,
-            floor_height=int(z),
-            ceil_height=int(z + thickness),
-            light=160,
-        )
+    def _editor_bounds(self) -> tuple[int, int, int, int] | None:
+        vertexes = self.editor.vertexes
+        if not vertexes:
+            return None
+        xs = [v.x for v in vertexes]
+        ys = [v.y for v in vertexes]
+        return min(xs), min(ys), max(xs), max(ys)
 
-        # Tag exactly one linedef of the control sector so we can find it after UDMF conversion.
-        tagged = False
-        for ld in self.editor.linedefs:
-            if tagged:
-                break
-            if ld.back == 0xFFFF:
-                front_sector = self.editor.sidedefs[ld.front].sector
-                if front_sector == sector_index:
-                    ld.tag = int(control_line_id)
+    def _draw_3d_floor_controls(self) -> None:
+        """Draw the packed control sectors for all requested 3D-floor platforms.
+
+        Runs once per builder: the sectors stay in the editor, so a second
+        `to_udmf()` / `save()` converts the same map instead of drawing them
+        again.
+        """
+        if self._drawn_3d_floor_controls is not None:
+            if len(self.floors3d) != self._drawn_3d_floor_controls:
+                raise RuntimeError("3D-floor platforms were requested after the map was converted")
+            return
+        self._drawn_3d_floor_controls = len(self.floors3d)
+        slots = self.floors3d.layout(self._editor_bounds(), self.alloc_sector_tag)
+        for slot in slots:
+            p = slot.platform
+            with self.owned_by("3DFloorControl"):
+                handle = self.draw_rectangle(
+                    slot.x,
+                    slot.y,
+                    FLOOR3D_CELL,
+                    FLOOR3D_CELL,
+                    floor_tex=p.floor_tex,
+                    ceil_tex=p.ceil_tex,
+                    wall_tex=p.wall_tex,
+                    floor_height=p.z,
+                    ceil_height=p.z + p.thickness,
+                    light=160,
+                )
+
+            # Tag exactly one linedef of the control sector so we can find it after UDMF conversion.
+            tagged = False
+            for j in handle.new_lines:
+                ld = self.editor.linedefs[j]
+                if ld.back == 0xFFFF:
+                    ld.tag = int(slot.control_line_id)
                     tagged = True
+                    break
 
-        if not tagged:
-            raise RuntimeError("Failed to tag 3D-floor control linedef")
+            if not tagged:
+                raise RuntimeError("Failed to tag 3D-floor control linedef")
 
-        self.register_udmf_3d_floor(
-            control_line_id=control_line_id,
-            target_sector_tag=int(target_sector_tag),
-            type=1,
-            flags=int(flags),
-            alpha=int(alpha),
-        )
+            self.register_udmf_3d_floor(
+                control_line_id=slot.control_line_id,
+                target_sector_tag=slot.target_tag,
+                type=p.type,
+                flags=p.flags,
+                alpha=p.alpha,
+            )
+
+        if slots:
+            print(f"3D floors: {self.floors3d.requests} platform request(s) -> {len(slots)} control sector(s)")
 
-        return control_line_id
-        
     def draw_rectangle(self, x, y, width, height, floor_tex="FLOOR4_8", ceil_tex="CEIL3_5", wall_tex="STARTAN3", floor_height=0, ceil_height=128, light=160):
         """
         Draws a rectangular sector.
@@ -183,12 +243,13 @@ class WadBuilder:
             (x, y + height)     # Top-Left
         ]
         
-        self.editor.draw_sector(points, sector, sidedef)
+        return self.draw_sector(points, sector, sidedef)
 
     def draw_polygon(self, points, floor_tex="FLOOR4_8", ceil_tex="CEIL3_5", wall_tex="STARTAN3", floor_height=0, ceil_height=128, light=160, tag=0, special=0):
         """
         Draws a polygonal sector from a list of (x, y) tuples.
         Points should be in Counter-Clockwise order.
+        Returns a `SectorHandle` (sector index, per-edge sidedefs/linedefs).
         """
         sector = Sector()
         sector.tx_floor = floor_tex
@@ -204,16 +265,88 @@ class WadBuilder:
         sidedef = Sidedef()
         sidedef.tx_mid = wall_tex
         
-        self.editor.draw_sector(points, sector, sidedef)
-        
+        return self.draw_sector(points, sector, sidedef)
+
+    def draw_sector(self, points, sector, sidedef) -> SectorHandle:
+        """`MapEditor.draw_sector` with an indexed edge merge.
+
+        Same result as omgifol's version (an edge exactly matching an existing
+        segment, in either direction, becomes that line's back side and the
+        mid textures move to upper/lower), but the match is a dict lookup
+        instead of a scan over all linedefs. The handle is recorded in
+        `self.provenance` under the current owner.
+        """
+        editor = self.editor
+        n = len(points)
+        assert n > 2
+        firstv = len(editor.vertexes)
+        firsts = len(editor.sidedefs)
+        editor.sectors.append(copy(sector))
+        sector_index = len(editor.sectors) - 1
+        for p in points:
+            if isinstance(p, tuple):
+                editor.vertexes.append(Vertex(p[0], p[1]))
+            else:
+                editor.vertexes.append(Vertex(p.x, p.y))
+
+        # Pick up linedefs appended to the editor directly since the last draw.
+        self._index_segments()
+
+        vertexes = editor.vertexes
+        segments = self._segment_lines
+        lines: list[int] = []
+        new_lines: list[int] = []
+        for i in range(n):
+            side = copy(sidedef)
+            side.sector = sector_index
+            editor.sidedefs.append(side)
+            side_index = len(editor.sidedefs) - 1
+
+            va = firstv + ((i + 1) % n)
+            vb = firstv + i
+            key = self._segment_key(vertexes[va], vertexes[vb])
+            j = segments.get(key)
+            if j is not None:
+                lc = editor.linedefs[j]
+                front = editor.sidedefs[lc.front]
+                side.tx_low = front.tx_mid
+                side.tx_up = front.tx_mid
+                front.tx_low = side.tx_mid
+                front.tx_up = side.tx_mid
+                side.tx_mid = "-"
+                front.tx_mid = "-"
+                lc.back = side_index
+                lc.two_sided = True
+                lc.impassable = False
+            else:
+                editor.linedefs.append(Linedef(vx_a=va, vx_b=vb, front=side_index, flags=1))
+                j = len(editor.linedefs) - 1
+                segments[key] = j
+                self._segments_indexed = j + 1
+                new_lines.append(j)
+            lines.append(j)
+
+        handle = SectorHandle(sector_index, range(firsts, firsts + n), tuple(lines), tuple(new_lines))
+        self.provenance.add_handle(handle)
+        return handle
+
+    @staticmethod
+    def _segment_key(a, b) -> tuple[tuple[int, int], tuple[int, int]]:
+        pa = (a.x, a.y)
+        pb = (b.x, b.y)
+        return (pa, pb) if pa <= pb else (pb, pa)
+
+    def _index_segments(self) -> None:
+        editor = self.editor
+        vertexes = editor.vertexes
+        segments = self._segment_lines
+        for j in range(self._segments_indexed, len(editor.linedefs)):
+            ld = editor.linedefs[j]
+            segments.setdefault(self._segment_key(vertexes[ld.vx_a], vertexes[ld.vx_b]), j)
+        self._segments_indexed = len(editor.linedefs)
+
     def add_player_start(self, x, y, angle=0):
-        thing = Thing()
-        thing.x = int(x)
-        thing.y = int(y)
-        thing.angle = angle
-        thing.type = 1 # Player 1 Start
-        thing.flags = 7 # Easy, Medium, Hard
-        self.editor.things.append(thing)
+        self.things.add(1, x, y, angle)  # Player 1 Start
 
     def import_texture(self, name, file_path):
         """
@@ -317,11 +450,43 @@ class WadBuilder:
 
         return None
 
-    def save(self, filename):
+    def save(self, filename, *, lint: str | None = None, sqlite_path: str | None = None,
+             simplify: bool | None = None, reorder: bool | None = None,
+             nodes: str | None = None, reject: bool | None = None):
+        """Convert to UDMF, post-process and write `filename`.
+
+        `lint` ('off' / 'warn' / 'strict', default from `H9_LINT`) runs the
+        map_lint rules over the finished UDMF model before it is written.
+        `sqlite_path` (default from `H9_EXPORT_SQLITE`) also exports the model
+        to an indexed SQLite database (see sqlite_export.py). `simplify`
+        (default from `H9_SIMPLIFY`) merges redundant sectors and collinear
+        lines before lint/export (see map_simplify.py). `reorder` (default
+        from `H9_MORTON`) then sorts the elements along a Z-order curve (see
+        map_reorder.py). `nodes` ('off' / 'xgln' / 'zgln', default from
+        `H9_NODES`) builds GL ZNODES and BLOCKMAP in-process (see nodebuilder.py)
+        so the WAD is playable without running zdbsp. `reject` (default from
+        `H9_REJECT`) adds a conservative REJECT table (see reject.py).
+        """
+        umap = self.to_udmf()
+        self.write_udmf(umap, filename, lint=lint, sqlite_path=sqlite_path, simplify=simplify,
+                        reorder=reorder, nodes=nodes, reject=reject)
+
+    def to_udmf(self) -> UMapEditor:
+        """Convert the drawn map to a post-processed UDMF model (the first half of `save()`)."""
         # Ensure our outdoor lawn flat exists even if the user's IWAD doesn't ship with it.
         # This prevents missing-flat fallbacks and makes the lawn deterministic.
         self._ensure_procedural_flat(name="PYGRASS", seed=0x6C61776E)  # "lawn"
 
+        # Draw the (deduped, packed) 3D-floor control sectors now that the map
+        # bounds are known.
+        self._draw_3d_floor_controls()
+
+        # Fold in any things added directly to the classic editor (legacy callers).
+        if self.editor.things:
+            for th in self.editor.things:
+                self.things.add(th.type, th.x, th.y, th.angle, th.flags)
+            self.editor.things = []
+
         # Build classic map lumps first (we rely on MapEditor.draw_sector convenience)
         classic_lumps = self.editor.to_lumps()
 
@@ -425,31 +590,29 @@ class WadBuilder:
                 ld.playeruse = True
                 ld.repeatspecial = False
 
-        # UDMF game-mode flags: ensure Things appear in single-player.
-        # When converting Doom-format THINGS to UDMF, omgifol preserves skill flags
-        # but may leave `single/coop/dm` unset. Some ports treat unset as false.
-        for th in umap.things:
-            # Force these on for all Things.
-            # When converting a classic Doom THING into ZDoom UDMF, omgifol maps
-            # bits that don't exist in the classic flags word to False, which
-            # effectively disables spawning in these game modes.
-            th.single = True
-            th.coop = True
-            th.dm = True
-
-        # Assign TIDs to teleport destination things (TeleportDest, DoomEdNum 14).
-        # Match by exact coordinates (the generator uses integer coordinates).
+        # Things: emit the buffer directly (game-mode flags and TIDs are set at
+        # emission). Anything appended to `editor.things` the classic way was
+        # folded into the buffer before conversion.
         for spec in self._udmf_teleport_dest_specs:
-            target_x = float(spec['x'])
-            target_y = float(spec['y'])
-            matched = False
-            for th in umap.things:
-                if getattr(th, 'type', 0) == 14 and getattr(th, 'x', None) == target_x and getattr(th, 'y', None) == target_y:
-                    th.id = int(spec['tid'])
-                    matched = True
-                    break
-            if not matched:
+            idx = self.things.find(14, spec['x'], spec['y'])
+            if idx < 0:
                 raise RuntimeError(f"UDMF postprocess failed: could not find TeleportDest at ({spec['x']}, {spec['y']})")
+            self.things.set_tid(idx, spec['tid'])
+        umap.things = self.things.to_udmf(umap.namespace)
+        self.provenance.set_thing_owners(self.things.owner)
+
+        # Platforms shared by several sector tags target one group tag; add it
+        # to every member sector's `moreids` so a single control line covers them.
+        group_of: dict[int, list[int]] = {}
+        for group_tag, members in self.floors3d.group_tags().items():
+            for tag in members:
+                group_of.setdefault(int(tag), []).append(int(group_tag))
+        if group_of:
+            for sec in umap.sectors:
+                groups = group_of.get(int(sec.id or 0))
+                if groups:
+                    extra = [str(g) for g in groups]
+                    sec.moreids = " ".join(([str(sec.moreids)] if sec.moreids else []) + extra)
 
         # Apply any requested 3D-floor control linedefs.
         # Our control lines are created in classic format with a unique linedef tag.
@@ -499,10 +662,80 @@ class WadBuilder:
             if getattr(sec, 'textureceiling', None) == 'F_SKY1' and getattr(sec, 'texturefloor', None) == 'F_SKY1':
                 sec.texturefloor = 'PYGRASS'
 
-        self.wad.udmfmaps["MAP01"] = umap.to_lumps()
+        return umap
+
+    def write_udmf(self, umap: UMapEditor, filename, *, lint: str | None = None, sqlite_path: str | None = None,
+                   simplify: bool | None = None, reorder: bool | None = None,
+                   nodes: str | None = None, reject: bool | None = None):
+        """Optimize, check and write `umap` (the second half of `save()`; same options).
+
+        Mutates `umap` and `self.provenance`; watch mode passes copies so it
+        can re-run only this half when just the writer-side modules change.
+        """
+        from blockmap import build_blockmap
+        from map_lint import lint_mode_from_env, lint_umap, report_lint
+        from map_reorder import morton_from_env, morton_reorder
+        from map_simplify import simplify_from_env, simplify_umap
+        from nodebuilder import NODE_FORMATS, build_nodes, node_workers_from_env, nodes_format_from_env
+        from reject import build_reject, reject_from_env
+        from sqlite_export import export_sqlite, sqlite_path_from_env
+        from textmap_writer import compact_textmap_from_env, textmap_lumps
+
+        lint_mode = lint_mode_from_env() if lint is None else str(lint).lower()
+        if lint_mode not in ('off', 'warn', 'strict'):
+            raise ValueError(f"lint must be 'off', 'warn' or 'strict' (got {lint!r})")
+        nodes_format = nodes_format_from_env() if nodes is None else str(nodes).lower()
+        if nodes_format not in NODE_FORMATS:
+            raise ValueError(f"nodes must be one of {', '.join(NODE_FORMATS)} (got {nodes!r})")
+
+        if simplify is None:
+            simplify = simplify_from_env()
+        if simplify:
+            result = simplify_umap(umap)
+            self.provenance.remap(result.sector_map, result.line_map, result.side_map)
+            print(f"Simplified map: {result.summary()}")
+
+        if reorder is None:
+            reorder = morton_from_env()
+        if reorder:
+            order = morton_reorder(umap)
+            self.provenance.remap(order.sector_map, order.line_map, order.side_map, order.thing_map)
+
+        # Lint the finished model in-process (one shared index, one pass)
+        # instead of re-reading the written WAD with the tools/ scripts.
+        if lint_mode != 'off':
+            report_lint(lint_umap(umap), mode=lint_mode)
+
+        extra: dict[str, bytes] = {}
+        if nodes_format != 'off':
+            node_set = build_nodes(umap, workers=node_workers_from_env())
+            extra['ZNODES'] = node_set.to_znodes(compress=(nodes_format == 'zgln'))
+            print(f"Built {nodes_format.upper()} nodes: {node_set.summary()}")
+            blockmap = build_blockmap(umap)
+            if blockmap is not None:
+                extra['BLOCKMAP'] = blockmap
+            else:
+                print("BLOCKMAP would overflow 16-bit offsets; leaving it to the engine.")
+        if reject is None:
+            reject = reject_from_env()
+        if reject:
+            result = build_reject(umap)
+            extra['REJECT'] = result.data
+            print(result.summary())
+
+        lumps, stats = textmap_lumps(umap, compact=compact_textmap_from_env(), extra=extra)
+        if stats is not None:
+            print(stats.summary())
+        self.wad.udmfmaps["MAP01"] = lumps
 
         self.wad.to_file(filename)
 
+        if sqlite_path is None:
+            sqlite_path = sqlite_path_from_env()
+        if sqlite_path:
+            export_sqlite(umap, sqlite_path, provenance=self.provenance, meta={'wad': os.path.abspath(filename), 'map': 'MAP01'})
+            print(f"Exported SQLite map database to {sqlite_path}")
+
     def _ensure_procedural_flat(self, *, name: str, seed: int = 0):
         """Add a simple generated 64x64 flat if it doesn't already exist in the WAD.
 
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+# Doom-format vertex coordinates are signed 16-bit.
+COORD_MIN = -32768
+COORD_MAX = 32767
+
+
+@dataclass(frozen=True)
+class FloorPlatform:
+    """One solid 3D-floor slab; identical slabs share a control sector."""
+
+    z: int
+    thickness: int
+    floor_tex: str
+    ceil_tex: str
+    wall_tex: str
+    type: int = 1
+    flags: int = 0
+    alpha: int = 255
+
+
+@dataclass(frozen=True)
+class ControlSlot:
+    """Where a platform's control sector goes and which tag it targets."""
+
+    platform: FloorPlatform
+    control_line_id: int
+    target_tag: int
+    x: int
+    y: int
+
+
+class Floor3DManager:
+    """Dedupes 3D-floor platforms and packs their control sectors.
+
+    `add()` only records (platform, target tag). `layout()` runs once from
+    `WadBuilder.save()` and:
+
+    - emits one control sector per distinct platform (not per target tag);
+    - gives a platform with several target tags a single group tag (added to
+      those sectors' UDMF `moreids`), so one Sector_Set3dFloor line covers all;
+    - places the control sectors in a compact grid just outside the map's
+      bounding box, instead of marching one 128-unit step per call.
+    """
+
+    # Control sector size and grid pitch (map units).
+    CELL = 64
+    PITCH = 128
+    # Gap between the map bounds and the control grid.
+    MARGIN = 512
+
+    __slots__ = ('_targets', '_line_ids', '_group_tags', 'requests')
+
+    def __init__(self) -> None:
+        # Platform -> target sector tags, in first-seen order.
+        self._targets: dict[FloorPlatform, list[int]] = {}
+        self._line_ids: dict[FloorPlatform, int] = {}
+        # Sorted member tags -> group tag (shared by platforms with equal targets).
+        self._group_tags: dict[tuple[int, ...], int] = {}
+        # Raw add() calls, for reporting the consolidation.
+        self.requests = 0
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def add(self, platform: FloorPlatform, target_tag: int, alloc_line_id: Callable[[], int]) -> int:
+        """Apply `platform` to sectors tagged `target_tag`; returns its control line id."""
+        self.requests += 1
+        targets = self._targets.get(platform)
+        if targets is None:
+            targets = self._targets[platform] = []
+            self._line_ids[platform] = int(alloc_line_id())
+        if int(target_tag) not in targets:
+            targets.append(int(target_tag))
+        return self._line_ids[platform]
+
+    def targets(self) -> dict[FloorPlatform, tuple[int, ...]]:
+        """Platform -> requested target sector tags (before group tags)."""
+        return {p: tuple(tags) for p, tags in self._targets.items()}
+
+    def group_tags(self) -> dict[int, tuple[int, ...]]:
+        """Group tag -> member sector tags (valid after `layout()`)."""
+        return {g: members for members, g in self._group_tags.items()}
+
+    def layout(
+        self,
+        bounds: Optional[tuple[int, int, int, int]],
+        alloc_tag: Callable[[], int],
+    ) -> list[ControlSlot]:
+        """Assign target tags and grid positions; `bounds` is (min_x, min_y, max_x, max_y)."""
+        n = len(self._targets)
+        if n == 0:
+            return []
+
+        cols = max(1, int(math.ceil(math.sqrt(n))))
+        rows = int(math.ceil(n / cols))
+        span_x = (cols - 1) * self.PITCH + self.CELL
+        span_y = (rows - 1) * self.PITCH + self.CELL
+
+        min_x, min_y, max_x, max_y = bounds if bounds is not None else (0, 0, 0, 0)
+        # Prefer the right of the map; fall back to the left if that overflows.
+        x0 = _align_up(max_x + self.MARGIN, self.CELL)
+        if x0 + span_x > COORD_MAX:
+            x0 = _align_down(min_x - self.MARGIN - span_x, self.CELL)
+        if x0 < COORD_MIN or x0 + span_x > COORD_MAX:
+            raise RuntimeError("No room for 3D-floor control sectors inside the 16-bit coordinate range")
+        y0 = _align_down(max(COORD_MIN, min(min_y, COORD_MAX - span_y)), self.CELL)
+
+        slots: list[ControlSlot] = []
+        for k, (platform, targets) in enumerate(self._targets.items()):
+            if len(targets) == 1:
+                target_tag = targets[0]
+            else:
+                key = tuple(sorted(targets))
+                target_tag = self._group_tags.get(key, 0)
+                if not target_tag:
+                    target_tag = self._group_tags[key] = int(alloc_tag())
+            x = x0 + (k % cols) * self.PITCH
+            y = y0 + (k // cols) * self.PITCH
+            slots.append(ControlSlot(platform, self._line_ids[platform], target_tag, x, y))
+        return slots
+
+
+def _align_up(v: int, step: int) -> int:
+    return -((-int(v)) // step) * step
+
+
+def _align_down(v: int, step: int) -> int:
+    return (int(v) // step) * step
@@ -4,25 +4,24 @@ from __future__ import annotations
 # pyright: reportUnknownVariableType=false
 
 import random
-import os
-import sys
 from dataclasses import dataclass
-from typing import Any, Iterable, Optional, cast
+from typing import Iterable, Optional, cast
+
+try:
+    import numpy as np  # type: ignore
+except ModuleNotFoundError:
+    np = None
 
 from builder import WadBuilder
 from modules.level import Level
 from modules.geometry import Corridor, Lawn, Room
 from modules.connectors import Door, ExitLine
+from modules.room_table import KIND_BEDROOM, KIND_LAWN, RoomTable
+from placement import PlacementRequest, ThingPlacer, thing_radius
 
-# Make the vendored `omgifol` library importable (mirrors modules/furniture.py).
-try:
-    from omg.mapedit import Thing  # type: ignore
-except ModuleNotFoundError:
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    omgifol_path = os.path.abspath(os.path.join(current_dir, "..", "..", "tools", "omgifol"))
-    if omgifol_path not in sys.path:
-        sys.path.append(omgifol_path)
-    from omg.mapedit import Thing  # type: ignore
+
+# Provenance owner for populator things (`things.owner` in the SQLite export).
+POPULATOR_OWNER = "GameplayPopulator"
 
 
 @dataclass(frozen=True)
@@ -43,17 +42,21 @@ def _clamp_point_in_room(r: Room, x: int, y: int, pad: int = 48) -> tuple[int, i
 
 
 def _add_thing(builder: WadBuilder, *, type_id: int, x: int, y: int, angle: int = 0, flags: int = 7) -> None:
-    th: Any = Thing()
-    th.x = int(x)
-    th.y = int(y)
-    th.angle = int(angle)
-    th.type = int(type_id)
-    th.flags = int(flags)
-    editor: Any = getattr(builder, 'editor')
-    editor.things.append(th)
+    with builder.owned_by(POPULATOR_OWNER):
+        builder.things.add(type_id, x, y, angle, flags)
+
+
+def _room_table(level: Level) -> RoomTable | None:
+    # Vectorized queries when NumPy is available; callers fall back to loops.
+    get_table = getattr(level, 'room_table', None)
+    return get_table() if callable(get_table) else None
 
 
 def _find_room_containing_point(level: Level, x: int, y: int) -> Room | None:
+    table = _room_table(level)
+    if table is not None:
+        return table.containing(x, y, table.is_room() & (table.data.floor == 0))
+
     for r in _iter_rooms(level):
         if int(getattr(r, 'floor_height', 0) or 0) != 0:
             continue
@@ -63,6 +66,10 @@ def _find_room_containing_point(level: Level, x: int, y: int) -> Room | None:
 
 
 def _nearest_main_room(level: Level, x: int, y: int) -> Room | None:
+    table = _room_table(level)
+    if table is not None:
+        return table.nearest_to(x, y, table.main_floor_mask())
+
     main_rooms: list[Room] = [
         r for r in _iter_rooms(level)
         if int(getattr(r, 'floor_height', 0) or 0) == 0 and int(getattr(r, 'y', 0)) >= 0
@@ -105,6 +112,12 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
 
     cfg = config or GameplayConfig()
     rng = random.Random(int(cfg.seed))
+    table = _room_table(level)
+
+    # Things must not stack on furniture or on each other: random spots come from
+    # the Poisson-disk placer, which also tracks every thing added so far.
+    placer = ThingPlacer(rng)
+    placer.reserve_furniture(_iter_rooms(level))
 
     # --- Player start: trust generator's suggested spawn (main gate campus road) ---
     spawn_raw = getattr(level, "test_spawn", None)
@@ -145,10 +158,21 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
             for idx, (px, py) in enumerate(spots):
                 x, y = _clamp_point_in_room(start_room, int(px), int(py), pad=96)
                 mon = 3001 if idx < 2 else 3004  # Imp, Zombieman
+                placer.sync_things(builder.things)
+                if not placer.is_free(x, y, thing_radius(mon)):
+                    free = placer.sample_room(start_room, type_id=mon, count=1, pad=32)
+                    if free:
+                        x, y = free[0]
                 _add_thing(builder, type_id=mon, x=x, y=y, angle=rng.choice((0, 90, 180, 270)))
 
     # Outdoors: place imps in lawns so you definitely see them.
-    lawns: list[Lawn] = [r for r in _iter_rooms(level) if isinstance(r, Lawn) and int(getattr(r, 'y', 0)) >= 0]
+    if table is not None:
+        lawns = cast(list[Lawn], table.select(table.kind_mask(KIND_LAWN) & (table.data.y >= 0)))
+    else:
+        lawns = [r for r in _iter_rooms(level) if isinstance(r, Lawn) and int(getattr(r, 'y', 0)) >= 0]
+    placer.sync_things(builder.things)
+
+    lawn_requests: list[PlacementRequest] = []
     for lawn in lawns:
         lw = int(getattr(lawn, 'width', 0) or 0)
         lh = int(getattr(lawn, 'height', 0) or 0)
@@ -158,18 +182,14 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
 
         # Light scatter across the lawn; keep away from walls.
         pad = min(192, max(96, min(lw, lh) // 6))
-        min_x = int(lawn.x) + pad
-        max_x = int(lawn.x + lawn.width) - pad
-        min_y = int(lawn.y) + pad
-        max_y = int(lawn.y + lawn.height) - pad
-        if min_x >= max_x or min_y >= max_y:
+        if 2 * pad >= lw or 2 * pad >= lh:
             continue
 
         count = 10 if (lw * lh) >= (1400 * 1400) else 6
-        for _ in range(count):
-            x = int(rng.randint(min_x, max_x))
-            y = int(rng.randint(min_y, max_y))
-            x, y = _clamp_point_in_room(lawn, x, y, pad=pad)
+        lawn_requests.append(PlacementRequest(lawn, 3001, count, pad=pad, spacing=96))
+
+    for spots in placer.place_batch(lawn_requests):
+        for x, y in spots:
             _add_thing(builder, type_id=3001, x=x, y=y, angle=rng.choice((0, 90, 180, 270)))
 
     # --- Identify key spaces ---
@@ -185,27 +205,47 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
             break
 
     # Bedrooms are close-quarters rooms.
-    bedrooms: list[Room] = [r for r in _iter_rooms(level) if type(r).__name__ == "Bedroom"]
+    if table is not None:
+        bedrooms: list[Room] = table.select(table.kind_mask(KIND_BEDROOM))
+    else:
+        bedrooms = [r for r in _iter_rooms(level) if type(r).__name__ == "Bedroom"]
 
+    # Choose a "back gate" goal point as the farthest main-map room from spawn.
     # Main-map rooms only (ignore off-map portal floors for "dungeon crawl" distance computations).
-    main_rooms: list[Room] = [
-        r for r in _iter_rooms(level)
-        if int(getattr(r, "floor_height", 0) or 0) == 0 and int(getattr(r, "y", 0)) >= 0
-    ]
+    if table is not None:
+        main_rooms: list[Room] = table.select(table.main_floor_mask())
+    else:
+        main_rooms = [
+            r for r in _iter_rooms(level)
+            if int(getattr(r, "floor_height", 0) or 0) == 0 and int(getattr(r, "y", 0)) >= 0
+        ]
 
-    # Choose a "back gate" goal point as the farthest main-map room from spawn.
     goal_room: Optional[Room] = None
     if main_rooms and spawn and len(spawn) >= 2:
         sx = int(spawn[0])
         sy = int(spawn[1])
 
-        def _d2(r: Room) -> int:
-            cx, cy = _room_center(r)
-            dx = cx - sx
-            dy = cy - sy
-            return dx * dx + dy * dy
+        # Prefer true walking distance (doors/windows/portals) over straight-line distance.
+        spawn_room = _find_room_containing_point(level, sx, sy) or _nearest_main_room(level, sx, sy)
+        if spawn_room is not None:
+            goal_room = level.room_graph().farthest_from(spawn_room, main_rooms)
+            if goal_room is spawn_room:
+                goal_room = None
+
+    if goal_room is None and main_rooms and spawn and len(spawn) >= 2:
+        # Fallback: Euclidean-farthest (spawn not inside the walking graph).
+        sx = int(spawn[0])
+        sy = int(spawn[1])
+        if table is not None:
+            goal_room = table.farthest_from(sx, sy, table.main_floor_mask())
+        else:
+            def _d2(r: Room) -> int:
+                cx, cy = _room_center(r)
+                dx = cx - sx
+                dy = cy - sy
+                return dx * dx + dy * dy
 
-        goal_room = max(main_rooms, key=_d2)
+            goal_room = max(main_rooms, key=_d2)
 
     # --- Weapons (progression) ---
     # Doom2 pickup IDs:
@@ -232,16 +272,30 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
 
     # Rocket launcher: reward climbing by placing on 3rd floor middle wing corridor.
     # We approximate "middle" by picking a corridor with floor_height ~280 closest to x=0.
-    third_floor_corridors = [r for r in _iter_corridors(level) if int(getattr(r, "floor_height", 0) or 0) >= 280]
-    if third_floor_corridors:
-        middle_c = min(third_floor_corridors, key=lambda r: abs(int(getattr(r, "x", 0))))
+    middle_c: Optional[Room] = None
+    if table is not None:
+        mask = table.corridor_mask() & (table.data.floor >= 280)
+        if mask.any():
+            # Unselected rows get a sentinel larger than any |x| so argmin picks the first minimum.
+            dist = np.where(mask, np.abs(table.data.x.astype(np.int64)), np.iinfo(np.int64).max)
+            middle_c = table.rooms[int(np.argmin(dist))]
+    else:
+        third_floor_corridors = [r for r in _iter_corridors(level) if int(getattr(r, "floor_height", 0) or 0) >= 280]
+        if third_floor_corridors:
+            middle_c = min(third_floor_corridors, key=lambda r: abs(int(getattr(r, "x", 0))))
+    if middle_c is not None:
         rx, ry = _room_center(middle_c)
         rx, ry = _clamp_point_in_room(middle_c, rx, ry, pad=64)
         _add_thing(builder, type_id=2003, x=rx, y=ry, angle=0)
 
     # --- Enemies ---
     # Corridors: Pinkies spaced along the long axis.
-    for cor in _iter_corridors(level):
+    if table is not None:
+        d = table.data
+        long_corridors: Iterable[Room] = table.select(table.corridor_mask() & (np.maximum(d.w, d.h) >= 640))
+    else:
+        long_corridors = _iter_corridors(level)
+    for cor in long_corridors:
         pad = 64
         cx, cy = _room_center(cor)
         long_is_y = int(getattr(cor, "height", 0)) >= int(getattr(cor, "width", 0))
@@ -262,20 +316,19 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
         # Keep it light so rooms aren't jammed.
         if rng.random() < 0.35:
             continue
-        corners = [
-            (int(br.x) + 64, int(br.y) + 64),
-            (int(br.x + br.width) - 64, int(br.y) + 64),
-            (int(br.x) + 64, int(br.y + br.height) - 64),
-            (int(br.x + br.width) - 64, int(br.y + br.height) - 64),
-        ]
-        rng.shuffle(corners)
+        placer.sync_things(builder.things)
         count = 1 if rng.random() < 0.75 else 2
-        for (x, y) in corners[:count]:
+        for _ in range(count):
             mon = 3004 if rng.random() < 0.6 else 9
-            _add_thing(builder, type_id=mon, x=x, y=y, angle=rng.choice((0, 90, 180, 270)))
+            for x, y in placer.sample_room(br, type_id=mon, count=1, pad=40, spacing=16):
+                _add_thing(builder, type_id=mon, x=x, y=y, angle=rng.choice((0, 90, 180, 270)))
 
     # Stairwells (choke points): Hell Knights near off-map floor entrances.
-    for cor in _iter_corridors(level):
+    if table is not None:
+        stair_corridors: Iterable[Room] = table.select(table.corridor_mask() & np.isin(table.data.floor, (140, 280)))
+    else:
+        stair_corridors = _iter_corridors(level)
+    for cor in stair_corridors:
         fh = int(getattr(cor, "floor_height", 0) or 0)
         if fh not in (140, 280):
             continue
@@ -305,6 +358,12 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
         bx, by = _room_center(br)
         bx, by = _clamp_point_in_room(br, bx, by, pad=64)
         reward = 2013 if (idx % 2) == 0 else 8
+        placer.sync_things(builder.things)
+        if not placer.is_free(bx, by, thing_radius(reward)):
+            # A bedroom monster already stands in the middle; find a free spot instead.
+            spots = placer.sample_room(br, type_id=reward, count=1, pad=40)
+            if spots:
+                bx, by = spots[0]
         _add_thing(builder, type_id=reward, x=bx, y=by, angle=0)
 
     # Doom/ZDoom secrets are tracked via *secret sectors* (special 9), not secret linedefs.
@@ -312,6 +371,8 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
     if bedrooms:
         secret_room = rng.choice(bedrooms)
         setattr(secret_room, 'special', 9)
+        if table is not None:
+            level.invalidate_room_table()
 
     # --- Exit objective ---
     if goal_room is not None:
@@ -350,11 +411,9 @@ def populate(level: Level, builder: WadBuilder, *, config: GameplayConfig | None
 
     # --- Debug summary (helps catch "100%/nothing spawned" reports) ---
     try:
-        editor: Any = getattr(builder, 'editor')
-        things = list(getattr(editor, 'things', []) or [])
-        types = [int(getattr(t, 'type', 0) or 0) for t in things]
+        types = builder.things.type
         monsters = sum(1 for t in types if t in (9, 3001, 3002, 3003, 3004, 64))
         pickups = sum(1 for t in types if t in (8, 2001, 2002, 2003, 2011, 2012, 2013))
-        print(f"Gameplay populated: things={len(things)} monsters~={monsters} pickups~={pickups} secret_rooms={1 if bedrooms else 0}")
+        print(f"Gameplay populated: things={len(types)} monsters~={monsters} pickups~={pickups} secret_rooms={1 if bedrooms else 0}")
     except Exception:
         pass
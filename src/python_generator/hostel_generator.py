@@ -6,6 +6,7 @@ from modules.geometry import Lawn, Room, Corridor
 from modules.connectors import Window, Portal
 from modules.wing import Wing
 
+from layout.stacking import FloorSpans, StackingCost, floor_counts, measure_cost, resolve_stacking
 from layout.stairs import (
     StairsSpec,
     add_second_floor_portal_entry,
@@ -30,10 +31,16 @@ from layout.hostel_layout import (
  
 
 class HostelGenerator:
-    def __init__(self, start_x: int = 0, start_y: int = 0) -> None:
+    def __init__(self, start_x: int = 0, start_y: int = 0, stacking: Optional[object] = None) -> None:
         self.start_x = start_x
         self.start_y = start_y
         self.level = Level()
+
+        # How the upper floors are stacked ('hybrid', 'portals' or '3dfloors';
+        # see layout/stacking.py). None reads `H9_STACKING`.
+        self.stacking = resolve_stacking(stacking)
+        # Which rooms/connectors belong to which floor (marked in generate()).
+        self.floor_spans = FloorSpans(self.level)
         
         # Configuration
         self.wall_thickness = 16
@@ -56,7 +63,20 @@ class HostelGenerator:
 
         # Shared sector tag used for main-floor wing sectors so we can apply
         # visual 3D floors (facade) without affecting the off-map portal floors.
-        self._main_wing_story_tag: int = 200
+        self._main_wing_story_tag: int = 200 if self.stacking.facade_3d_floors else 0
+
+    def stacking_cost(self, builder) -> StackingCost:
+        """Sector/line/3D-floor/portal counts of this layout as built into `builder`."""
+        return measure_cost(self.stacking.name, self.level, builder)
+
+    def floor_costs(self, builder) -> Dict[Tuple[int, str], Tuple[int, int]]:
+        """(sectors, lines) per (floor, role) span; needs a strategy that keeps every floor."""
+        if not self.stacking.offmap_floors:
+            raise ValueError(
+                f"Per-floor costs need a layout with every floor; "
+                f"{self.stacking.name!r} drops the upper floors (use 'hybrid')"
+            )
+        return floor_counts(self.level, self.floor_spans, builder)
 
     def _create_stairwell(self, src_corridor: Room, side_dir: int, *, attach_y: int, set_spawn: bool, portal_target_corridor: Optional[Room] = None, portal_pair_ids: Optional[Tuple[int, int]] = None) -> Dict[str, Room]:
         hall_h = self.steps * self.step_depth
@@ -483,6 +503,8 @@ class HostelGenerator:
         # Keep aligned to 16-unit grid to preserve exact-edge connector cuts.
         lawn_width = 896
         lawn_height = wing_height 
+
+        self.floor_spans.mark(1)
         
         # 1. Create Central Lawn + Roads (parallel to the wings).
         # The lawn is split into strips separated by wall-thickness connector gaps,
@@ -1009,6 +1031,7 @@ class HostelGenerator:
             self.level.test_spawn = gates_result.spawn
 
         # 7. Stairs + off-map 2nd floor connected via line portals
+        self.floor_spans.mark(2)
         # The 2nd floor is a separate copy of the building placed off-map, so doors
         # are fully independent per floor. We connect at the top of the stairs using
         # Line_SetPortal so it feels seamless.
@@ -1250,6 +1273,7 @@ class HostelGenerator:
         # - East Wing corridor is on the outside east; outside wall is east  => side_dir = +1
         # - Middle Wing stairs bump out into the lawn-side gap (east)        => side_dir = +1
 
+        self.floor_spans.mark(1, 'link')
         add_stairwell_to_corridor(
             self.level,
             west_corridor,
@@ -1261,6 +1285,7 @@ class HostelGenerator:
             spec=self.stairs_spec,
         )
 
+        self.floor_spans.mark(2, 'link')
         f2_arrival_west = add_second_floor_portal_entry(
             self.level,
             west_corridor_2,
@@ -1270,6 +1295,7 @@ class HostelGenerator:
             spec=self.stairs_spec,
         )
 
+        self.floor_spans.mark(1, 'link')
         add_stairwell_to_corridor(
             self.level,
             east_corridor,
@@ -1282,6 +1308,7 @@ class HostelGenerator:
         )
 
         # Off-map portal entry corresponding to the stairwell top.
+        self.floor_spans.mark(2, 'link')
         f2_arrival = add_second_floor_portal_entry(
             self.level,
             east_corridor_2,
@@ -1292,6 +1319,7 @@ class HostelGenerator:
         )
 
         # Middle Wing: add the same stairs + portal connection to its off-map 2nd floor.
+        self.floor_spans.mark(1, 'link')
         add_stairwell_to_corridor(
             self.level,
             middle_corridor,
@@ -1302,6 +1330,7 @@ class HostelGenerator:
             portal_pair_ids=middle_portal_ids,
             spec=self.stairs_spec,
         )
+        self.floor_spans.mark(2, 'link')
         f2_arrival_middle = add_second_floor_portal_entry(
             self.level,
             middle_corridor_2,
@@ -1321,6 +1350,7 @@ class HostelGenerator:
             )
 
         # 8. Third Floor (full copy matching 2nd floor semantics)
+        self.floor_spans.mark(3)
         third_floor_offset_y = -28000
         third_floor_floor = 2 * self.steps * self.rise
         third_floor_ceil = third_floor_floor + 128
@@ -1494,6 +1524,7 @@ class HostelGenerator:
             )
 
         # Extend stairs from F2 arrivals up to F3, then add corresponding portal entries on F3.
+        self.floor_spans.mark(2, 'link')
         add_stair_extension(
             self.level,
             f2_arrival['landing'],
@@ -1572,6 +1603,7 @@ class HostelGenerator:
             spec=self.stairs_spec,
         )
 
+        self.floor_spans.mark(3, 'link')
         east_attach_y_3 = int(east_corridor_3.y + east_corridor_3.height - self.wall_thickness - self.stairs_h - east_north_attach_pad)
         add_second_floor_portal_entry(
             self.level,
@@ -1597,5 +1629,12 @@ class HostelGenerator:
             portal_pair_ids=west_portal_ids_2_3,
             spec=self.stairs_spec,
         )
+
+        self.floor_spans.close()
+
+        # Strategies without off-map floors keep only the ground floor proper
+        # (no stairwells: they would lead nowhere).
+        if not self.stacking.offmap_floors:
+            self.floor_spans.keep_only([(1, 'floor')])
         
         return self.level
@@ -0,0 +1,314 @@
+"""Floor-stacking strategies for the multi-storey hostel.
+
+ZDoom gives us several ways to stack storeys, each with its own cost:
+
+- ``hybrid`` (default): walkable upper floors are off-map copies joined to
+  the stairwells by line portals, and the main-floor wings get *visual* 3D
+  floors so the facade reads as a three-storey building from outside.
+- ``portals``: the same off-map floors and portals, without the facade 3D
+  floors (cheapest renderer-wise; the building looks single-storey).
+- ``3dfloors``: no off-map floors; only the facade 3D floors remain, so the
+  upper storeys are scenery and the stairwells are not built.
+
+A fourth layout, one map per floor joined by map exits ("hub"), is costed
+but not selectable: `WadBuilder` writes a single map. Its report row uses
+the ground floor as built by `HUB_GROUND` (no upper floors, no facade)
+plus per-floor counts from a full build (`hub_cost()`).
+
+`HostelGenerator` records which rooms/connectors belong to which floor
+(`FloorSpans`) while it lays out, and drops the floors a strategy does not
+keep. `measure_cost()` counts what a built strategy will save.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from modules.level import Level
+from modules.connectors import Portal
+
+
+@dataclass(frozen=True)
+class StackingStrategy:
+    """How the upper floors are represented in the output map."""
+
+    name: str
+    # Build the off-map floor copies (and the stairwells leading to them).
+    offmap_floors: bool
+    # Join floors with Line_SetPortal pairs (only meaningful with offmap_floors).
+    portals: bool
+    # Add the visual 3D-floor stories to the main-floor facade.
+    facade_3d_floors: bool
+
+
+STRATEGIES: Dict[str, StackingStrategy] = {
+    s.name: s
+    for s in (
+        StackingStrategy('hybrid', offmap_floors=True, portals=True, facade_3d_floors=True),
+        StackingStrategy('portals', offmap_floors=True, portals=True, facade_3d_floors=False),
+        StackingStrategy('3dfloors', offmap_floors=False, portals=False, facade_3d_floors=True),
+    )
+}
+
+# MAP01 of a one-map-per-floor hub: the ground floor alone. Not in
+# STRATEGIES; only `main_hostel.py --stacking-report` builds it.
+HUB_GROUND = StackingStrategy('hub', offmap_floors=False, portals=False, facade_3d_floors=False)
+
+DEFAULT_STACKING = 'hybrid'
+
+
+def resolve_stacking(stacking: Optional[object] = None) -> StackingStrategy:
+    """A `StackingStrategy` from a name, a strategy, or None (`H9_STACKING`, else hybrid)."""
+    if isinstance(stacking, StackingStrategy):
+        return stacking
+    name = str(stacking or os.environ.get('H9_STACKING', '') or DEFAULT_STACKING).lower().strip()
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown stacking strategy {name!r}; expected one of {', '.join(STRATEGIES)}") from None
+
+
+# Facade 3D floors (see `add_facade_3d_floors`).
+FACADE_STORY_TAG = 200
+FACADE_FLOOR_ZS = (128, 256)
+# Per-story window bands: solid below [z0, z0+48) and above [z0+96, z0+128).
+FACADE_WINDOW_STORY_ZS = (0, 128, 256)
+
+
+def add_facade_3d_floors(builder) -> None:
+    """Apply the visual storey 3D floors to the main-floor facade (after `level.build`)."""
+    # The main-floor wing sectors are tagged with 200 (see HostelGenerator).
+    # We also apply the same 3D floors to any door sectors that received unique
+    # action tags but still need the story floors (recorded by Door.build).
+    target_tags = [FACADE_STORY_TAG] + sorted(builder.get_extra_3d_floor_target_tags())
+    for tag in target_tags:
+        for z in FACADE_FLOOR_ZS:
+            builder.add_3d_floor_platform(
+                target_sector_tag=int(tag),
+                z=int(z),
+                thickness=16,
+                floor_tex="FLOOR4_8",
+                ceil_tex="CEIL3_5",
+                wall_tex="STONE2",
+                alpha=255,
+                flags=0,
+            )
+
+    # --- Facade windows: carve per-floor gaps (avoid one continuous slit) ---
+    # Window sectors that bridge from the story-tagged footprint to outdoor sky
+    # are tagged with a dedicated sector tag (allocated by Window.build).
+    # We fill most of each 128-high story with solid 3D floors, leaving a single
+    # 48-unit tall gap per story: [48..96] within each story.
+    facade_window_tag = int(builder.get_facade_window_sector_tag())
+    if facade_window_tag:
+        for z0 in FACADE_WINDOW_STORY_ZS:
+            # Fill below the window gap.
+            builder.add_3d_floor_platform(
+                target_sector_tag=facade_window_tag,
+                z=int(z0),
+                thickness=48,
+                floor_tex="FLOOR4_8",
+                ceil_tex="CEIL3_5",
+                wall_tex="BROWN96",
+                alpha=255,
+                flags=0,
+            )
+            # Fill above the window gap.
+            builder.add_3d_floor_platform(
+                target_sector_tag=facade_window_tag,
+                z=int(z0 + 96),
+                thickness=32,
+                floor_tex="FLOOR4_8",
+                ceil_tex="CEIL3_5",
+                wall_tex="BROWN96",
+                alpha=255,
+                flags=0,
+            )
+
+
+@dataclass(frozen=True)
+class FloorSpan:
+    """Rooms/connectors (index ranges into the level lists) added for one floor.
+
+    `role` is 'floor' for the storey itself and 'link' for the stairs and
+    portal landings that join it to the next storey.
+    """
+
+    floor: int
+    role: str
+    rooms: range
+    connectors: range
+
+
+class FloorSpans:
+    """Records which floor each room/connector was laid out for.
+
+    The generator calls `mark(floor, role)` before each block; everything
+    added until the next mark (or `close()`) belongs to that (floor, role).
+    Anything added after `close()` (e.g. by the gameplay populator) is in no
+    span.
+    """
+
+    __slots__ = ('level', '_marks', '_end')
+
+    def __init__(self, level: Level) -> None:
+        self.level = level
+        self._marks: List[Tuple[int, str, int, int]] = []
+        self._end: Optional[Tuple[int, int]] = None
+
+    def mark(self, floor: int, role: str = 'floor') -> None:
+        self._marks.append((int(floor), str(role), len(self.level.rooms), len(self.level.connectors)))
+
+    def close(self) -> None:
+        self._end = (len(self.level.rooms), len(self.level.connectors))
+
+    def spans(self) -> List[FloorSpan]:
+        ends = [(r, c) for _f, _role, r, c in self._marks[1:]]
+        ends.append(self._end or (len(self.level.rooms), len(self.level.connectors)))
+        return [
+            FloorSpan(f, role, range(r0, r1), range(c0, c1))
+            for (f, role, r0, c0), (r1, c1) in zip(self._marks, ends)
+        ]
+
+    def keep_only(self, keep: Iterable[Tuple[int, str]]) -> None:
+        """Remove every room/connector outside the kept (floor, role) spans.
+
+        Connectors touching a removed room are removed too (wherever they were
+        added). The marks are rewritten so `spans()` stays valid.
+        """
+        keep = set(keep)
+        level = self.level
+        spans = self.spans()
+        dropped = {
+            id(level.rooms[i])
+            for sp in spans if (sp.floor, sp.role) not in keep
+            for i in sp.rooms
+        }
+
+        def _touches_dropped(conn) -> bool:
+            return any(
+                id(getattr(conn, attr, None)) in dropped
+                for attr in ('room1', 'room2', 'room')
+                if getattr(conn, attr, None) is not None
+            )
+
+        # Rooms/connectors past the last span (added after `close()`) stay.
+        end_room, end_conn = spans[-1].rooms.stop, spans[-1].connectors.stop
+        rooms: list = []
+        connectors: list = []
+        marks: List[Tuple[int, str, int, int]] = []
+        for sp in spans:
+            marks.append((sp.floor, sp.role, len(rooms), len(connectors)))
+            if (sp.floor, sp.role) in keep:
+                rooms.extend(level.rooms[i] for i in sp.rooms)
+                connectors.extend(c for c in (level.connectors[i] for i in sp.connectors) if not _touches_dropped(c))
+        self._end = (len(rooms), len(connectors))
+        self._marks = marks
+        level.rooms[:] = rooms + level.rooms[end_room:]
+        level.connectors[:] = connectors + [c for c in level.connectors[end_conn:] if not _touches_dropped(c)]
+        level.invalidate_room_table()
+        level.invalidate_room_graph()
+
+
+@dataclass(frozen=True)
+class StackingCost:
+    """Map size for one strategy (`per_map` is (sectors, lines) per map)."""
+
+    strategy: str
+    sectors: int
+    lines: int
+    # Sector x 3D-floor layer pairs (what the renderer and clipper pay for).
+    floors_3d: int
+    # Line_SetPortal lines.
+    portals: int
+    per_map: Tuple[Tuple[int, int], ...]
+
+    def summary(self) -> str:
+        maps = ''
+        if len(self.per_map) > 1:
+            maps = '  maps: ' + ', '.join(f"{s}/{n}" for s, n in self.per_map)
+        return (
+            f"{self.strategy:<9} {self.sectors:>7} {self.lines:>7} {self.floors_3d:>9} {self.portals:>7}{maps}"
+        )
+
+
+COST_HEADER = f"{'strategy':<9} {'sectors':>7} {'lines':>7} {'3d floors':>9} {'portals':>7}"
+
+
+def measure_cost(name: str, level: Level, builder) -> StackingCost:
+    """Sector/line/3D-floor/portal counts of `level` as built into `builder`.
+
+    Call after `level.build` (and `add_facade_3d_floors()` when the strategy
+    uses it). The 3D-floor control sectors are drawn at save time, one per
+    distinct platform with 4 lines each, and are included, so the counts
+    match the saved map.
+    """
+    editor = builder.editor
+    controls = len(builder.floors3d)
+    tag_counts: Dict[int, int] = {}
+    for sec in editor.sectors:
+        tag = int(getattr(sec, 'tag', 0) or 0)
+        if tag:
+            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    layers = sum(
+        tag_counts.get(tag, 0)
+        for _platform, tags in builder.floors3d.targets().items()
+        for tag in tags
+    )
+    sectors = len(editor.sectors) + controls
+    lines = len(editor.linedefs) + 4 * controls
+    return StackingCost(
+        strategy=name,
+        sectors=sectors,
+        lines=lines,
+        floors_3d=layers,
+        # Each Portal connector tags one Line_SetPortal line (pairs share an id).
+        portals=sum(1 for c in level.connectors if isinstance(c, Portal)),
+        per_map=((sectors, lines),),
+    )
+
+
+def floor_counts(level: Level, spans: FloorSpans, builder) -> Dict[Tuple[int, str], Tuple[int, int]]:
+    """(sectors, lines) per (floor, role) span of a built level.
+
+    Each drawn sector/line is charged to the span of its `builder.provenance`
+    owner; geometry outside every span (populator additions, untracked
+    drawing) is charged to the ground floor.
+    """
+    prov = builder.provenance
+    editor = builder.editor
+    owner_sectors, owner_lines, _sides = prov.resolve(len(editor.sectors), len(editor.linedefs), 0)
+
+    key_of: Dict[int, Tuple[int, str]] = {}
+    for sp in spans.spans():
+        for obj in [level.rooms[i] for i in sp.rooms] + [level.connectors[i] for i in sp.connectors]:
+            key_of[prov.owner_index(obj)] = (sp.floor, sp.role)
+
+    counts: Dict[Tuple[int, str], List[int]] = {}
+    for k, owners in enumerate((owner_sectors, owner_lines)):
+        for owner in owners:
+            key = key_of.get(owner, (1, 'floor')) if owner is not None else (1, 'floor')
+            counts.setdefault(key, [0, 0])[k] += 1
+    return {key: (s, n) for key, (s, n) in counts.items()}
+
+
+def hub_cost(ground: StackingCost, floors: Dict[Tuple[int, str], Tuple[int, int]]) -> StackingCost:
+    """Estimate for one map per floor: measured MAP01 plus each upper floor's span.
+
+    `ground` is the measured `HUB_GROUND` build. The upper floors come from a
+    full build's `floor_counts()`, with their stairs dropped as on MAP01.
+    Map exits are not modelled.
+    """
+    per_map = ground.per_map + tuple(
+        floors[(f, 'floor')] for f in sorted({f for f, _role in floors}) if f > 1 and (f, 'floor') in floors
+    )
+    return StackingCost(
+        strategy=ground.strategy,
+        sectors=sum(s for s, _n in per_map),
+        lines=sum(n for _s, n in per_map),
+        floors_3d=0,
+        portals=0,
+        per_map=per_map,
+    )
@@ -0,0 +1,379 @@
+"""Top-down preview of a `Level` before `build()`: PNG + SVG, no WAD or engine.
+
+Rooms are filled by class (Bedroom, Corridor, Lawn, ...) and shaded by floor
+height (upper floors darker), connectors are drawn on top coloured by type
+(Door, secret Door, Window, Portal, ...) and things are dots coloured by
+category (player start, monster, pickup, decoration). Pixels covered by more
+than one room are painted `OVERLAP_COLOR`, which makes 2D overlaps (invalid
+Doom geometry) jump out.
+
+The PNG is rasterized with NumPy and no per-pixel Python loops: every
+rectangle becomes four corner updates in a difference array (`np.add.at`)
+and a cumulative sum along each axis turns that into per-pixel coverage
+counts and room labels (packed into one int64, so rooms and connectors are
+one pass each). Pixels hold palette indices; things are stamped with one
+fancy-indexing write and the image is a single palette lookup. The SVG
+keeps world coordinates and has a tooltip per room.
+
+Use `main_hostel.py --preview` (layout + populator, no build), or set
+`H9_PREVIEW=build/preview` to write `build/preview.png` / `.svg` on every
+normal build as well. Without NumPy only the SVG is written.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from xml.sax.saxutils import escape
+
+try:
+    import numpy as np  # type: ignore
+except ModuleNotFoundError:
+    np = None
+
+from modules.room_table import KIND_OTHER, kind_id
+
+
+BACKGROUND = (24, 24, 28)
+OVERLAP_COLOR = (255, 0, 64)
+OUTLINE_DARKEN = 0.55
+
+# Room fill by class, indexed by `room_table` kind id (KIND_OTHER last).
+ROOM_COLORS: tuple[tuple[int, int, int], ...] = (
+    (150, 150, 165),  # Room
+    (196, 170, 120),  # Corridor
+    (86, 150, 72),    # Lawn
+    (110, 150, 210),  # Bedroom
+    (222, 150, 80),   # CommonRoom
+    (80, 190, 190),   # Bathroom
+    (200, 120, 200),  # other Room subclasses
+)
+
+CONNECTOR_COLORS: dict[str, tuple[int, int, int]] = {
+    'Door': (140, 80, 30),
+    'SecretDoor': (150, 60, 200),
+    'Window': (170, 235, 255),
+    'Portal': (255, 60, 220),
+    'Switch': (255, 230, 40),
+    'WallSign': (255, 255, 255),
+    'ExitLine': (255, 40, 40),
+    'Connector': (230, 230, 230),
+}
+
+THING_COLORS: dict[str, tuple[int, int, int]] = {
+    'player': (40, 255, 40),
+    'monster': (235, 30, 30),
+    'pickup': (60, 120, 255),
+    'decor': (70, 70, 70),
+}
+PLAYER_TYPES = frozenset({1, 2, 3, 4, 11})
+MONSTER_TYPES = frozenset({
+    7, 9, 16, 58, 64, 65, 66, 67, 68, 69, 71, 84,
+    3001, 3002, 3003, 3004, 3005, 3006,
+})
+PICKUP_TYPES = frozenset({
+    5, 6, 8, 13, 38, 39, 40, 17, 82, 83,
+    2001, 2002, 2003, 2004, 2005, 2006, 2007, 2008, 2010, 2011, 2012, 2013,
+    2014, 2015, 2018, 2019, 2022, 2023, 2024, 2025, 2026, 2045, 2046, 2047, 2048, 2049,
+})
+
+# Marker half-size in pixels per thing category.
+_THING_RADIUS = {'player': 2, 'monster': 1, 'pickup': 1, 'decor': 0}
+
+# Packed per-pixel sums: rooms keep the coverage count above _COUNT_SHIFT and
+# the sum of (index + 1) below it; connectors keep a _TYPE_BITS counter per type.
+_COUNT_SHIFT = 32
+_TYPE_BITS = 7
+_TYPE_MASK = (1 << _TYPE_BITS) - 1
+
+# Shade at the highest floor (the lowest floor is drawn at full brightness).
+TOP_FLOOR_SHADE = 0.55
+
+
+@dataclass(frozen=True)
+class PreviewStats:
+    width: int
+    height: int
+    scale: float
+    rooms: int
+    connectors: int
+    things: int
+    overlap_pixels: int
+    seconds: float
+
+    def summary(self) -> str:
+        text = (f"preview {self.width}x{self.height} px ({self.scale:g} units/px): "
+                f"{self.rooms} rooms, {self.connectors} connectors, {self.things} things, {self.seconds:.2f}s")
+        if self.overlap_pixels:
+            text += f", {self.overlap_pixels} overlapping pixels"
+        return text
+
+
+def preview_from_env() -> Optional[str]:
+    """Output path prefix from `H9_PREVIEW` (None when unset/off)."""
+    raw = str(os.environ.get('H9_PREVIEW', '')).strip()
+    if raw.lower() in ('', '0', 'false', 'no', 'off'):
+        return None
+    return raw
+
+
+def connector_kind(conn) -> str:
+    name = type(conn).__name__
+    if name == 'Door' and getattr(conn, 'secret', False):
+        return 'SecretDoor'
+    return name if name in CONNECTOR_COLORS else 'Connector'
+
+
+def thing_category(type_id: int) -> str:
+    type_id = int(type_id)
+    if type_id in PLAYER_TYPES:
+        return 'player'
+    if type_id in MONSTER_TYPES:
+        return 'monster'
+    if type_id in PICKUP_TYPES:
+        return 'pickup'
+    return 'decor'
+
+
+def _rect(obj) -> tuple[int, int, int, int]:
+    return int(obj.x), int(obj.y), int(getattr(obj, 'width', 0) or 0), int(getattr(obj, 'height', 0) or 0)
+
+
+def collect_things(level, things=None) -> list[tuple[int, int, int]]:
+    """(type, x, y) of populator things (a `ThingBuffer` or rows) plus room furniture."""
+    out: list[tuple[int, int, int]] = []
+    if things is not None:
+        if hasattr(things, 'type') and hasattr(things, 'x'):
+            out.extend(zip(things.type, things.x, things.y))
+        else:
+            out.extend((int(t[0]), int(t[1]), int(t[2])) for t in things)
+    for room in level.rooms:
+        for item in getattr(room, 'furniture', ()) or ():
+            out.append((int(getattr(item, 'thing_type', 0) or 0), int(item.x), int(item.y)))
+    return out
+
+
+def _bounds(level, margin: int) -> tuple[int, int, int, int]:
+    rects = [_rect(o) for o in level.rooms] + [_rect(c) for c in level.connectors]
+    if not rects:
+        return -margin, -margin, margin, margin
+    x0 = min(r[0] for r in rects) - margin
+    y0 = min(r[1] for r in rects) - margin
+    x1 = max(r[0] + r[2] for r in rects) + margin
+    y1 = max(r[1] + r[3] for r in rects) + margin
+    return x0, y0, x1, y1
+
+
+def _floor_shade(floors):
+    lo = floors.min() if floors.size else 0
+    hi = floors.max() if floors.size else 0
+    if hi <= lo:
+        return np.ones(floors.shape, dtype=np.float32)
+    return (1.0 - (1.0 - TOP_FLOOR_SHADE) * (floors - lo) / float(hi - lo)).astype(np.float32)
+
+
+class _Raster:
+    """World -> pixel transform plus the difference-array rectangle painter."""
+
+    def __init__(self, bounds: tuple[int, int, int, int], scale: float):
+        self.x0, self.y0, self.x1, self.y1 = bounds
+        self.scale = float(scale)
+        self.width = max(1, int(np.ceil((self.x1 - self.x0) / self.scale)))
+        self.height = max(1, int(np.ceil((self.y1 - self.y0) / self.scale)))
+
+    def pixel_rects(self, xs, ys, ws, hs):
+        """(c0, c1, r0, r1) int arrays; shared edges round to the same pixel, min 1 px."""
+        s = self.scale
+        c0 = np.rint((xs - self.x0) / s).astype(np.int64)
+        c1 = np.maximum(np.rint((xs + ws - self.x0) / s).astype(np.int64), c0 + 1)
+        # Image rows grow downwards, map y grows upwards.
+        r0 = np.rint((self.y1 - (ys + hs)) / s).astype(np.int64)
+        r1 = np.maximum(np.rint((self.y1 - ys) / s).astype(np.int64), r0 + 1)
+        return (np.clip(c0, 0, self.width), np.clip(c1, 0, self.width),
+                np.clip(r0, 0, self.height), np.clip(r1, 0, self.height))
+
+    def accumulate(self, rects, values):
+        """Per-pixel sum of `values` over the rectangles covering it."""
+        c0, c1, r0, r1 = rects
+        diff = np.zeros((self.height + 1, self.width + 1), dtype=np.int64)
+        np.add.at(diff, (r0, c0), values)
+        np.add.at(diff, (r0, c1), -values)
+        np.add.at(diff, (r1, c0), -values)
+        np.add.at(diff, (r1, c1), values)
+        np.cumsum(diff, axis=1, out=diff)
+        np.cumsum(diff, axis=0, out=diff)
+        return diff[:self.height, :self.width]
+
+    def points(self, xs, ys):
+        cols = np.floor((xs - self.x0) / self.scale).astype(np.int64)
+        rows = np.floor((self.y1 - ys) / self.scale).astype(np.int64)
+        return rows, cols
+
+
+def render_png_array(level, things: Iterable[tuple[int, int, int]] = (), *, scale: float = 8.0,
+                     margin: int = 128):
+    """(H, W, 3) uint8 image of `level` plus the overlap pixel count."""
+    if np is None:
+        raise RuntimeError("layout_preview PNG output needs NumPy")
+    raster = _Raster(_bounds(level, margin), scale)
+    rooms = level.rooms
+    n = len(rooms)
+
+    # Palette slots: background, rooms 1..n, overlap, room outlines, connectors, things.
+    outline_base = n + 1
+    conn_base = 2 * n + 2
+    thing_base = conn_base + len(CONNECTOR_COLORS)
+    palette = np.zeros((thing_base + len(THING_COLORS), 3), dtype=np.uint8)
+    palette[0] = BACKGROUND
+    palette[n + 1] = OVERLAP_COLOR
+    palette[conn_base:thing_base] = list(CONNECTOR_COLORS.values())
+    palette[thing_base:] = list(THING_COLORS.values())
+    index = np.zeros((raster.height, raster.width), dtype=np.int32)
+
+    # --- Rooms: one pass packs coverage count (high bits) and index sum (low bits) ---
+    overlap_pixels = 0
+    if n:
+        d = level.room_table().data
+        kinds = np.where((d.kind >= 0) & (d.kind < KIND_OTHER), d.kind, KIND_OTHER)
+        fill = np.asarray(ROOM_COLORS, dtype=np.float32)[kinds] * _floor_shade(d.floor.astype(np.float32))[:, None]
+        palette[1:n + 1] = np.clip(fill, 0, 255).astype(np.uint8)
+        palette[outline_base + 1:conn_base] = (palette[1:n + 1] * OUTLINE_DARKEN).astype(np.uint8)
+
+        rects = raster.pixel_rects(d.x.astype(np.int64), d.y.astype(np.int64),
+                                   d.w.astype(np.int64), d.h.astype(np.int64))
+        packed = raster.accumulate(rects, (np.int64(1) << _COUNT_SHIFT) + np.arange(1, n + 1, dtype=np.int64))
+        count = packed >> _COUNT_SHIFT
+        label = packed & ((np.int64(1) << _COUNT_SHIFT) - 1)
+        overlap = count > 1
+        index = np.where(overlap, n + 1, np.where(count == 1, label, 0)).astype(np.int32)
+        overlap_pixels = int(np.count_nonzero(overlap))
+
+        # Outlines: room pixels whose owner differs from the right/lower neighbour.
+        edge = np.zeros(index.shape, dtype=bool)
+        edge[:, :-1] |= index[:, :-1] != index[:, 1:]
+        edge[:-1, :] |= index[:-1, :] != index[1:, :]
+        edge &= (index > 0) & (index <= n)
+        np.add(index, outline_base, out=index, where=edge)
+
+    # --- Connectors: one pass, a 7-bit coverage counter per connector type ---
+    kinds = list(CONNECTOR_COLORS)
+    rows = [_rect(c) + (kinds.index(connector_kind(c)),) for c in level.connectors]
+    if rows:
+        arr = np.asarray(rows, dtype=np.int64)
+        rects = raster.pixel_rects(arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3])
+        packed = raster.accumulate(rects, np.int64(1) << (_TYPE_BITS * arr[:, 4])).ravel()
+        # Connectors cover few pixels: decode only those.
+        hit = np.flatnonzero(packed)
+        flat = index.reshape(-1)
+        for k in np.unique(arr[:, 4]).tolist():
+            covered = hit[((packed[hit] >> (_TYPE_BITS * k)) & _TYPE_MASK) > 0]
+            flat[covered] = conn_base + k
+
+    # --- Things: a small square per thing, all stamped at once ---
+    things = list(things)
+    if things:
+        arr = np.asarray(things, dtype=np.int64)
+        rows_px, cols_px = raster.points(arr[:, 1], arr[:, 2])
+        cats = list(THING_COLORS)
+        cat = np.asarray([cats.index(thing_category(t)) for t in arr[:, 0].tolist()], dtype=np.int64)
+        radius = np.asarray([_THING_RADIUS[c] for c in cats], dtype=np.int64)[cat]
+        offsets = np.arange(-2, 3, dtype=np.int64)
+        dr = offsets[None, :, None]
+        dc = offsets[None, None, :]
+        keep = (np.abs(dr) <= radius[:, None, None]) & (np.abs(dc) <= radius[:, None, None])
+        rr = np.broadcast_to(rows_px[:, None, None] + dr, keep.shape)[keep]
+        cc = np.broadcast_to(cols_px[:, None, None] + dc, keep.shape)[keep]
+        slot = np.broadcast_to(thing_base + cat[:, None, None], keep.shape)[keep]
+        rank = np.broadcast_to(radius[:, None, None], keep.shape)[keep]
+        inside = (rr >= 0) & (rr < raster.height) & (cc >= 0) & (cc < raster.width)
+        # Bigger markers last so players/monsters stay visible over decorations.
+        order = np.argsort(rank[inside], kind='stable')
+        index[rr[inside][order], cc[inside][order]] = slot[inside][order]
+
+    return np.take(palette, index, axis=0), overlap_pixels
+
+
+def write_png(path: str, img) -> None:
+    """Write an (H, W, 3) uint8 array as an 8-bit RGB PNG (stdlib zlib only)."""
+    height, width = img.shape[:2]
+    raw = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+    raw[:, 1:] = img.reshape(height, width * 3)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', header))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+def _hex(color) -> str:
+    return '#%02x%02x%02x' % tuple(int(c) for c in color)
+
+
+def render_svg(level, things: Iterable[tuple[int, int, int]] = (), *, margin: int = 128) -> str:
+    """SVG text in world units (y flipped so north is up); rooms carry a tooltip."""
+    x0, y0, x1, y1 = _bounds(level, margin)
+    floors = [int(getattr(r, 'floor_height', 0) or 0) for r in level.rooms]
+    lo, hi = (min(floors), max(floors)) if floors else (0, 0)
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{x0} {-y1} {x1 - x0} {y1 - y0}" '
+        f'width="{(x1 - x0) // 8}" height="{(y1 - y0) // 8}">',
+        f'<rect x="{x0}" y="{-y1}" width="{x1 - x0}" height="{y1 - y0}" fill="{_hex(BACKGROUND)}"/>',
+        '<g transform="scale(1,-1)" stroke-width="4">',
+        '<g id="rooms">',
+    ]
+    for room, floor in zip(level.rooms, floors):
+        x, y, w, h = _rect(room)
+        kind = kind_id(room)
+        base = ROOM_COLORS[kind if 0 <= kind < KIND_OTHER else KIND_OTHER]
+        shade = 1.0 if hi <= lo else 1.0 - (1.0 - TOP_FLOOR_SHADE) * (floor - lo) / (hi - lo)
+        fill = tuple(min(255, int(c * shade)) for c in base)
+        stroke = tuple(int(c * OUTLINE_DARKEN) for c in fill)
+        title = escape(f'{type(room).__name__} at ({x}, {y}) {w}x{h}, floor {floor}')
+        out.append(f'<rect x="{x}" y="{y}" width="{w}" height="{h}" fill="{_hex(fill)}" '
+                   f'stroke="{_hex(stroke)}"><title>{title}</title></rect>')
+    out.append('</g>')
+    out.append('<g id="connectors" stroke="none">')
+    for conn in level.connectors:
+        x, y, w, h = _rect(conn)
+        kind = connector_kind(conn)
+        out.append(f'<rect x="{x}" y="{y}" width="{max(w, 4)}" height="{max(h, 4)}" '
+                   f'fill="{_hex(CONNECTOR_COLORS[kind])}"><title>{kind}</title></rect>')
+    out.append('</g>')
+    out.append('<g id="things" stroke="none">')
+    for type_id, x, y in things:
+        cat = thing_category(type_id)
+        r = 32 if cat == 'player' else 16 if cat != 'decor' else 8
+        out.append(f'<circle cx="{x}" cy="{y}" r="{r}" fill="{_hex(THING_COLORS[cat])}"><title>{cat} {type_id}</title></circle>')
+    out.append('</g>')
+    out.append('</g>')
+    out.append('</svg>')
+    return '\n'.join(out) + '\n'
+
+
+def write_preview(level, things=None, path_prefix: str = 'build/preview', *, scale: float = 8.0,
+                  svg: bool = True) -> PreviewStats:
+    """Write `<path_prefix>.png` (needs NumPy) and `<path_prefix>.svg` for `level`."""
+    start = time.perf_counter()
+    rows = collect_things(level, things)
+    os.makedirs(os.path.dirname(os.path.abspath(path_prefix)), exist_ok=True)
+    width = height = overlap_pixels = 0
+    if np is not None:
+        img, overlap_pixels = render_png_array(level, rows, scale=scale)
+        height, width = img.shape[:2]
+        write_png(path_prefix + '.png', img)
+    else:
+        print("Warning: NumPy not installed; writing only the SVG preview.")
+    if svg or np is None:
+        with open(path_prefix + '.svg', 'w', encoding='utf-8') as f:
+            f.write(render_svg(level, rows))
+    return PreviewStats(width, height, float(scale), len(level.rooms), len(level.connectors), len(rows),
+                        overlap_pixels, time.perf_counter() - start)
@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 
@@ -10,8 +11,21 @@ if src_path not in sys.path:
 from builder import WadBuilder
 from hostel_generator import HostelGenerator
 from gameplay_populator import populate as populate_gameplay
+from layout_preview import preview_from_env, write_preview
+from layout.stacking import COST_HEADER, HUB_GROUND, STRATEGIES, add_facade_3d_floors, hub_cost
 
-def main():
+# Raw UDMF map WAD. A nodebuilder (zdbsp) should post-process this into the
+# final playable WAD, unless H9_NODES=zgln builds nodes in-process.
+OUTPUT_PATH = os.path.abspath(os.path.join(current_dir, "../../build/py_hostel_full_raw.wad"))
+
+PREVIEW_PREFIX = os.path.abspath(os.path.join(current_dir, "../../build/preview"))
+
+def layout(stacking=None):
+    """Lay out and populate the hostel; returns (builder, generator) before `level.build`.
+
+    `stacking` picks the floor-stacking strategy (see layout/stacking.py);
+    None reads `H9_STACKING` and defaults to hybrid.
+    """
     print("Initializing WadBuilder...")
     builder = WadBuilder()
     
@@ -24,67 +38,30 @@ def main():
         print(f"Warning: Sign texture not found at {gem_path}")
 
     print("Generating Hostel Layout...")
-    generator = HostelGenerator(start_x=0, start_y=0)
+    generator = HostelGenerator(start_x=0, start_y=0, stacking=stacking)
     level = generator.generate()
     
     # Populate monsters/items/objectives into the map.
     # Must run before build so it can mark doors secret and add any connectors.
     populate_gameplay(level, builder)
+    return builder, generator
+
+def generate(stacking=None):
+    """Lay out, populate and draw the hostel; returns the unsaved WadBuilder."""
+    builder, generator = layout(stacking)
+    level = generator.level
+
+    preview = preview_from_env()
+    if preview:
+        print(write_preview(level, builder.things, preview).summary())
 
     print("Building Level...")
     level.build(builder)
 
-    # --- Visual facade: add 3D floors for main-floor wings ---
-    # The main-floor wing sectors are tagged with 200 (see HostelGenerator).
-    # We also apply the same 3D floors to any door sectors that received unique
-    # action tags but still need the story floors (recorded by Door.build).
-    facade_story_tag = 200
-    facade_floor_zs = (128, 256)
-    target_tags = [facade_story_tag] + sorted(builder.get_extra_3d_floor_target_tags())
-    for tag in target_tags:
-        for z in facade_floor_zs:
-            builder.add_3d_floor_platform(
-                target_sector_tag=int(tag),
-                z=int(z),
-                thickness=16,
-                floor_tex="FLOOR4_8",
-                ceil_tex="CEIL3_5",
-                wall_tex="STONE2",
-                alpha=255,
-                flags=0,
-            )
-
-    # --- Facade windows: carve per-floor gaps (avoid one continuous slit) ---
-    # Window sectors that bridge from the story-tagged footprint to outdoor sky
-    # are tagged with a dedicated sector tag (allocated by Window.build).
-    # We fill most of each 128-high story with solid 3D floors, leaving a single
-    # 48-unit tall gap per story: [48..96] within each story.
-    facade_window_tag = int(builder.get_facade_window_sector_tag())
-    if facade_window_tag:
-        story_zs = (0, 128, 256)
-        for z0 in story_zs:
-            # Fill below the window gap.
-            builder.add_3d_floor_platform(
-                target_sector_tag=facade_window_tag,
-                z=int(z0),
-                thickness=48,
-                floor_tex="FLOOR4_8",
-                ceil_tex="CEIL3_5",
-                wall_tex="BROWN96",
-                alpha=255,
-                flags=0,
-            )
-            # Fill above the window gap.
-            builder.add_3d_floor_platform(
-                target_sector_tag=facade_window_tag,
-                z=int(z0 + 96),
-                thickness=32,
-                floor_tex="FLOOR4_8",
-                ceil_tex="CEIL3_5",
-                wall_tex="BROWN96",
-                alpha=255,
-                flags=0,
-            )
+    # --- Visual facade: 3D-floor stories on the main-floor wings ---
+    # (hybrid / 3dfloors stacking; see layout/stacking.py).
+    if generator.stacking.facade_3d_floors:
+        add_facade_3d_floors(builder)
 
     # Second floor is now implemented as a disconnected/off-map area connected
     # via line portals (so doors can be independent per floor).
@@ -92,16 +69,71 @@ def main():
     # Player start is handled by gameplay_populator (using generator's main gate spawn).
 
     # Always-visible debugging labels.
-    
-    # Write a raw UDMF map WAD. A nodebuilder (zdbsp) should post-process this into
-    # the final playable WAD.
-    output_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../build/py_hostel_full_raw.wad"))
-    print(f"Saving to {output_path}...")
+
+    return builder
+
+def stacking_report():
+    """Build every stacking strategy and print its sector/line/3D-floor/portal counts.
+
+    Selectable strategies are measured from their own builds. The hub row
+    (one map per floor, not selectable) combines a ground-floor-only build
+    with the upper floors' counts from the hybrid build.
+    """
+    costs = []
+    floors = None
+    for strategy in list(STRATEGIES.values()) + [HUB_GROUND]:
+        builder, generator = layout(strategy)
+        generator.level.build(builder)
+        if strategy.facade_3d_floors:
+            add_facade_3d_floors(builder)
+        cost = generator.stacking_cost(builder)
+        if strategy is HUB_GROUND:
+            cost = hub_cost(cost, floors)
+        elif floors is None and strategy.offmap_floors:
+            floors = generator.floor_costs(builder)
+        costs.append(cost)
+    print(COST_HEADER)
+    for cost in costs:
+        print(cost.summary())
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the hostel map WAD.")
+    parser.add_argument("--watch", action="store_true",
+                        help="stay resident and rebuild when src/python_generator or assets/ change")
+    parser.add_argument("--preview", nargs="?", const=PREVIEW_PREFIX, metavar="PREFIX",
+                        help="only lay out and populate, then write PREFIX.png/.svg (default build/preview) and exit")
+    parser.add_argument("--stacking", choices=sorted(STRATEGIES), default=None,
+                        help="floor-stacking strategy (default: H9_STACKING or hybrid)")
+    parser.add_argument("--stacking-report", action="store_true",
+                        help="build every stacking strategy, print its sector/line/3D-floor/portal counts and exit")
+    args = parser.parse_args()
+
+    if args.stacking:
+        # Through the environment so --watch rebuilds keep the strategy.
+        os.environ['H9_STACKING'] = args.stacking
+
+    if args.stacking_report:
+        stacking_report()
+        return
+
+    if args.preview:
+        builder, generator = layout()
+        stats = write_preview(generator.level, builder.things, args.preview)
+        print(f"{stats.summary()} -> {args.preview}.png/.svg")
+        return
+
+    if args.watch:
+        from watch import watch
+        watch(generate, OUTPUT_PATH)
+        return
+
+    builder = generate()
+    print(f"Saving to {OUTPUT_PATH}...")
     
     # Ensure build directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
     
-    builder.save(output_path)
+    builder.save(OUTPUT_PATH)
     print("Done.")
 
 if __name__ == "__main__":
@@ -0,0 +1,377 @@
+"""In-process lint pass over the UDMF model built by `WadBuilder.save()`.
+
+Checks that used to live in standalone scripts re-reading the built WAD (HOM
+lines, sky floors, portal links) run here on the in-memory `UMapEditor`
+before it is serialized:
+
+- `LintIndex` is built once (sector/line/side/tag/tid lookups) and shared by
+  every rule.
+- Rules subclass `LintRule` and implement any of `line()`, `sector()` and
+  `finish()`. The engine walks linedefs and sectors once, calling every rule's
+  hook per element, so adding a rule does not add another pass.
+- Issues carry the sector / line index (and UDMF line id where it has one),
+  matching what an editor shows.
+
+Enable per build with `save(..., lint="warn")` or `H9_LINT=warn` (`strict`
+raises on any error-severity issue). Extra rules can be registered with
+`register_rule()`.
+"""
+
+from __future__ import annotations
+
+# pyright: reportMissingImports=false
+
+import os
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+LINT_MODES = ('off', 'warn', 'strict')
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# Action specials whose arg0 is a sector tag.
+SECTOR_TAG_SPECIALS = frozenset({
+    10,    # Door_Close
+    11,    # Door_Open
+    12,    # Door_Raise
+    13,    # Door_LockedRaise
+    160,   # Sector_Set3dFloor
+})
+# Action specials whose arg0 is a thing TID.
+TID_SPECIALS = frozenset({
+    70,    # Teleport
+    71,    # Teleport_NoFog
+})
+LINE_PORTAL_SPECIAL = 156  # Line_SetPortal(targetline, thisline, type, planeanchor)
+SKY_FLAT = 'F_SKY1'
+
+
+def lint_mode_from_env(default: str = 'off') -> str:
+    """`H9_LINT`: off / warn / strict (`1`/`true` mean warn)."""
+    raw = str(os.environ.get('H9_LINT', '')).strip().lower()
+    if raw == '':
+        return default
+    if raw in ('0', 'false', 'no'):
+        return 'off'
+    if raw in ('1', 'true', 'yes', 'on'):
+        return 'warn'
+    if raw not in LINT_MODES:
+        raise ValueError(f"H9_LINT must be one of {', '.join(LINT_MODES)} (got {raw!r})")
+    return raw
+
+
+@dataclass(frozen=True)
+class LintIssue:
+    rule: str
+    severity: str
+    message: str
+    sector: Optional[int] = None
+    line: Optional[int] = None
+    # UDMF `id` of the line, when it has one (portal / control lines).
+    line_id: Optional[int] = None
+
+    def __str__(self) -> str:
+        where = []
+        if self.line is not None:
+            where.append(f"line {self.line}" + (f" (id {self.line_id})" if self.line_id is not None else ""))
+        if self.sector is not None:
+            where.append(f"sector {self.sector}")
+        suffix = f" [{', '.join(where)}]" if where else ""
+        return f"{self.severity.upper()} {self.rule}: {self.message}{suffix}"
+
+
+class LintIndex:
+    """Shared lookups over a `UMapEditor`, built in one pass per element type."""
+
+    def __init__(self, umap) -> None:
+        self.umap = umap
+        self.vertices = umap.vertexes
+        self.linedefs = umap.linedefs
+        self.sidedefs = umap.sidedefs
+        self.sectors = umap.sectors
+        self.things = umap.things
+
+        nsec = len(self.sectors)
+        nside = len(self.sidedefs)
+
+        # sidedef index -> sector index (-1 if out of range).
+        self.side_sector: list[int] = []
+        for sd in self.sidedefs:
+            s = _int(sd.sector, -1)
+            self.side_sector.append(s if 0 <= s < nsec else -1)
+
+        # Per line: (front sector, back sector); -1 for a missing side.
+        self.line_sectors: list[tuple[int, int]] = []
+        # sector index -> line indices bounding it.
+        self.sector_lines: list[list[int]] = [[] for _ in range(nsec)]
+        # UDMF line id -> line indices.
+        self.lines_by_id: dict[int, list[int]] = {}
+        # Sector tags / thing TIDs referenced by specials.
+        self.referenced_tags: set[int] = set()
+
+        for i, ld in enumerate(self.linedefs):
+            sf = _int(ld.sidefront, -1)
+            sb = _int(ld.sideback, -1)
+            fs = self.side_sector[sf] if 0 <= sf < nside else -1
+            bs = self.side_sector[sb] if 0 <= sb < nside else -1
+            self.line_sectors.append((fs, bs))
+            if fs >= 0:
+                self.sector_lines[fs].append(i)
+            if bs >= 0 and bs != fs:
+                self.sector_lines[bs].append(i)
+            lid = _int(ld.id, -1)
+            if lid >= 0:
+                self.lines_by_id.setdefault(lid, []).append(i)
+            special = _int(ld.special, 0)
+            if special in SECTOR_TAG_SPECIALS:
+                self.referenced_tags.add(_int(ld.arg0, 0))
+
+        self.sectors_by_tag: dict[int, list[int]] = {}
+        for i, sec in enumerate(self.sectors):
+            for tag in _sector_tags(sec):
+                self.sectors_by_tag.setdefault(tag, []).append(i)
+
+        self.thing_tids: set[int] = {_int(th.id, 0) for th in self.things}
+        self.thing_tids.discard(0)
+
+    def line_id(self, i: int) -> Optional[int]:
+        lid = _int(self.linedefs[i].id, -1)
+        return lid if lid >= 0 else None
+
+    def line_length2(self, i: int) -> float:
+        ld = self.linedefs[i]
+        a = self.vertices[_int(ld.v1, 0)]
+        b = self.vertices[_int(ld.v2, 0)]
+        dx = float(b.x) - float(a.x)
+        dy = float(b.y) - float(a.y)
+        return dx * dx + dy * dy
+
+
+def _int(value, default: int) -> int:
+    return default if value is None else int(value)
+
+
+def _sector_tags(sec) -> list[int]:
+    tags = []
+    tag = _int(sec.id, 0)
+    if tag:
+        tags.append(tag)
+    more = sec.moreids
+    if more:
+        tags.extend(int(t) for t in str(more).split() if t.strip('-').isdigit())
+    return tags
+
+
+def _missing_tex(tex) -> bool:
+    return tex is None or tex == '' or tex == '-'
+
+
+class LintRule:
+    """Base rule: override the hooks you need and call `self.report(...)`."""
+
+    name = 'rule'
+    severity = ERROR
+
+    def __init__(self) -> None:
+        self.issues: list[LintIssue] = []
+
+    def report(self, message: str, *, sector: Optional[int] = None, line: Optional[int] = None,
+               line_id: Optional[int] = None, severity: Optional[str] = None) -> None:
+        self.issues.append(LintIssue(self.name, severity or self.severity, message, sector, line, line_id))
+
+    def line(self, index: LintIndex, i: int, ld) -> None:
+        pass
+
+    def sector(self, index: LintIndex, i: int, sec) -> None:
+        pass
+
+    def finish(self, index: LintIndex) -> None:
+        pass
+
+
+class MissingSidesRule(LintRule):
+    """Lines / sides pointing at sidedefs, sectors or vertices that don't exist."""
+
+    name = 'dangling-refs'
+
+    def line(self, index: LintIndex, i: int, ld) -> None:
+        nv = len(index.vertices)
+        for key in ('v1', 'v2'):
+            v = _int(getattr(ld, key), -1)
+            if not 0 <= v < nv:
+                self.report(f"{key}={v} is not a vertex", line=i)
+        sf = _int(ld.sidefront, -1)
+        sb = _int(ld.sideback, -1)
+        nside = len(index.sidedefs)
+        if not 0 <= sf < nside:
+            self.report(f"sidefront={sf} is not a sidedef", line=i)
+        elif index.side_sector[sf] < 0:
+            self.report(f"front sidedef {sf} has no valid sector", line=i)
+        if sb != -1:
+            if not 0 <= sb < nside:
+                self.report(f"sideback={sb} is not a sidedef", line=i)
+            elif index.side_sector[sb] < 0:
+                self.report(f"back sidedef {sb} has no valid sector", line=i)
+
+
+class HomRule(LintRule):
+    """One-sided lines without a middle texture render as hall-of-mirrors."""
+
+    name = 'hom'
+
+    def line(self, index: LintIndex, i: int, ld) -> None:
+        if _int(ld.sideback, -1) != -1:
+            return
+        sf = _int(ld.sidefront, -1)
+        if not 0 <= sf < len(index.sidedefs):
+            return
+        if _missing_tex(index.sidedefs[sf].texturemiddle):
+            self.report("one-sided line has no middle texture", line=i, line_id=index.line_id(i),
+                        sector=index.line_sectors[i][0])
+
+
+class SkyFloorRule(LintRule):
+    """Sky on the floor renders the ground as sky (save() fixes sky/sky sectors)."""
+
+    name = 'sky-floor'
+
+    def sector(self, index: LintIndex, i: int, sec) -> None:
+        if sec.texturefloor == SKY_FLAT:
+            self.report(f"floor uses {SKY_FLAT}", sector=i)
+
+
+class ZeroHeightRule(LintRule):
+    """Inverted sectors, and closed sectors no action can ever open."""
+
+    name = 'zero-height'
+
+    def sector(self, index: LintIndex, i: int, sec) -> None:
+        floor = _int(sec.heightfloor, 0)
+        ceil = _int(sec.heightceiling, 0)
+        if ceil < floor:
+            self.report(f"ceiling {ceil} is below floor {floor}", sector=i)
+        elif ceil == floor:
+            # Closed doors start at zero height; anything a tagged special
+            # can move is fine.
+            if any(t in index.referenced_tags for t in _sector_tags(sec)):
+                return
+            self.report(f"zero-height sector at z={floor} that nothing opens", sector=i, severity=WARNING)
+
+
+class SpecialTargetRule(LintRule):
+    """Tagged specials must have something to act on."""
+
+    name = 'special-target'
+
+    def line(self, index: LintIndex, i: int, ld) -> None:
+        special = _int(ld.special, 0)
+        if special in SECTOR_TAG_SPECIALS:
+            tag = _int(ld.arg0, 0)
+            if tag and tag not in index.sectors_by_tag:
+                self.report(f"special {special} targets sector tag {tag}, which no sector has",
+                            line=i, line_id=index.line_id(i))
+        elif special in TID_SPECIALS:
+            tid = _int(ld.arg0, 0)
+            if tid and tid not in index.thing_tids:
+                self.report(f"special {special} targets TID {tid}, which no thing has",
+                            line=i, line_id=index.line_id(i))
+
+
+class PortalLinkRule(LintRule):
+    """Line_SetPortal lines must point at an existing, matching, reciprocal line."""
+
+    name = 'portal-link'
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._portals: list[int] = []
+
+    def line(self, index: LintIndex, i: int, ld) -> None:
+        if _int(ld.special, 0) == LINE_PORTAL_SPECIAL:
+            self._portals.append(i)
+
+    def finish(self, index: LintIndex) -> None:
+        for i in self._portals:
+            ld = index.linedefs[i]
+            lid = index.line_id(i)
+            target = _int(ld.arg0, 0)
+            hits = index.lines_by_id.get(target, [])
+            if not hits:
+                self.report(f"target line id {target} does not exist", line=i, line_id=lid)
+                continue
+            if len(hits) > 1:
+                self.report(f"target line id {target} is used by {len(hits)} lines", line=i, line_id=lid)
+            j = hits[0]
+            if j == i:
+                self.report("portal targets itself", line=i, line_id=lid)
+                continue
+            if abs(index.line_length2(i) - index.line_length2(j)) > 1e-6:
+                self.report(f"length differs from target line {j}", line=i, line_id=lid)
+            tgt = index.linedefs[j]
+            if _int(tgt.special, 0) == LINE_PORTAL_SPECIAL and _int(tgt.arg0, 0) != lid:
+                self.report(f"target line {j} points back at id {_int(tgt.arg0, 0)}, not {lid}",
+                            line=i, line_id=lid, severity=WARNING)
+
+
+DEFAULT_RULES: list[type[LintRule]] = [
+    MissingSidesRule,
+    HomRule,
+    SkyFloorRule,
+    ZeroHeightRule,
+    SpecialTargetRule,
+    PortalLinkRule,
+]
+
+
+def register_rule(rule: type[LintRule]) -> type[LintRule]:
+    """Add a rule to the default set (usable as a class decorator)."""
+    if rule not in DEFAULT_RULES:
+        DEFAULT_RULES.append(rule)
+    return rule
+
+
+def lint_umap(umap, rules: Optional[Iterable[type[LintRule]]] = None) -> list[LintIssue]:
+    """Run every rule over `umap` in one pass; returns issues in rule order."""
+    index = LintIndex(umap)
+    active = [cls() for cls in (DEFAULT_RULES if rules is None else rules)]
+
+    line_hooks = [r.line for r in active if type(r).line is not LintRule.line]
+    sector_hooks = [r.sector for r in active if type(r).sector is not LintRule.sector]
+
+    if line_hooks:
+        for i, ld in enumerate(index.linedefs):
+            for hook in line_hooks:
+                hook(index, i, ld)
+    if sector_hooks:
+        for i, sec in enumerate(index.sectors):
+            for hook in sector_hooks:
+                hook(index, i, sec)
+    for r in active:
+        r.finish(index)
+
+    issues: list[LintIssue] = []
+    for r in active:
+        issues.extend(r.issues)
+    return issues
+
+
+def report_lint(issues: list[LintIssue], *, mode: str, limit: int = 20) -> None:
+    """Print a summary; in `strict` mode raise if any error-severity issue exists."""
+    errors = [x for x in issues if x.severity == ERROR]
+    warnings = len(issues) - len(errors)
+    if not issues:
+        print("Lint: no issues.")
+        return
+    print(f"Lint: {len(errors)} error(s), {warnings} warning(s).")
+    by_rule: dict[str, int] = {}
+    for x in issues:
+        by_rule[x.rule] = by_rule.get(x.rule, 0) + 1
+    print("  " + ", ".join(f"{name}={n}" for name, n in by_rule.items()))
+    for x in issues[:limit]:
+        print(f"  {x}")
+    if len(issues) > limit:
+        print(f"  ... {len(issues) - limit} more")
+    if mode == 'strict' and errors:
+        raise RuntimeError(f"Map lint failed with {len(errors)} error(s); first: {errors[0]}")
@@ -0,0 +1,137 @@
+"""Spatial (Morton / Z-order) reordering of the UDMF model before it is written.
+
+Generation order interleaves far-apart geometry (the West Wing, the F3
+off-map copy, the 3D-floor control grid), so consecutive linedefs and
+sectors jump across the map. `morton_reorder()` sorts:
+
+- vertices by position,
+- linedefs by midpoint,
+- sectors by the centre of their bounding box (from the lines that bound them),
+- things by position,
+
+along a Z-order curve, then lays sidedefs out in the new line order (front,
+then back). Every index reference (line -> vertex/side, side -> sector) is
+remapped. Line ids, sector tags and TIDs are values, not indices, so the
+portal / 3D-floor / teleport post-processing that matches on them is unaffected.
+
+Off by default; enable with `save(..., reorder=True)` or `H9_MORTON=1`.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ReorderResult:
+    # old index -> new index for each element list.
+    sector_map: list[int]
+    line_map: list[int]
+    side_map: list[int]
+    vertex_map: list[int]
+    thing_map: list[int]
+
+
+def morton_from_env() -> bool:
+    return str(os.environ.get('H9_MORTON', '')).strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+def _spread16(v: int) -> int:
+    """Put the low 16 bits of `v` on the even bit positions."""
+    v &= 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def morton_key(x: float, y: float) -> int:
+    """Z-order key of a map coordinate (signed 16-bit range, clamped)."""
+    ix = min(0xFFFF, max(0, int(x) + 0x8000))
+    iy = min(0xFFFF, max(0, int(y) + 0x8000))
+    return _spread16(ix) | (_spread16(iy) << 1)
+
+
+def _order(keys: list[int]) -> list[int]:
+    """Old indices sorted by key (ties keep generation order)."""
+    return sorted(range(len(keys)), key=keys.__getitem__)
+
+
+def _inverse(order: list[int]) -> list[int]:
+    out = [0] * len(order)
+    for new, old in enumerate(order):
+        out[old] = new
+    return out
+
+
+def morton_reorder(umap) -> ReorderResult:
+    """Reorder `umap` (a `UMapEditor`) in place."""
+    vertexes = umap.vertexes
+    linedefs = umap.linedefs
+    sidedefs = umap.sidedefs
+    sectors = umap.sectors
+    things = umap.things
+
+    vx = [float(v.x) for v in vertexes]
+    vy = [float(v.y) for v in vertexes]
+
+    vertex_order = _order([morton_key(vx[i], vy[i]) for i in range(len(vertexes))])
+
+    line_keys = []
+    inf = float('inf')
+    sec_box = [[inf, inf, -inf, -inf] for _ in sectors]
+    for ld in linedefs:
+        a, b = int(ld.v1), int(ld.v2)
+        line_keys.append(morton_key((vx[a] + vx[b]) * 0.5, (vy[a] + vy[b]) * 0.5))
+        for s in (ld.sidefront, ld.sideback):
+            if s is None or int(s) < 0:
+                continue
+            sec = int(sidedefs[int(s)].sector)
+            box = sec_box[sec]
+            box[0] = min(box[0], vx[a], vx[b])
+            box[1] = min(box[1], vy[a], vy[b])
+            box[2] = max(box[2], vx[a], vx[b])
+            box[3] = max(box[3], vy[a], vy[b])
+    line_order = _order(line_keys)
+
+    sector_order = _order([
+        morton_key((box[0] + box[2]) * 0.5, (box[1] + box[3]) * 0.5) if box[0] <= box[2] else 0
+        for box in sec_box
+    ])
+    thing_order = _order([morton_key(float(th.x), float(th.y)) for th in things])
+
+    vertex_map = _inverse(vertex_order)
+    line_map = _inverse(line_order)
+    sector_map = _inverse(sector_order)
+    thing_map = _inverse(thing_order)
+
+    # Sidedefs follow the new line order; unreferenced sides go last.
+    side_order: list[int] = []
+    seen = [False] * len(sidedefs)
+    for j in line_order:
+        ld = linedefs[j]
+        for s in (ld.sidefront, ld.sideback):
+            if s is not None and int(s) >= 0 and not seen[int(s)]:
+                seen[int(s)] = True
+                side_order.append(int(s))
+    side_order.extend(i for i in range(len(sidedefs)) if not seen[i])
+    side_map = _inverse(side_order)
+
+    for ld in linedefs:
+        ld.v1 = vertex_map[int(ld.v1)]
+        ld.v2 = vertex_map[int(ld.v2)]
+        ld.sidefront = side_map[int(ld.sidefront)]
+        if ld.sideback is not None and int(ld.sideback) >= 0:
+            ld.sideback = side_map[int(ld.sideback)]
+    for sd in sidedefs:
+        sd.sector = sector_map[int(sd.sector)]
+
+    umap.vertexes[:] = [vertexes[i] for i in vertex_order]
+    umap.linedefs[:] = [linedefs[i] for i in line_order]
+    umap.sidedefs[:] = [sidedefs[i] for i in side_order]
+    umap.sectors[:] = [sectors[i] for i in sector_order]
+    umap.things[:] = [things[i] for i in thing_order]
+
+    return ReorderResult(sector_map, line_map, side_map, vertex_map, thing_map)
@@ -0,0 +1,277 @@
+"""Post-build geometry simplifier for the UDMF model built by `WadBuilder.save()`.
+
+The generator draws one sector per room/strip/window box and a vertex at every
+connector cut, so many neighbouring pieces end up indistinguishable in the
+final map. This pass removes that redundancy before the map is written:
+
+1. Sector merge: two sectors joined by a plain two-sided line (no special, no
+   line id, no flag but `twosided`, no middle texture on either side) are merged when every sector
+   field matches (heights, flats, light, tag/moreids, special). Lines that end
+   up with the same sector on both sides are dropped.
+2. Collinear fuse: a vertex used by exactly two plain lines that continue in
+   a straight line, with identical line fields and identical sidedefs, is
+   removed and the two lines become one. Texture runs become continuous across
+   the removed vertex, which is what a mapper would draw by hand.
+3. Compaction: removed lines/sides/sectors and unused vertices are dropped
+   and every index is remapped; `SimplifyResult` carries the old -> new maps
+   (-1 = removed) so callers such as the provenance table can follow along.
+
+Off by default; enable with `save(..., simplify=True)` or `H9_SIMPLIFY=1`.
+"""
+
+from __future__ import annotations
+
+# pyright: reportMissingImports=false
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SimplifyResult:
+    sectors_before: int
+    sectors_after: int
+    lines_before: int
+    lines_after: int
+    sides_before: int
+    sides_after: int
+    vertices_before: int
+    vertices_after: int
+    # old index -> new index, -1 where the element was removed.
+    sector_map: list[int]
+    line_map: list[int]
+    side_map: list[int]
+    vertex_map: list[int]
+
+    def summary(self) -> str:
+        return (
+            f"sectors {self.sectors_before} -> {self.sectors_after}, "
+            f"lines {self.lines_before} -> {self.lines_after}, "
+            f"sides {self.sides_before} -> {self.sides_after}, "
+            f"vertices {self.vertices_before} -> {self.vertices_after}"
+        )
+
+
+def simplify_from_env() -> bool:
+    return str(os.environ.get('H9_SIMPLIFY', '')).strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+# Fields that say where a line/side sits rather than what it looks like.
+_LINE_TOPOLOGY = ('v1', 'v2', 'sidefront', 'sideback')
+_SIDE_TOPOLOGY = ('sector',)
+
+
+def _int(value, default: int) -> int:
+    return default if value is None else int(value)
+
+
+def _fields(block, skip: tuple[str, ...]) -> tuple:
+    return tuple(sorted((k, v) for k, v in block.__dict__.items() if k not in skip and v is not None))
+
+
+def _missing_tex(tex) -> bool:
+    return tex is None or tex == '' or tex == '-'
+
+
+def _is_plain_line(ld) -> bool:
+    # Classic -> UDMF conversion copies the Doom tag into `id`, so untagged
+    # lines carry id 0 rather than the UDMF default of -1.
+    return _int(ld.special, 0) == 0 and _int(ld.id, -1) in (-1, 0) and not ld.moreids
+
+
+# Line fields the sector-merge test handles itself (see `_is_open_line`).
+_LINE_MERGE_SKIP = _LINE_TOPOLOGY + ('special', 'id', 'moreids', 'twosided')
+
+
+def _is_open_line(ld) -> bool:
+    # A sector-merge line is deleted, so any flag on it (blocking,
+    # blocksound, jumpover, ...) would be lost with it.
+    return _is_plain_line(ld) and not any(v for _k, v in _fields(ld, _LINE_MERGE_SKIP))
+
+
+class _UnionFind:
+    __slots__ = ('parent',)
+
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+
+    def find(self, a: int) -> int:
+        parent = self.parent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def union(self, a: int, b: int) -> None:
+        ra = self.find(a)
+        rb = self.find(b)
+        if ra != rb:
+            # Keep the lower index as the representative (stable output order).
+            if rb < ra:
+                ra, rb = rb, ra
+            self.parent[rb] = ra
+
+
+def simplify_umap(umap) -> SimplifyResult:
+    """Simplify `umap` (a `UMapEditor`) in place."""
+    vertexes = umap.vertexes
+    linedefs = umap.linedefs
+    sidedefs = umap.sidedefs
+    sectors = umap.sectors
+
+    nv, nl, nd, ns = len(vertexes), len(linedefs), len(sidedefs), len(sectors)
+    side_sector = [_int(sd.sector, -1) for sd in sidedefs]
+
+    dead_line = [False] * nl
+    dead_side = [False] * nd
+
+    # --- 1. Sector merge ---
+    sector_key = [_fields(sec, ()) for sec in sectors]
+    uf = _UnionFind(ns)
+    for ld in linedefs:
+        sf = _int(ld.sidefront, -1)
+        sb = _int(ld.sideback, -1)
+        if sf < 0 or sb < 0 or not _is_open_line(ld):
+            continue
+        a = side_sector[sf]
+        b = side_sector[sb]
+        if a < 0 or b < 0 or a == b or sector_key[a] != sector_key[b]:
+            continue
+        if not (_missing_tex(sidedefs[sf].texturemiddle) and _missing_tex(sidedefs[sb].texturemiddle)):
+            continue
+        uf.union(a, b)
+
+    merged_sector = [uf.find(i) for i in range(ns)]
+    orig_side_sector = side_sector
+    side_sector = [merged_sector[s] if s >= 0 else s for s in orig_side_sector]
+
+    for j, ld in enumerate(linedefs):
+        sf = _int(ld.sidefront, -1)
+        sb = _int(ld.sideback, -1)
+        if sf < 0 or sb < 0:
+            continue
+        # Only drop lines that became internal through a merge; a line drawn
+        # with the same sector on both sides was intentional.
+        if orig_side_sector[sf] != orig_side_sector[sb] and side_sector[sf] == side_sector[sb]:
+            dead_line[j] = True
+            dead_side[sf] = True
+            dead_side[sb] = True
+
+    # --- 2. Collinear fuse ---
+    incident: list[list[int]] = [[] for _ in range(nv)]
+    for j, ld in enumerate(linedefs):
+        if dead_line[j]:
+            continue
+        incident[_int(ld.v1, 0)].append(j)
+        incident[_int(ld.v2, 0)].append(j)
+
+    line_key = [_fields(ld, _LINE_TOPOLOGY) if _is_plain_line(ld) else None for ld in linedefs]
+    side_key = [_fields(sd, _SIDE_TOPOLOGY) + (('sector', side_sector[i]),) for i, sd in enumerate(sidedefs)]
+
+    def sides_match(s1: int, s2: int) -> bool:
+        if s1 < 0 or s2 < 0:
+            return s1 == s2
+        return side_key[s1] == side_key[s2]
+
+    for v in range(nv):
+        inc = incident[v]
+        if len(inc) != 2:
+            continue
+        j1, j2 = inc
+        if j1 == j2 or dead_line[j1] or dead_line[j2]:
+            continue
+        l1 = linedefs[j1]
+        l2 = linedefs[j2]
+        if line_key[j1] is None or line_key[j1] != line_key[j2]:
+            continue
+        # Orient so that l1 ends at v and l2 starts at v.
+        if _int(l1.v2, -1) != v:
+            j1, j2 = j2, j1
+            l1, l2 = l2, l1
+        if _int(l1.v2, -1) != v or _int(l2.v1, -1) != v:
+            # Opposite directions: the sides would swap; leave it.
+            continue
+        a = _int(l1.v1, -1)
+        b = _int(l2.v2, -1)
+        if a == b:
+            continue
+        if not sides_match(_int(l1.sidefront, -1), _int(l2.sidefront, -1)):
+            continue
+        if not sides_match(_int(l1.sideback, -1), _int(l2.sideback, -1)):
+            continue
+        va, vv, vb = vertexes[a], vertexes[v], vertexes[b]
+        ax, ay = float(va.x), float(va.y)
+        dx1, dy1 = float(vv.x) - ax, float(vv.y) - ay
+        dx2, dy2 = float(vb.x) - float(vv.x), float(vb.y) - float(vv.y)
+        if dx1 * dy2 - dy1 * dx2 != 0 or dx1 * dx2 + dy1 * dy2 <= 0:
+            continue
+
+        # l1 now spans a -> b; l2 and its sides go away.
+        l1.v2 = b
+        dead_line[j2] = True
+        for s in (_int(l2.sidefront, -1), _int(l2.sideback, -1)):
+            if s >= 0:
+                dead_side[s] = True
+        incident[v] = []
+        incident[b] = [j1 if j == j2 else j for j in incident[b]]
+
+    # --- 3. Compaction ---
+    line_map = _compact_map(dead_line)
+    side_map = _compact_map(dead_side)
+    sector_map = _compact_map([merged_sector[i] != i for i in range(ns)])
+
+    used_vertex = [False] * nv
+    for j, ld in enumerate(linedefs):
+        if not dead_line[j]:
+            used_vertex[_int(ld.v1, 0)] = True
+            used_vertex[_int(ld.v2, 0)] = True
+    vertex_map = _compact_map([not u for u in used_vertex])
+
+    new_vertexes = [vertexes[i] for i in range(nv) if vertex_map[i] >= 0]
+    new_sidedefs = []
+    for i, sd in enumerate(sidedefs):
+        if side_map[i] < 0:
+            continue
+        sd.sector = sector_map[side_sector[i]] if side_sector[i] >= 0 else sd.sector
+        new_sidedefs.append(sd)
+    new_linedefs = []
+    for j, ld in enumerate(linedefs):
+        if line_map[j] < 0:
+            continue
+        ld.v1 = vertex_map[_int(ld.v1, 0)]
+        ld.v2 = vertex_map[_int(ld.v2, 0)]
+        ld.sidefront = side_map[_int(ld.sidefront, 0)]
+        sb = _int(ld.sideback, -1)
+        ld.sideback = side_map[sb] if sb >= 0 else -1
+        new_linedefs.append(ld)
+    new_sectors = [sectors[i] for i in range(ns) if sector_map[i] >= 0]
+
+    # Merged-away sectors map to their representative's new index.
+    for i in range(ns):
+        if sector_map[i] < 0:
+            sector_map[i] = sector_map[merged_sector[i]]
+
+    umap.vertexes[:] = new_vertexes
+    umap.sidedefs[:] = new_sidedefs
+    umap.linedefs[:] = new_linedefs
+    umap.sectors[:] = new_sectors
+
+    return SimplifyResult(
+        ns, len(new_sectors),
+        nl, len(new_linedefs),
+        nd, len(new_sidedefs),
+        nv, len(new_vertexes),
+        sector_map, line_map, side_map, vertex_map,
+    )
+
+
+def _compact_map(dead: list[bool]) -> list[int]:
+    out: list[int] = []
+    n = 0
+    for d in dead:
+        if d:
+            out.append(-1)
+        else:
+            out.append(n)
+            n += 1
+    return out
@@ -4,7 +4,22 @@ from .element import Element
 if TYPE_CHECKING:
     from .geometry import Room
 
+def _room_boundary_lines(builder, room: 'Room'):
+    """Linedef indices on `room`'s boundary, in editor order.
+
+    Uses the room's draw_polygon handles from `builder.provenance` (every
+    boundary segment is one of the room polygon's edges, merged or not).
+    Falls back to every linedef when the room was drawn outside `owned_by`.
+    """
+    handles = builder.provenance.handles_of(room)
+    if not handles:
+        return range(len(builder.editor.linedefs))
+    return sorted({j for h in handles for j in h.lines})
+
+
 class Connector(Element):
+    __slots__ = ('width', 'height', 'room1', 'room2')
+
     def __init__(self, x: int, y: int, width: int, height: int, room1: Optional['Room'], room2: Optional['Room'] = None) -> None:
         super().__init__(x, y)
         self.width = width
@@ -41,6 +56,8 @@ class Connector(Element):
             room.add_cut('bottom', (self.x + self.width) - room.x)
 
 class Door(Connector):
+    __slots__ = ('texture', 'state', 'tag', 'linedef_action', 'light', 'secret')
+
     def __init__(self, x, y, width, height, room1, room2, texture="BIGDOOR2", state='closed', tag=0, linedef_action=1, light: int | None = None, secret: bool = False):
         super().__init__(x, y, width, height, room1, room2)
         self.texture = texture
@@ -62,9 +79,6 @@ class Door(Connector):
         if self.state == 'open':
             ceil_h = base_floor + 128
         
-        # Capture the sector index before drawing (it will be the next one appended)
-        door_sector_index = len(builder.editor.sectors)
-
         # Doors must be operable from either side. To avoid depending on linedef
         # front/back orientation, we assign the door sector a (usually unique)
         # tag and have the door linedefs target that tag.
@@ -92,7 +106,7 @@ class Door(Connector):
             (self.x, self.y + self.height)
         ]
         
-        builder.draw_polygon(points, 
+        handle = builder.draw_polygon(points, 
                              floor_tex="FLOOR4_8", 
                              ceil_tex="FLAT20", # Door ceiling
                              wall_tex="DOORTRAK", # Side walls
@@ -101,8 +115,11 @@ class Door(Connector):
                              light=(int(self.light) if self.light is not None else 160),
                              tag=door_sector_tag) # Closed or Open
                              
-        # Iterate ALL linedefs to find those belonging to this door
-        for ld in builder.editor.linedefs:
+        door_sector_index = handle.sector
+
+        # Only the door polygon's own edges can touch the door sector.
+        for j in handle.touching_lines():
+            ld = builder.editor.linedefs[j]
             # Check if this linedef is connected to the door sector
             front_sector = builder.editor.sidedefs[ld.front].sector
             back_sector = -1
@@ -139,6 +156,8 @@ class Door(Connector):
                 pass
 
 class Switch(Element):
+    __slots__ = ('action', 'tag', 'room', 'room2', 'width', 'height')
+
     def __init__(self, x: int, y: int, action: int, tag: int, room: Optional['Room'] = None, room2: Optional['Room'] = None) -> None:
         super().__init__(x, y)
         self.action = action
@@ -184,15 +203,12 @@ class Switch(Element):
             (self.x, self.y + height)
         ]
         
-        builder.draw_polygon(points, 
+        handle = builder.draw_polygon(points, 
                              floor_tex="FLOOR4_8", 
                              ceil_tex="CEIL3_5", 
                              wall_tex="SW1STRTN", # Switch texture
                              floor_height=0, 
                              ceil_height=64)
-                             
-        # Find the sector (last one)
-        sector_index = len(builder.editor.sectors) - 1
         
         # Identify the "Back" face of the switch (where the texture should be).
         # The switch is a niche. The "Back" is the wall furthest from the room it faces.
@@ -219,101 +235,105 @@ class Switch(Element):
         
         opening_room = self.room2 if self.room2 else self.room
         
-        for ld in builder.editor.linedefs:
-            if builder.editor.sidedefs[ld.front].sector == sector_index:
-                ld.action = self.action
-                ld.tag = self.tag
-                
-                # Check if this line connects to the opening room
-                is_opening = False
-                if opening_room:
-                    # Check if line vertices match opening room edge
-                    # This is hard to check directly without geometric math.
-                    # Instead, check the back sector.
-                    if ld.back != 0xFFFF:
-                        back_sector_idx = builder.editor.sidedefs[ld.back].sector
-                        # We don't easily know the sector index of opening_room here because it might have been created earlier.
-                        # But we can check if the line is 2-sided.
-                        
-                        # If it is 2-sided, it's likely the opening OR the backing (if backing is also a sector like Outside).
-                        # If it's the opening to the Lawn (Ceil 256), we definitely don't want a Mid Texture blocking it.
-                        # If it's the backing to Outside (Ceil 256), we DO want a Mid Texture (to make it look like a wall).
-                        
-                        # How to distinguish?
-                        # The Opening is usually "open" (passable).
-                        # The Backing is usually "closed" (blocking).
-                        # But here both are just sectors.
-                        
-                        # Let's use the geometric position.
-                        # Gate Switches: y=-16. Opening is Top (North, y=0). Back is Bottom (South, y=-16).
-                        # Mess Hall Switch: y=... Opening is Bottom (South). Back is Top (North).
-                        
-                        # We can infer orientation from the "room" argument?
-                        # If room is "Outside", that's the backing.
-                        # If room2 is "Lawn", that's the opening.
-                        
-                        pass
-                
-                # Apply texture logic:
-                # If it's a 2-sided line, we generally DON'T want a mid texture unless it's a solid wall.
-                # But for the Switch Back, we DO want it.
-                # For the Switch Opening, we DON'T.
-                
-                # Hack: For now, let's just clear the mid texture on the North face for Gate Switches?
-                # Gate Switches are at y=-16. North face is at y=0.
-                # Mess Hall Switch is at y=... North of corridor.
-                
-                # Better: Check if the line is on the boundary of the "opening room".
-                # If the line is shared with `self.room2` (Lawn), clear texture.
-                # If the line is shared with `self.room` (Outside), keep texture.
-                
-                # We need to know which sector index corresponds to which room.
-                # We can't easily know that.
-                
-                # Alternative: Use the coordinates.
-                # Gate Switches: Opening is at y = self.y + self.height.
-                # Mess Hall Switch: Opening is at y = self.y.
-                
-                # Let's assume the "Opening" is the side that touches the room with the higher ceiling?
-                # Or just clear Mid Texture if the back sector has a high ceiling?
-                # No, Outside also has high ceiling.
-                
-                # Let's use the `room2` argument as the "Opening Room".
-                # If `room2` is provided, any line touching `room2` is an opening.
-                
-                is_opening_face = False
-                if self.room2:
-                    # Check if this line is shared with room2
-                    # We can check if the line segment is on the edge of room2
-                    v1 = builder.editor.vertexes[ld.vx_a]
-                    v2 = builder.editor.vertexes[ld.vx_b]
+        # Lines whose front side faces the switch sector are exactly the ones
+        # this polygon created.
+        for j in handle.new_lines:
+            ld = builder.editor.linedefs[j]
+            ld.action = self.action
+            ld.tag = self.tag
+            
+            # Check if this line connects to the opening room
+            is_opening = False
+            if opening_room:
+                # Check if line vertices match opening room edge
+                # This is hard to check directly without geometric math.
+                # Instead, check the back sector.
+                if ld.back != 0xFFFF:
+                    back_sector_idx = builder.editor.sidedefs[ld.back].sector
+                    # We don't easily know the sector index of opening_room here because it might have been created earlier.
+                    # But we can check if the line is 2-sided.
                     
-                    # Check if v1 and v2 are on the boundary of room2
-                    # (Simple AABB check or exact edge check)
-                    # room2.x, room2.y, room2.width, room2.height
+                    # If it is 2-sided, it's likely the opening OR the backing (if backing is also a sector like Outside).
+                    # If it's the opening to the Lawn (Ceil 256), we definitely don't want a Mid Texture blocking it.
+                    # If it's the backing to Outside (Ceil 256), we DO want a Mid Texture (to make it look like a wall).
                     
-                    # Check if both vertices are on the same edge of room2
-                    on_left = (v1.x == self.room2.x and v2.x == self.room2.x)
-                    on_right = (v1.x == self.room2.x + self.room2.width and v2.x == self.room2.x + self.room2.width)
-                    on_top = (v1.y == self.room2.y + self.room2.height and v2.y == self.room2.y + self.room2.height)
-                    on_bottom = (v1.y == self.room2.y and v2.y == self.room2.y)
+                    # How to distinguish?
+                    # The Opening is usually "open" (passable).
+                    # The Backing is usually "closed" (blocking).
+                    # But here both are just sectors.
+                    
+                    # Let's use the geometric position.
+                    # Gate Switches: y=-16. Opening is Top (North, y=0). Back is Bottom (South, y=-16).
+                    # Mess Hall Switch: y=... Opening is Bottom (South). Back is Top (North).
+                    
+                    # We can infer orientation from the "room" argument?
+                    # If room is "Outside", that's the backing.
+                    # If room2 is "Lawn", that's the opening.
                     
-                    if on_left or on_right or on_top or on_bottom:
-                        is_opening_face = True
-                
-                if is_opening_face:
-                    builder.editor.sidedefs[ld.front].tx_mid = "-"
-                    if ld.back != 0xFFFF:
-                        builder.editor.sidedefs[ld.back].tx_mid = "-"
-                else:
-                    # It's a wall or the back of the switch.
-                    builder.editor.sidedefs[ld.front].tx_mid = "SW1STRTN"
-                    # If it's 2-sided (backing to Outside), we need to ensure it blocks?
-                    # Or just has the texture.
-                    # If it has the texture, it will look like a wall.
                     pass
+            
+            # Apply texture logic:
+            # If it's a 2-sided line, we generally DON'T want a mid texture unless it's a solid wall.
+            # But for the Switch Back, we DO want it.
+            # For the Switch Opening, we DON'T.
+            
+            # Hack: For now, let's just clear the mid texture on the North face for Gate Switches?
+            # Gate Switches are at y=-16. North face is at y=0.
+            # Mess Hall Switch is at y=... North of corridor.
+            
+            # Better: Check if the line is on the boundary of the "opening room".
+            # If the line is shared with `self.room2` (Lawn), clear texture.
+            # If the line is shared with `self.room` (Outside), keep texture.
+            
+            # We need to know which sector index corresponds to which room.
+            # We can't easily know that.
+            
+            # Alternative: Use the coordinates.
+            # Gate Switches: Opening is at y = self.y + self.height.
+            # Mess Hall Switch: Opening is at y = self.y.
+            
+            # Let's assume the "Opening" is the side that touches the room with the higher ceiling?
+            # Or just clear Mid Texture if the back sector has a high ceiling?
+            # No, Outside also has high ceiling.
+            
+            # Let's use the `room2` argument as the "Opening Room".
+            # If `room2` is provided, any line touching `room2` is an opening.
+            
+            is_opening_face = False
+            if self.room2:
+                # Check if this line is shared with room2
+                # We can check if the line segment is on the edge of room2
+                v1 = builder.editor.vertexes[ld.vx_a]
+                v2 = builder.editor.vertexes[ld.vx_b]
+                
+                # Check if v1 and v2 are on the boundary of room2
+                # (Simple AABB check or exact edge check)
+                # room2.x, room2.y, room2.width, room2.height
+                
+                # Check if both vertices are on the same edge of room2
+                on_left = (v1.x == self.room2.x and v2.x == self.room2.x)
+                on_right = (v1.x == self.room2.x + self.room2.width and v2.x == self.room2.x + self.room2.width)
+                on_top = (v1.y == self.room2.y + self.room2.height and v2.y == self.room2.y + self.room2.height)
+                on_bottom = (v1.y == self.room2.y and v2.y == self.room2.y)
+                
+                if on_left or on_right or on_top or on_bottom:
+                    is_opening_face = True
+            
+            if is_opening_face:
+                builder.editor.sidedefs[ld.front].tx_mid = "-"
+                if ld.back != 0xFFFF:
+                    builder.editor.sidedefs[ld.back].tx_mid = "-"
+            else:
+                # It's a wall or the back of the switch.
+                builder.editor.sidedefs[ld.front].tx_mid = "SW1STRTN"
+                # If it's 2-sided (backing to Outside), we need to ensure it blocks?
+                # Or just has the texture.
+                # If it has the texture, it will look like a wall.
+                pass
 
 class Window(Connector):
+    __slots__ = ('sill_height', 'window_height', 'floor_tex', 'ceil_tex', 'wall_tex', 'light', 'mid_tex', 'facade_mode')
+
     def __init__(
         self,
         x,
@@ -349,8 +369,6 @@ class Window(Connector):
         # Floor = Sill Height
         # Ceiling = Sill Height + Window Height
         
-        window_sector_index = len(builder.editor.sectors)
-        
         points = [
             (self.x, self.y),
             (self.x + self.width, self.y),
@@ -419,7 +437,7 @@ class Window(Connector):
             win_floor = int(base_floor + self.sill_height)
             win_ceil = int(base_floor + self.sill_height + self.window_height)
 
-        builder.draw_polygon(points, 
+        handle = builder.draw_polygon(points, 
                              floor_tex=self.floor_tex, 
                              ceil_tex=self.ceil_tex, 
                              wall_tex=self.wall_tex, # Side walls (jambs)
@@ -428,8 +446,11 @@ class Window(Connector):
                              light=(int(self.light) if self.light is not None else 160),
                              tag=window_tag)
                              
-        # Iterate ALL linedefs to find those belonging to this window
-        for ld in builder.editor.linedefs:
+        window_sector_index = handle.sector
+
+        # Only the window polygon's own edges can touch the window sector.
+        for j in handle.touching_lines():
+            ld = builder.editor.linedefs[j]
             front_sector = builder.editor.sidedefs[ld.front].sector
             back_sector = -1
             if ld.back != 0xFFFF:
@@ -482,6 +503,8 @@ class WallSign(Connector):
       the mid texture (and offsets) to the sign texture.
     """
 
+    __slots__ = ('room', 'side', 'offset', 'span', 'texture', 'off_x', 'off_y', 'lower_unpeg')
+
     def __init__(
         self,
         *,
@@ -540,7 +563,8 @@ class WallSign(Connector):
         def _overlap_1d(a0: int, a1: int, b0: int, b1: int) -> bool:
             return max(min(a0, a1), min(b0, b1)) < min(max(a0, a1), max(b0, b1))
 
-        for ld in builder.editor.linedefs:
+        for j in _room_boundary_lines(builder, r):
+            ld = builder.editor.linedefs[j]
             v1 = builder.editor.vertexes[ld.vx_a]
             v2 = builder.editor.vertexes[ld.vx_b]
             (x_a, y_a) = _v_xy(v1)
@@ -581,6 +605,8 @@ class ExitLine(Connector):
     - Sets the linedef action (Doom format 11) and optionally a visible texture.
     """
 
+    __slots__ = ('room', 'side', 'offset', 'span', 'texture')
+
     def __init__(
         self,
         *,
@@ -633,7 +659,8 @@ class ExitLine(Connector):
         def _overlap_1d(a0: int, a1: int, b0: int, b1: int) -> bool:
             return max(min(a0, a1), min(b0, b1)) < min(max(a0, a1), max(b0, b1))
 
-        for ld in builder.editor.linedefs:
+        for j in _room_boundary_lines(builder, r):
+            ld = builder.editor.linedefs[j]
             # Only apply to one-sided boundary walls.
             if getattr(ld, 'back', 0xFFFF) != 0xFFFF:
                 continue
@@ -665,6 +692,8 @@ class ExitLine(Connector):
 
 
 class Portal(Connector):
+    __slots__ = ('source_line_id', 'target_line_id', 'type', 'planeanchor', 'floor_tex', 'ceil_tex', 'wall_tex')
+
     def __init__(
         self,
         x,
@@ -693,8 +722,6 @@ class Portal(Connector):
 
     def build(self, builder):
         # Create a simple passable connector sector between room1 and room2.
-        portal_sector_index = len(builder.editor.sectors)
-
         points = [
             (self.x, self.y),
             (self.x + self.width, self.y),
@@ -714,7 +741,7 @@ class Portal(Connector):
         if c1 is not None or c2 is not None:
             ceil_h = max(int(c1 or 0), int(c2 or 0))
 
-        builder.draw_polygon(
+        handle = builder.draw_polygon(
             points,
             floor_tex=self.floor_tex,
             ceil_tex=self.ceil_tex,
@@ -722,6 +749,8 @@ class Portal(Connector):
             floor_height=int(base_floor),
             ceil_height=int(ceil_h),
         )
+        portal_sector_index = handle.sector
+        portal_lines = handle.touching_lines()
 
         # Tag exactly one linedef between room1 and the portal sector so it becomes
         # a line portal source after UDMF conversion.
@@ -759,7 +788,8 @@ class Portal(Connector):
             min_y = int(min(ay, by))
             max_y = int(max(ay, by))
 
-            for ld in builder.editor.linedefs:
+            for j in portal_lines:
+                ld = builder.editor.linedefs[j]
                 if ld.back == 0xFFFF:
                     continue
 
@@ -795,7 +825,8 @@ class Portal(Connector):
 
         if not tagged:
             # Fallback: tag the first two-sided boundary line that touches the portal sector.
-            for ld in builder.editor.linedefs:
+            for j in portal_lines:
+                ld = builder.editor.linedefs[j]
                 if ld.back == 0xFFFF:
                     continue
                 front_sector = builder.editor.sidedefs[ld.front].sector
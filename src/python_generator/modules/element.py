@@ -1,4 +1,9 @@
 class Element:
+    # Generated layouts hold thousands of rooms/connectors; slots keep each
+    # instance compact (no per-instance __dict__) and speed up attribute access
+    # in the build loops. Subclasses must declare their own `__slots__`.
+    __slots__ = ('x', 'y')
+
     def __init__(self, x: int, y: int) -> None:
         self.x = x
         self.y = y
@@ -1,6 +1,27 @@
 from .element import Element
 
+# Cut lists are indexed by side. Most rooms only ever get cuts on one or two
+# sides (and many get none), so per-side lists are allocated on first use.
+_CUT_SIDES = ('top', 'bottom', 'left', 'right')
+_CUT_SIDE_INDEX = {side: i for i, side in enumerate(_CUT_SIDES)}
+
+
 class Room(Element):
+    __slots__ = (
+        'width',
+        'height',
+        'floor_tex',
+        'wall_tex',
+        'ceil_tex',
+        'floor_height',
+        'ceil_height',
+        'tag',
+        'special',
+        'light',
+        '_cuts',
+        '_furniture',
+    )
+
     def __init__(
         self,
         x: int,
@@ -27,14 +48,23 @@ class Room(Element):
         self.tag = tag
         self.special = int(special) if special else 0
         self.light = int(light)
-        self.cuts = {
-            'top': [],
-            'bottom': [],
-            'left': [],
-            'right': []
+        # None until the first cut/furniture item is registered.
+        self._cuts: list | None = None
+        self._furniture: list | None = None
+
+    @property
+    def cuts(self) -> dict:
+        """Registered cut offsets per side (read-only snapshot)."""
+        cuts = self._cuts
+        return {
+            side: (list(cuts[i]) if cuts is not None and cuts[i] else [])
+            for i, side in enumerate(_CUT_SIDES)
         }
-        self.furniture = []
-        
+
+    @property
+    def furniture(self) -> list:
+        return self._furniture if self._furniture is not None else []
+
     def add_cut(self, side, offset):
         try:
             off = int(offset)
@@ -52,46 +82,63 @@ class Room(Element):
             if off <= 0 or off >= int(self.width):
                 return
 
-        if off not in self.cuts[side]:
-            self.cuts[side].append(off)
+        cuts = self._cuts
+        if cuts is None:
+            cuts = self._cuts = [None, None, None, None]
+        i = _CUT_SIDE_INDEX[side]
+        side_cuts = cuts[i]
+        if side_cuts is None:
+            cuts[i] = [off]
+        elif off not in side_cuts:
+            side_cuts.append(off)
             
     def add_furniture(self, item):
         # Adjust item coordinates to be absolute if they are relative?
         # For now assume absolute.
-        self.furniture.append(item)
+        if self._furniture is None:
+            self._furniture = [item]
+        else:
+            self._furniture.append(item)
             
     def build(self, builder):
         # Build Geometry
         self._build_geometry(builder)
         
         # Build Furniture
-        for item in self.furniture:
-            item.build(builder)
-            
-    def _build_geometry(self, builder):
-        for side in self.cuts:
-            self.cuts[side].sort()
+        if self._furniture is not None:
+            for item in self._furniture:
+                item.build(builder)
             
+    def boundary_points(self) -> list[tuple[int, int]]:
+        """Counter-clockwise polygon outline including registered cut vertices."""
+        cuts = self._cuts or (None, None, None, None)
+        top, bottom, left, right = (sorted(c) if c else () for c in cuts)
+
+        x0 = self.x
+        y0 = self.y
+        x1 = self.x + self.width
+        y1 = self.y + self.height
+
         points = []
         # Bottom (Left -> Right)
-        points.append((self.x, self.y))
-        for cut in self.cuts['bottom']:
-            points.append((self.x + cut, self.y))
-        points.append((self.x + self.width, self.y))
+        points.append((x0, y0))
+        for cut in bottom:
+            points.append((x0 + cut, y0))
+        points.append((x1, y0))
         
         # Right (Bottom -> Top)
-        for cut in self.cuts['right']:
-            points.append((self.x + self.width, self.y + cut))
-        points.append((self.x + self.width, self.y + self.height))
+        for cut in right:
+            points.append((x1, y0 + cut))
+        points.append((x1, y1))
         
         # Top (Right -> Left)
-        for cut in reversed(self.cuts['top']):
-            points.append((self.x + cut, self.y + self.height))
-        points.append((self.x, self.y + self.height))
+        for cut in reversed(top):
+            points.append((x0 + cut, y1))
+        points.append((x0, y1))
         
         # Left (Top -> Bottom)
-        for cut in reversed(self.cuts['left']):
-            points.append((self.x, self.y + cut))
+        for cut in reversed(left):
+            points.append((x0, y0 + cut))
             
         # Filter unique
         unique_points = []
@@ -100,22 +147,28 @@ class Room(Element):
                 unique_points.append(p)
         if len(unique_points) > 0 and unique_points[0] == unique_points[-1]:
             unique_points.pop()
-            
-        builder.draw_polygon(unique_points, 
+        return unique_points
+
+    def _build_geometry(self, builder):
+        builder.draw_polygon(self.boundary_points(), 
                              floor_tex=self.floor_tex, 
                              ceil_tex=self.ceil_tex, 
                              wall_tex=self.wall_tex,
                              floor_height=self.floor_height,
                              ceil_height=self.ceil_height,
-                             light=int(getattr(self, 'light', 160)),
+                             light=int(self.light),
                              tag=self.tag,
-                             special=int(getattr(self, 'special', 0) or 0))
+                             special=int(self.special or 0))
 
 class Corridor(Room):
+    __slots__ = ()
+
     def __init__(self, x, y, width, height, floor_tex="FLOOR0_1", wall_tex="STONE2", ceil_tex="CEIL3_5", light: int = 160):
         super().__init__(x, y, width, height, floor_tex, wall_tex, ceil_tex, light=int(light))
 
 class Lawn(Room):
+    __slots__ = ()
+
     def __init__(self, x, y, width, height, floor_tex="PYGRASS", wall_tex="BRICK7", light: int = 160):
         # Keep outdoor ceilings tall enough that multi-story facades (3 floors)
         # are not clipped when viewed from the lawn/outside.
@@ -1,6 +1,9 @@
 from typing import List, TYPE_CHECKING, Union, Optional, Tuple
 import os
 
+from .room_graph import RoomGraph
+from .room_table import RoomTable
+
 if TYPE_CHECKING:
     from .geometry import Room
     from .connectors import Connector, Switch
@@ -14,6 +17,13 @@ class Level:
 
         # (x, y, text) tuples used by WadBuilder.add_label_spot during build.
             # Removed label spot support
+
+        # Cached columnar snapshot of `rooms` (see room_table()).
+        self._room_table: Optional[RoomTable] = None
+        self._room_table_key: Optional[Tuple[int, int]] = None
+        # Cached walking graph (see room_graph()).
+        self._room_graph: Optional[RoomGraph] = None
+        self._room_graph_key: Optional[Tuple[int, int]] = None
         
     def get_new_tag(self) -> int:
         tag = self.next_tag
@@ -27,6 +37,61 @@ class Level:
     def add_connector(self, connector: Union['Connector', 'Switch']) -> None:
         self.connectors.append(connector)
         return connector
+
+    def room_table(self) -> Optional[RoomTable]:
+        """NumPy record-array view of `rooms`, or None when NumPy is unavailable.
+
+        Rebuilt on demand when rooms are added/removed. The table snapshots room
+        fields, so call `invalidate_room_table()` after mutating rooms in place
+        (e.g. changing floor heights or specials).
+        """
+        rooms = self.rooms
+        key = (len(rooms), id(rooms[-1]) if rooms else 0)
+        if self._room_table is None or self._room_table_key != key:
+            self._room_table = RoomTable.from_rooms(rooms)
+            self._room_table_key = key if self._room_table is not None else None
+        return self._room_table
+
+    def invalidate_room_table(self) -> None:
+        self._room_table = None
+        self._room_table_key = None
+
+    def register_cuts(self) -> None:
+        """Register every connector's cuts on its rooms.
+
+        Idempotent (`Room.add_cut` ignores duplicates), so queries that need the
+        final room outlines may call this before `build`.
+        """
+        for conn in self.connectors:
+            conn.register_cuts()
+
+    def room_graph(self) -> RoomGraph:
+        """Walking adjacency graph of the rooms (doors, open windows, shared edges, portals).
+
+        Cached until rooms/connectors are added; call `invalidate_room_graph()`
+        after moving rooms or changing floor heights in place.
+        """
+        key = (len(self.rooms), len(self.connectors))
+        if self._room_graph is None or self._room_graph_key != key:
+            self.register_cuts()
+            self._room_graph = RoomGraph.from_level(self)
+            self._room_graph_key = key
+        return self._room_graph
+
+    def invalidate_room_graph(self) -> None:
+        self._room_graph = None
+        self._room_graph_key = None
+
+    def room_at(self, x: int, y: int) -> Optional['Room']:
+        """First main-floor (floor 0) room whose bbox contains (x, y), else any room."""
+        fallback = None
+        for r in self.rooms:
+            if r.x <= x <= r.x + r.width and r.y <= y <= r.y + r.height:
+                if int(getattr(r, 'floor_height', 0) or 0) == 0:
+                    return r
+                if fallback is None:
+                    fallback = r
+        return fallback
         
     def build(self, builder):
         # Optional debug validation: Doom geometry cannot have overlapping sectors in 2D.
@@ -35,21 +100,67 @@ class Level:
             self._validate_no_room_overlaps()
 
         # First, register cuts
-        for conn in self.connectors:
-            conn.register_cuts()
+        self.register_cuts()
+
+        # Optional connectivity report from the spawn: `H9_REPORT_CONNECTIVITY=1`.
+        if str(os.environ.get('H9_REPORT_CONNECTIVITY', '')).strip() not in ('', '0', 'false', 'False'):
+            self._report_unreachable_rooms()
             
-        # Build rooms
+        # Build rooms (each attributed to its room in builder.provenance)
         for room in self.rooms:
-            room.build(builder)
+            with builder.owned_by(room):
+                room.build(builder)
             
         # Build connectors
         for conn in self.connectors:
-            conn.build(builder)
+            with builder.owned_by(conn):
+                conn.build(builder)
 
             # Removed label spot processing
 
+    def _report_unreachable_rooms(self) -> None:
+        # Connectivity sanity check from the suggested spawn. Some rooms are
+        # intentionally sealed (window boxes, sign backers), so this only reports.
+        if self.test_spawn is None:
+            return
+        start = self.room_at(int(self.test_spawn[0]), int(self.test_spawn[1]))
+        if start is None:
+            return
+        self.invalidate_room_graph()
+        unreachable = self.room_graph().unreachable_from(start)
+        if unreachable:
+            sample = ", ".join(
+                f"{type(r).__name__}@({r.x},{r.y},{r.width},{r.height})" for r in unreachable[:8]
+            )
+            more = " ..." if len(unreachable) > 8 else ""
+            print(f"Connectivity: {len(unreachable)}/{len(self.rooms)} rooms unreachable from spawn: {sample}{more}")
+
     def _validate_no_room_overlaps(self) -> None:
         rooms = list(self.rooms)
+        # Fresh snapshot: rooms may have been resized/moved since the last query.
+        table = RoomTable.from_rooms(rooms)
+        if table is not None:
+            overlaps = table.overlap_pairs()
+        else:
+            overlaps = self._room_overlaps_py(rooms)
+
+        if overlaps:
+            details = []
+            for i, j, ix0, iy0, ix1, iy1 in overlaps[:50]:
+                a = rooms[i]
+                b = rooms[j]
+                details.append(
+                    f"overlap {i} {type(a).__name__}@({a.x},{a.y},{a.width},{a.height}) "
+                    f"vs {j} {type(b).__name__}@({b.x},{b.y},{b.width},{b.height}) "
+                    f"=> ({ix0},{iy0})-({ix1},{iy1})"
+                )
+            raise RuntimeError(
+                "Detected overlapping rooms (invalid Doom 2D geometry). "
+                "Set H9_VALIDATE_OVERLAPS=0 to disable.\n" + "\n".join(details)
+            )
+
+    @staticmethod
+    def _room_overlaps_py(rooms) -> list[tuple[int, int, int, int, int, int]]:
         overlaps: list[tuple[int, int, int, int, int, int]] = []
 
         def _rect(r):
@@ -72,18 +183,4 @@ class Level:
                 iy1 = min(ay1, by1)
                 if ix0 < ix1 and iy0 < iy1:
                     overlaps.append((i, j, ix0, iy0, ix1, iy1))
-
-        if overlaps:
-            details = []
-            for i, j, ix0, iy0, ix1, iy1 in overlaps[:50]:
-                a = rooms[i]
-                b = rooms[j]
-                details.append(
-                    f"overlap {i} {type(a).__name__}@({a.x},{a.y},{a.width},{a.height}) "
-                    f"vs {j} {type(b).__name__}@({b.x},{b.y},{b.width},{b.height}) "
-                    f"=> ({ix0},{iy0})-({ix1},{iy1})"
-                )
-            raise RuntimeError(
-                "Detected overlapping rooms (invalid Doom 2D geometry). "
-                "Set H9_VALIDATE_OVERLAPS=0 to disable.\n" + "\n".join(details)
-            )
+        return overlaps
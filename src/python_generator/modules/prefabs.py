@@ -2,6 +2,8 @@ from .geometry import Room
 from .furniture import Bed, Table, Chair, Plant
 
 class Bedroom(Room):
+    __slots__ = ()
+
     def __init__(self, x: int, y: int, width: int = 256, height: int = 256) -> None:
         super().__init__(x, y, width, height, floor_tex="FLOOR5_2", wall_tex="BROWN96")
         
@@ -13,6 +15,8 @@ class Bedroom(Room):
         self.add_furniture(Chair(x + width - 80, y + 48, angle=180))
 
 class CommonRoom(Room):
+    __slots__ = ()
+
     def __init__(self, x: int, y: int, width: int = 384, height: int = 384) -> None:
         super().__init__(x, y, width, height, floor_tex="FLOOR4_8", wall_tex="STONE2")
         
@@ -33,6 +37,8 @@ class CommonRoom(Room):
         self.add_furniture(Plant(x + width - 32, y + height - 32))
 
 class Bathroom(Room):
+    __slots__ = ()
+
     def __init__(self, x: int, y: int, width: int = 128, height: int = 192) -> None:
         super().__init__(x, y, width, height, floor_tex="FLOOR0_1", wall_tex="STARGR1")
         # Add "Stalls" (represented by pillars for now)
@@ -0,0 +1,258 @@
+"""Room connectivity graph (walking adjacency) with cached shortest paths.
+
+Nodes are `Level.rooms`. Directed edges are added for:
+
+- Shared boundary segments: where two room polygons' boundary segments
+  overlap on the same axis line (identical or only partly), the map editor
+  merges the overlap into a two-sided line, i.e. an open passage (stair
+  steps, landings, lawn strips). Diagonal segments must match exactly.
+- `Door` connectors (doors are treated as openable from both sides).
+- `Window` connectors whose opening is low and tall enough to walk through
+  (the `sill_height=0` stair/corridor openings).
+- `Portal` pairs: the generator pairs stair landings across floors, and both
+  portals of a pair use their landing as `room1`. Walking through portal A from
+  its landing arrives on the landing of the partner portal B
+  (B.source_line_id == A.target_line_id). The `room2` threshold behind a
+  portal line is not reachable on foot.
+
+Every edge also has to pass a step/headroom check so a 128-unit ledge is not
+treated as walkable. Edge weights are center-to-center distances, so
+`distance()` approximates true walking distance.
+
+`distances_from(room)` runs one Dijkstra pass (O(E log V)) and caches the
+result, so subsequent `distance(src, x)` queries for that source are O(1).
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from .connectors import Door, Portal, Window
+from .geometry import Room
+
+if TYPE_CHECKING:
+    from .level import Level
+
+
+# Doom player movement limits.
+MAX_STEP_HEIGHT = 24
+PLAYER_HEIGHT = 56
+
+# Nominal cost for stepping through a portal pair (both rooms sit right at the
+# portal lines, so center distance across floors is meaningless).
+PORTAL_EDGE_COST = 64
+
+
+def _center(r: Room) -> tuple[float, float]:
+    return r.x + r.width / 2.0, r.y + r.height / 2.0
+
+
+def _floor(r: Room) -> int:
+    return int(getattr(r, 'floor_height', 0) or 0)
+
+
+def _ceil(r: Room) -> int:
+    return int(getattr(r, 'ceil_height', 0) or 0)
+
+
+def _can_step(a_floor: int, b_floor: int, a_ceil: int, b_ceil: int) -> bool:
+    """True if a player standing at `a_floor` can move onto `b_floor`."""
+    if b_floor - a_floor > MAX_STEP_HEIGHT:
+        return False
+    return min(a_ceil, b_ceil) - max(a_floor, b_floor) >= PLAYER_HEIGHT
+
+
+class RoomGraph:
+    """Directed walking graph over a room list."""
+
+    __slots__ = ('rooms', 'edges', '_index', '_dist_cache')
+
+    def __init__(self, rooms: Iterable[Room]) -> None:
+        self.rooms: list[Room] = list(rooms)
+        # edges[i] maps neighbour index -> edge cost.
+        self.edges: list[dict[int, float]] = [dict() for _ in self.rooms]
+        self._index: dict[int, int] = {id(r): i for i, r in enumerate(self.rooms)}
+        self._dist_cache: dict[int, list[float]] = {}
+
+    # --- Construction ---
+
+    @classmethod
+    def from_level(cls, level: 'Level') -> 'RoomGraph':
+        """Build the graph; connector cuts must already be registered.
+
+        Cut registration is idempotent (see `Level.register_cuts`), so callers
+        that run before `Level.build` may register them early.
+        """
+        graph = cls(r for r in level.rooms if isinstance(r, Room))
+        graph._add_shared_edges()
+        graph._add_connector_edges(level.connectors)
+        return graph
+
+    def index_of(self, room: Room) -> Optional[int]:
+        return self._index.get(id(room))
+
+    def _link(self, a: int, b: int, cost: float) -> None:
+        if a == b:
+            return
+        old = self.edges[a].get(b)
+        if old is None or cost < old:
+            self.edges[a][b] = cost
+            self._dist_cache.clear()
+
+    def _link_rooms(self, ra: Room, rb: Room, cost: Optional[float] = None) -> None:
+        a = self.index_of(ra)
+        b = self.index_of(rb)
+        if a is None or b is None:
+            return
+        if cost is None:
+            (ax, ay), (bx, by) = _center(ra), _center(rb)
+            cost = math.hypot(bx - ax, by - ay)
+        fa, fb, ca, cb = _floor(ra), _floor(rb), _ceil(ra), _ceil(rb)
+        if _can_step(fa, fb, ca, cb):
+            self._link(a, b, cost)
+        if _can_step(fb, fa, cb, ca):
+            self._link(b, a, cost)
+
+    def _add_shared_edges(self) -> None:
+        # The map editor splits overlapping collinear segments at each other's
+        # ends and merges the common pieces into two-sided lines, so rooms
+        # whose boundary intervals overlap on one axis line are adjacent.
+        # Axis line ('h', y) / ('v', x) -> [(start, end, room index)].
+        intervals: dict[tuple[str, int], list[tuple[int, int, int]]] = {}
+        # Diagonal segment -> first room that drew it (exact match only).
+        owner: dict[tuple[tuple[int, int], tuple[int, int]], int] = {}
+        for i, room in enumerate(self.rooms):
+            pts = room.boundary_points()
+            n = len(pts)
+            for k in range(n):
+                p = pts[k]
+                q = pts[(k + 1) % n]
+                if p[1] == q[1] and p[0] != q[0]:
+                    intervals.setdefault(('h', p[1]), []).append((min(p[0], q[0]), max(p[0], q[0]), i))
+                elif p[0] == q[0] and p[1] != q[1]:
+                    intervals.setdefault(('v', p[0]), []).append((min(p[1], q[1]), max(p[1], q[1]), i))
+                elif p != q:
+                    key = (p, q) if p <= q else (q, p)
+                    j = owner.get(key)
+                    if j is None:
+                        owner[key] = i
+                    elif j != i:
+                        self._link_rooms(self.rooms[j], room)
+
+        for spans in intervals.values():
+            spans.sort()
+            # Sweep: `active` holds spans that may still overlap later starts.
+            active: list[tuple[int, int, int]] = []
+            for start, end, i in spans:
+                active = [a for a in active if a[1] > start]
+                for _s, _e, j in active:
+                    if j != i:
+                        self._link_rooms(self.rooms[j], self.rooms[i])
+                active.append((start, end, i))
+
+    def _add_connector_edges(self, connectors: Iterable[object]) -> None:
+        portals_by_source: dict[int, Portal] = {}
+        portals: list[Portal] = []
+
+        for conn in connectors:
+            if isinstance(conn, Portal):
+                portals.append(conn)
+                portals_by_source[int(conn.source_line_id)] = conn
+                continue
+
+            r1 = getattr(conn, 'room1', None)
+            r2 = getattr(conn, 'room2', None)
+            if not isinstance(r1, Room) or not isinstance(r2, Room):
+                continue
+
+            if isinstance(conn, Door):
+                self._link_rooms(r1, r2)
+            elif isinstance(conn, Window):
+                self._add_window_edges(conn, r1, r2)
+
+        for src in portals:
+            dst = portals_by_source.get(int(src.target_line_id))
+            if dst is None or not isinstance(src.room1, Room):
+                continue
+            if not isinstance(dst.room1, Room):
+                continue
+            a = self.index_of(src.room1)
+            b = self.index_of(dst.room1)
+            if a is not None and b is not None:
+                self._link(a, b, PORTAL_EDGE_COST)
+
+    def _add_window_edges(self, win: Window, r1: Room, r2: Room) -> None:
+        # Mirrors Window.build: the opening spans base+sill .. base+sill+height.
+        win_floor = max(_floor(r1), _floor(r2)) + int(win.sill_height or 0)
+        win_ceil = win_floor + int(win.window_height or 0)
+        (ax, ay), (bx, by) = _center(r1), _center(r2)
+        cost = math.hypot(bx - ax, by - ay)
+        a = self.index_of(r1)
+        b = self.index_of(r2)
+        if a is None or b is None:
+            return
+        for (i, ri), (j, rj) in (((a, r1), (b, r2)), ((b, r2), (a, r1))):
+            if _can_step(_floor(ri), win_floor, _ceil(ri), win_ceil) and _can_step(
+                win_floor, _floor(rj), win_ceil, _ceil(rj)
+            ):
+                self._link(i, j, cost)
+
+    # --- Queries ---
+
+    def distances_from(self, source: Room) -> list[float]:
+        """Walking distance from `source` to every room (inf if unreachable)."""
+        s = self.index_of(source)
+        if s is None:
+            raise KeyError("room is not part of this graph")
+        cached = self._dist_cache.get(s)
+        if cached is not None:
+            return cached
+
+        dist = [math.inf] * len(self.rooms)
+        dist[s] = 0.0
+        heap: list[tuple[float, int]] = [(0.0, s)]
+        edges = self.edges
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for v, w in edges[u].items():
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+
+        self._dist_cache[s] = dist
+        return dist
+
+    def distance(self, source: Room, target: Room) -> float:
+        t = self.index_of(target)
+        if t is None:
+            return math.inf
+        return self.distances_from(source)[t]
+
+    def reachable_from(self, source: Room) -> list[Room]:
+        dist = self.distances_from(source)
+        return [r for r, d in zip(self.rooms, dist) if d != math.inf]
+
+    def unreachable_from(self, source: Room) -> list[Room]:
+        dist = self.distances_from(source)
+        return [r for r, d in zip(self.rooms, dist) if d == math.inf]
+
+    def farthest_from(self, source: Room, candidates: Optional[Iterable[Room]] = None) -> Optional[Room]:
+        """Reachable room with the largest walking distance (ties -> first)."""
+        dist = self.distances_from(source)
+        best: Optional[Room] = None
+        best_d = -1.0
+        pool = self.rooms if candidates is None else candidates
+        for r in pool:
+            i = self.index_of(r)
+            if i is None:
+                continue
+            d = dist[i]
+            if d != math.inf and d > best_d:
+                best = r
+                best_d = d
+        return best
@@ -0,0 +1,212 @@
+"""Columnar (NumPy record array) view of `Level.rooms`.
+
+The populator and validators ask bulk questions about rooms ("all main-floor
+rooms", "farthest room from spawn", "corridors at floor >= 280"). Walking
+`level.rooms` with per-attribute `getattr`/`int` conversions is slow and noisy;
+this table snapshots the numeric fields once so those queries become vectorized
+expressions.
+
+NumPy is optional: `RoomTable.from_rooms` returns None when it is not
+installed and callers keep their plain-Python loops as the fallback.
+
+The table is a snapshot. Use `Level.room_table()` (cached) and call
+`Level.invalidate_room_table()` after mutating room fields.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence
+
+try:
+    import numpy as np  # type: ignore
+except ModuleNotFoundError:
+    np = None
+
+if TYPE_CHECKING:
+    from .geometry import Room
+
+
+# Kind ids are keyed on the *exact* class name (subclasses are distinct kinds).
+# Anything not listed gets KIND_OTHER; non-Room entries get KIND_NOT_ROOM.
+KIND_NAMES: tuple[str, ...] = (
+    'Room',
+    'Corridor',
+    'Lawn',
+    'Bedroom',
+    'CommonRoom',
+    'Bathroom',
+)
+KIND_ROOM = 0
+KIND_CORRIDOR = 1
+KIND_LAWN = 2
+KIND_BEDROOM = 3
+KIND_COMMON_ROOM = 4
+KIND_BATHROOM = 5
+KIND_OTHER = len(KIND_NAMES)
+KIND_NOT_ROOM = -1
+
+_KIND_BY_NAME = {name: i for i, name in enumerate(KIND_NAMES)}
+
+# Connector corridors are plain Rooms of DEFAULT_CORRIDOR_W (see _iter_corridors
+# in gameplay_populator.py).
+PLAIN_CORRIDOR_WIDTH = 128
+
+ROOM_DTYPE = [
+    ('x', 'i4'),
+    ('y', 'i4'),
+    ('w', 'i4'),
+    ('h', 'i4'),
+    ('floor', 'i4'),
+    ('ceil', 'i4'),
+    ('tag', 'i4'),
+    ('special', 'i4'),
+    ('kind', 'i2'),
+]
+
+
+def kind_id(obj) -> int:
+    from .geometry import Room
+
+    if not isinstance(obj, Room):
+        return KIND_NOT_ROOM
+    return _KIND_BY_NAME.get(type(obj).__name__, KIND_OTHER)
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class RoomTable:
+    """Record-array snapshot of a room list (row i <-> `rooms[i]`)."""
+
+    __slots__ = ('rooms', 'data')
+
+    def __init__(self, rooms: Sequence['Room'], data) -> None:
+        self.rooms = list(rooms)
+        self.data = data
+
+    @classmethod
+    def from_rooms(cls, rooms: Iterable['Room']) -> Optional['RoomTable']:
+        if np is None:
+            return None
+        rooms = list(rooms)
+        rows = [
+            (
+                int(getattr(r, 'x', 0)),
+                int(getattr(r, 'y', 0)),
+                int(getattr(r, 'width', 0)),
+                int(getattr(r, 'height', 0)),
+                int(getattr(r, 'floor_height', 0) or 0),
+                int(getattr(r, 'ceil_height', 0) or 0),
+                int(getattr(r, 'tag', 0) or 0),
+                int(getattr(r, 'special', 0) or 0),
+                kind_id(r),
+            )
+            for r in rooms
+        ]
+        data = np.array(rows, dtype=ROOM_DTYPE).view(np.recarray)
+        return cls(rooms, data)
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    # --- Columns / derived columns ---
+
+    @property
+    def x0(self):
+        return self.data.x
+
+    @property
+    def y0(self):
+        return self.data.y
+
+    @property
+    def x1(self):
+        return self.data.x + self.data.w
+
+    @property
+    def y1(self):
+        return self.data.y + self.data.h
+
+    def centers(self):
+        """(cx, cy) int64 arrays, matching `_room_center` (floor division)."""
+        d = self.data
+        cx = d.x.astype(np.int64) + d.w.astype(np.int64) // 2
+        cy = d.y.astype(np.int64) + d.h.astype(np.int64) // 2
+        return cx, cy
+
+    # --- Masks ---
+
+    def is_room(self):
+        return self.data.kind != KIND_NOT_ROOM
+
+    def kind_mask(self, kind: int):
+        return self.data.kind == int(kind)
+
+    def main_floor_mask(self):
+        """Rooms on the main map (floor 0, not an off-map portal floor)."""
+        d = self.data
+        return self.is_room() & (d.floor == 0) & (d.y >= 0)
+
+    def corridor_mask(self):
+        d = self.data
+        plain = (d.kind == KIND_ROOM) & (d.w == PLAIN_CORRIDOR_WIDTH)
+        return (d.kind == KIND_CORRIDOR) | plain
+
+    # --- Queries ---
+
+    def select(self, mask) -> list['Room']:
+        """Rooms where `mask` is true, in level order."""
+        rooms = self.rooms
+        return [rooms[i] for i in np.flatnonzero(mask)]
+
+    def first(self, mask) -> Optional['Room']:
+        idx = np.flatnonzero(mask)
+        return self.rooms[int(idx[0])] if idx.size else None
+
+    def containing(self, x: int, y: int, mask=None) -> Optional['Room']:
+        """First room whose (inclusive) bbox contains (x, y)."""
+        hit = (self.x0 <= int(x)) & (int(x) <= self.x1) & (self.y0 <= int(y)) & (int(y) <= self.y1)
+        if mask is not None:
+            hit &= mask
+        return self.first(hit)
+
+    def _center_d2(self, x: int, y: int):
+        cx, cy = self.centers()
+        dx = cx - int(x)
+        dy = cy - int(y)
+        return dx * dx + dy * dy
+
+    def nearest_to(self, x: int, y: int, mask) -> Optional['Room']:
+        """Room (within `mask`) whose center is closest to (x, y); ties -> first."""
+        idx = np.flatnonzero(mask)
+        if not idx.size:
+            return None
+        d2 = self._center_d2(x, y)[idx]
+        return self.rooms[int(idx[int(np.argmin(d2))])]
+
+    def farthest_from(self, x: int, y: int, mask) -> Optional['Room']:
+        """Room (within `mask`) whose center is farthest from (x, y); ties -> first."""
+        idx = np.flatnonzero(mask)
+        if not idx.size:
+            return None
+        d2 = self._center_d2(x, y)[idx]
+        return self.rooms[int(idx[int(np.argmax(d2))])]
+
+    def overlap_pairs(self) -> list[tuple[int, int, int, int, int, int]]:
+        """All (i, j, ix0, iy0, ix1, iy1) with i < j whose rects overlap with positive area."""
+        x0 = self.x0.astype(np.int64)
+        y0 = self.y0.astype(np.int64)
+        x1 = self.x1.astype(np.int64)
+        y1 = self.y1.astype(np.int64)
+        out: list[tuple[int, int, int, int, int, int]] = []
+        for i in range(len(self.rooms) - 1):
+            ix0 = np.maximum(x0[i], x0[i + 1:])
+            iy0 = np.maximum(y0[i], y0[i + 1:])
+            ix1 = np.minimum(x1[i], x1[i + 1:])
+            iy1 = np.minimum(y1[i], y1[i + 1:])
+            hits = np.flatnonzero((ix0 < ix1) & (iy0 < iy1))
+            for k in hits:
+                k = int(k)
+                out.append((i, i + 1 + k, int(ix0[k]), int(iy0[k]), int(ix1[k]), int(iy1[k])))
+        return out
@@ -0,0 +1,764 @@
+"""In-process BSP node builder for the UDMF map (replaces the zdbsp step).
+
+For text (UDMF) maps the engine reads the ZNODES lump as GL nodes: it only
+accepts the XGLN/XGL2/XGL3 signatures or their zlib forms ZGLN/ZGL2/ZGL3,
+which is what zdbsp writes for UDMF maps. Anything else is discarded and the
+engine builds its own nodes at load. `build_nodes()` produces ZGLN (or raw
+XGLN) from the final `UMapEditor` model inside `WadBuilder.save()`:
+
+- segs: one per linedef side (front: v1 -> v2, back: v2 -> v1);
+- partition choice: a sample of the current segs' lines is scored against
+  every seg at once (NumPy when available, plain loops otherwise) with
+  cost = splits * SPLIT_COST + |front - back|; a seg set no sampled or
+  exhaustive candidate can divide is convex and becomes a subsector;
+- split vertices are rounded to 16.16 fixed point (the XGLN vertex format)
+  and shared between the pieces of both sides of a line;
+- with `workers > 1` the top levels are built here and the remaining
+  subtrees are built in a process pool, then spliced back in serial
+  order, so the lump is byte-identical for every worker count;
+- GL subsectors must be closed convex polygons. Each leaf's cell (the map
+  box clipped by the partitions on its path) is clipped by its segs'
+  lines, and the polygon edges the segs do not cover become minisegs;
+- segs on a line are then split at every vertex on that line, so each
+  miniseg (and two-sided seg) has an exact partner on the other side and
+  there are no T-junctions; node bounding boxes cover the closed polygons.
+
+Off by default; enable with `save(..., nodes='zgln')` or `H9_NODES=zgln`
+(`xgln` for uncompressed, `off` to skip). `H9_NODE_WORKERS` sets the pool size.
+"""
+
+from __future__ import annotations
+
+# pyright: reportMissingImports=false
+
+import bisect
+import math
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+try:
+    import numpy as np  # type: ignore
+except ModuleNotFoundError:
+    np = None
+
+
+FRACUNIT = 1 << 16
+NF_SUBSECTOR = 0x80000000
+
+# Distance (map units) within which a point counts as on the partition line.
+SIDE_EPSILON = 1.0 / 256.0
+# Closing subsectors: polygon corners within this distance of a vertex reuse
+# it, and clipping treats points this close to the line as on it.
+SNAP_EPSILON = 1.0 / 1024.0
+CLIP_EPSILON = 1e-6
+# XGLN seg fields for a miniseg / a seg without a partner.
+MINISEG_LINE = 0xFFFF
+NO_PARTNER = 0xFFFFFFFF
+SPLIT_COST = 8
+# Partition candidates scored per node.
+MAX_CANDIDATES = 48 if np is not None else 12
+# Subtrees smaller than this are not worth shipping to a worker process.
+MIN_PARALLEL_SEGS = 256
+
+NODE_FORMATS = ('off', 'xgln', 'zgln')
+
+
+def nodes_format_from_env() -> str:
+    raw = str(os.environ.get('H9_NODES', 'off')).strip().lower() or 'off'
+    if raw in ('0', 'false', 'no'):
+        raw = 'off'
+    if raw not in NODE_FORMATS:
+        raise ValueError(f"H9_NODES must be one of {', '.join(NODE_FORMATS)} (got {raw!r})")
+    return raw
+
+
+def node_workers_from_env() -> int:
+    raw = str(os.environ.get('H9_NODE_WORKERS', '')).strip()
+    if raw:
+        return max(1, int(raw))
+    return max(1, os.cpu_count() or 1)
+
+
+class _Seg:
+    """A (piece of a) linedef side. `p*` is the integer line it lies on, in seg direction."""
+
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'v1', 'v2', 'line', 'side', 'sector', 'px', 'py', 'pdx', 'pdy')
+
+    def __init__(self, x1, y1, x2, y2, v1, v2, line, side, sector, px, py, pdx, pdy) -> None:
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.v1 = v1
+        self.v2 = v2
+        self.line = line
+        self.side = side
+        self.sector = sector
+        self.px = px
+        self.py = py
+        self.pdx = pdx
+        self.pdy = pdy
+
+    def __getstate__(self):
+        return tuple(getattr(self, k) for k in _Seg.__slots__)
+
+    def __setstate__(self, state) -> None:
+        for k, v in zip(_Seg.__slots__, state):
+            setattr(self, k, v)
+
+    def piece(self, x1, y1, x2, y2, v1, v2) -> '_Seg':
+        return _Seg(x1, y1, x2, y2, v1, v2, self.line, self.side, self.sector, self.px, self.py, self.pdx, self.pdy)
+
+
+# Child reference while building: node index, NF_SUBSECTOR | subsector index,
+# or ('pending', k) for a subtree handed to a worker.
+_Child = Union[int, tuple]
+# (x, y, dx, dy, front bbox, back bbox, front child, back child); bbox is (top, bottom, left, right).
+_Node = tuple
+
+
+def _bbox(segs: Sequence[_Seg]) -> tuple[int, int, int, int]:
+    xs = [s.x1 for s in segs] + [s.x2 for s in segs]
+    ys = [s.y1 for s in segs] + [s.y2 for s in segs]
+    return (
+        _clamp16(math.ceil(max(ys))), _clamp16(math.floor(min(ys))),
+        _clamp16(math.floor(min(xs))), _clamp16(math.ceil(max(xs))),
+    )
+
+
+def _clamp16(v: int) -> int:
+    return max(-32768, min(32767, int(v)))
+
+
+class _Tree:
+    """Builds (part of) a BSP tree; new vertices are numbered from `vertex_base`."""
+
+    def __init__(self, vertex_base: int) -> None:
+        self.vertex_base = vertex_base
+        self.nodes: list[_Node] = []
+        self.subsectors: list[list[_Seg]] = []
+        self.new_vertices: list[tuple[int, int]] = []
+        self._vertex_index: dict[tuple[int, int], int] = {}
+        self.pending: list[list[_Seg]] = []
+        # (nodes, subsectors, new vertices) counts when each pending subtree
+        # was deferred: where a serial build would have put its elements.
+        self.pending_at: list[tuple[int, int, int]] = []
+        # Convex leaves that still mix segs of several sectors (bad geometry).
+        self.mixed = 0
+
+    def vertex(self, fx: int, fy: int) -> int:
+        key = (fx, fy)
+        idx = self._vertex_index.get(key)
+        if idx is None:
+            idx = self.vertex_base + len(self.new_vertices)
+            self.new_vertices.append(key)
+            self._vertex_index[key] = idx
+        return idx
+
+    def build(self, segs: list[_Seg], depth: int = 0, defer_at: Optional[int] = None) -> _Child:
+        if defer_at is not None and depth >= defer_at and len(segs) >= MIN_PARALLEL_SEGS:
+            self.pending.append(segs)
+            self.pending_at.append((len(self.nodes), len(self.subsectors), len(self.new_vertices)))
+            return ('pending', len(self.pending) - 1)
+        partition = _choose_partition(segs)
+        if partition is None:
+            if len({s.sector for s in segs}) > 1:
+                self.mixed += 1
+            self.subsectors.append(segs)
+            return NF_SUBSECTOR | (len(self.subsectors) - 1)
+        front, back = self.split(segs, partition)
+        front_box = _bbox(front)
+        back_box = _bbox(back)
+        f = self.build(front, depth + 1, defer_at)
+        b = self.build(back, depth + 1, defer_at)
+        self.nodes.append((partition.px, partition.py, partition.pdx, partition.pdy, front_box, back_box, f, b))
+        return len(self.nodes) - 1
+
+    def split(self, segs: list[_Seg], p: _Seg) -> tuple[list[_Seg], list[_Seg]]:
+        px, py, dx, dy = p.px, p.py, p.pdx, p.pdy
+        inv_len = 1.0 / math.hypot(dx, dy)
+        front: list[_Seg] = []
+        back: list[_Seg] = []
+        for s in segs:
+            s1 = (dx * (s.y1 - py) - dy * (s.x1 - px)) * inv_len
+            s2 = (dx * (s.y2 - py) - dy * (s.x2 - px)) * inv_len
+            f1, b1 = s1 < -SIDE_EPSILON, s1 > SIDE_EPSILON
+            f2, b2 = s2 < -SIDE_EPSILON, s2 > SIDE_EPSILON
+            if (f1 and b2) or (b1 and f2):
+                t = s1 / (s1 - s2)
+                fx = int(round((s.x1 + t * (s.x2 - s.x1)) * FRACUNIT))
+                fy = int(round((s.y1 + t * (s.y2 - s.y1)) * FRACUNIT))
+                x, y = fx / FRACUNIT, fy / FRACUNIT
+                if (x, y) == (s.x1, s.y1) or (x, y) == (s.x2, s.y2):
+                    # Rounded onto an endpoint: no split, the far end decides.
+                    (front if (f2 if (x, y) == (s.x1, s.y1) else f1) else back).append(s)
+                    continue
+                v = self.vertex(fx, fy)
+                a = s.piece(s.x1, s.y1, x, y, s.v1, v)
+                b = s.piece(x, y, s.x2, s.y2, v, s.v2)
+                if f1:
+                    front.append(a)
+                    back.append(b)
+                else:
+                    back.append(a)
+                    front.append(b)
+            elif f1 or f2:
+                front.append(s)
+            elif b1 or b2:
+                back.append(s)
+            elif dx * (s.x2 - s.x1) + dy * (s.y2 - s.y1) > 0:
+                front.append(s)
+            else:
+                back.append(s)
+        return front, back
+
+
+def _candidates(segs: list[_Seg]) -> list[_Seg]:
+    """One seg per distinct line."""
+    seen: set[int] = set()
+    out = []
+    for s in segs:
+        if s.line not in seen:
+            seen.add(s.line)
+            out.append(s)
+    return out
+
+
+def _choose_partition(segs: list[_Seg]) -> Optional[_Seg]:
+    if len(segs) < 2:
+        return None
+    cands = _candidates(segs)
+    if len(cands) > MAX_CANDIDATES:
+        step = len(cands) / MAX_CANDIDATES
+        sample = [cands[int(i * step)] for i in range(MAX_CANDIDATES)]
+    else:
+        sample = cands
+    best = _score(segs, sample)
+    if best is None and len(sample) < len(cands):
+        # The sample found nothing that divides the set; only an exhaustive
+        # pass can prove it convex.
+        for i in range(0, len(cands), MAX_CANDIDATES):
+            best = _score(segs, cands[i:i + MAX_CANDIDATES])
+            if best is not None:
+                break
+    return best
+
+
+def _score(segs: list[_Seg], cands: list[_Seg]) -> Optional[_Seg]:
+    """Cheapest valid partition among `cands` (None if none divides `segs`)."""
+    if np is not None:
+        return _score_numpy(segs, cands)
+    best = None
+    best_cost = None
+    for c in cands:
+        px, py, dx, dy = c.px, c.py, c.pdx, c.pdy
+        inv_len = 1.0 / math.hypot(dx, dy)
+        nf = nb = ns = 0
+        for s in segs:
+            s1 = (dx * (s.y1 - py) - dy * (s.x1 - px)) * inv_len
+            s2 = (dx * (s.y2 - py) - dy * (s.x2 - px)) * inv_len
+            f1, b1 = s1 < -SIDE_EPSILON, s1 > SIDE_EPSILON
+            f2, b2 = s2 < -SIDE_EPSILON, s2 > SIDE_EPSILON
+            if (f1 and b2) or (b1 and f2):
+                ns += 1
+            elif f1 or f2:
+                nf += 1
+            elif b1 or b2:
+                nb += 1
+            elif dx * (s.x2 - s.x1) + dy * (s.y2 - s.y1) > 0:
+                nf += 1
+            else:
+                nb += 1
+        if ns == 0 and (nf == 0 or nb == 0):
+            continue
+        cost = ns * SPLIT_COST + abs(nf - nb)
+        if best_cost is None or cost < best_cost:
+            best, best_cost = c, cost
+    return best
+
+
+def _score_numpy(segs: list[_Seg], cands: list[_Seg]) -> Optional[_Seg]:
+    x1 = np.fromiter((s.x1 for s in segs), dtype=np.float64, count=len(segs))
+    y1 = np.fromiter((s.y1 for s in segs), dtype=np.float64, count=len(segs))
+    x2 = np.fromiter((s.x2 for s in segs), dtype=np.float64, count=len(segs))
+    y2 = np.fromiter((s.y2 for s in segs), dtype=np.float64, count=len(segs))
+    cx = np.array([c.px for c in cands], dtype=np.float64)[:, None]
+    cy = np.array([c.py for c in cands], dtype=np.float64)[:, None]
+    cdx = np.array([c.pdx for c in cands], dtype=np.float64)[:, None]
+    cdy = np.array([c.pdy for c in cands], dtype=np.float64)[:, None]
+    inv_len = 1.0 / np.hypot(cdx, cdy)
+
+    # (candidates x segs) signed distances of both seg endpoints.
+    s1 = (cdx * (y1 - cy) - cdy * (x1 - cx)) * inv_len
+    s2 = (cdx * (y2 - cy) - cdy * (x2 - cx)) * inv_len
+    f1 = s1 < -SIDE_EPSILON
+    b1 = s1 > SIDE_EPSILON
+    f2 = s2 < -SIDE_EPSILON
+    b2 = s2 > SIDE_EPSILON
+    split = (f1 & b2) | (b1 & f2)
+    on_line = ~(f1 | b1 | f2 | b2)
+    same_dir = (cdx * (x2 - x1) + cdy * (y2 - y1)) > 0
+    ns = split.sum(axis=1)
+    nf = (~split & (f1 | f2)).sum(axis=1) + (on_line & same_dir).sum(axis=1)
+    nb = (~split & (b1 | b2)).sum(axis=1) + (on_line & ~same_dir).sum(axis=1)
+
+    valid = (ns > 0) | ((nf > 0) & (nb > 0))
+    if not valid.any():
+        return None
+    cost = np.where(valid, ns * SPLIT_COST + np.abs(nf - nb), np.iinfo(np.int64).max)
+    return cands[int(np.argmin(cost))]
+
+
+def _build_subtree(args: tuple[list[_Seg], int]) -> tuple[_Tree, _Child]:
+    segs, vertex_base = args
+    tree = _Tree(vertex_base)
+    root = tree.build(segs)
+    return tree, root
+
+
+@dataclass
+class NodeSet:
+    """Finished GL BSP in XGLN terms (vertex indices >= `org_vertices` are new)."""
+
+    org_vertices: int
+    new_vertices: list[tuple[int, int]]
+    # Seg count per subsector; subsector i's segs follow subsector i-1's and
+    # run clockwise around it (each seg's v2 is the next seg's v1).
+    subsectors: list[int]
+    # (v1, v2, line, side); line is MINISEG_LINE for minisegs.
+    segs: list[tuple[int, int, int, int]]
+    # Partner seg (same edge, other direction) per seg, or NO_PARTNER.
+    partners: list[int]
+    nodes: list[_Node]
+    # Sector of each subsector (from its first seg, always a real one).
+    subsector_sectors: list[int]
+    mixed_subsectors: int = 0
+    # Subsectors whose segs could not be closed into a polygon (bad geometry).
+    unclosed_subsectors: int = 0
+
+    def summary(self) -> str:
+        minisegs = sum(1 for seg in self.segs if seg[2] == MINISEG_LINE)
+        out = (
+            f"nodes {len(self.nodes)}, subsectors {len(self.subsectors)}, segs {len(self.segs)} "
+            f"({minisegs} minisegs), new vertices {len(self.new_vertices)}"
+        )
+        if self.unclosed_subsectors:
+            out += f", {self.unclosed_subsectors} unclosed subsector(s)"
+        return out
+
+    def to_znodes(self, compress: bool = True) -> bytes:
+        """ZNODES lump data: ZGLN (zlib) or XGLN (raw) GL nodes."""
+        out = bytearray()
+        out += struct.pack('<II', self.org_vertices, len(self.new_vertices))
+        for fx, fy in self.new_vertices:
+            out += struct.pack('<ii', fx, fy)
+        out += struct.pack('<I', len(self.subsectors))
+        out += struct.pack(f'<{len(self.subsectors)}I', *self.subsectors)
+        out += struct.pack('<I', len(self.segs))
+        seg = struct.Struct('<IIHB')
+        for (v1, _v2, line, side), partner in zip(self.segs, self.partners):
+            out += seg.pack(v1, partner, line, side)
+        out += struct.pack('<I', len(self.nodes))
+        node = struct.Struct('<4h4h4h2I')
+        for x, y, dx, dy, fbox, bbox, f, b in self.nodes:
+            out += node.pack(x, y, dx, dy, *fbox, *bbox, f, b)
+        if compress:
+            return b'ZGLN' + zlib.compress(bytes(out), 9)
+        return b'XGLN' + bytes(out)
+
+    def locate(self, x: float, y: float) -> int:
+        """Subsector containing (x, y), walking the tree like R_PointInSubsector."""
+        if not self.nodes:
+            return 0
+        child = len(self.nodes) - 1
+        while not child & NF_SUBSECTOR:
+            nx, ny, dx, dy = self.nodes[child][:4]
+            side = 0 if dx * (y - ny) - dy * (x - nx) < 0 else 1
+            child = self.nodes[child][6 + side]
+        return child & ~NF_SUBSECTOR
+
+
+def build_nodes(umap, *, workers: int = 1) -> NodeSet:
+    """Build BSP nodes for `umap` (a `UMapEditor`, in its final element order)."""
+    vertexes = umap.vertexes
+    sidedefs = umap.sidedefs
+    vx = [float(v.x) for v in vertexes]
+    vy = [float(v.y) for v in vertexes]
+
+    segs: list[_Seg] = []
+    for j, ld in enumerate(umap.linedefs):
+        a, b = int(ld.v1), int(ld.v2)
+        if (vx[a], vy[a]) == (vx[b], vy[b]):
+            continue
+        ax, ay, bx, by = int(vx[a]), int(vy[a]), int(vx[b]), int(vy[b])
+        sf = int(ld.sidefront)
+        segs.append(_Seg(vx[a], vy[a], vx[b], vy[b], a, b, j, 0, int(sidedefs[sf].sector), ax, ay, bx - ax, by - ay))
+        sb = -1 if ld.sideback is None else int(ld.sideback)
+        if sb >= 0:
+            segs.append(_Seg(vx[b], vy[b], vx[a], vy[a], b, a, j, 1, int(sidedefs[sb].sector), bx, by, ax - bx, ay - by))
+    if len(umap.linedefs) >= MINISEG_LINE:
+        raise RuntimeError("XGLN segs store line numbers in 16 bits; too many linedefs")
+
+    org = len(vertexes)
+    top = _Tree(org)
+    defer_at = None
+    if workers > 1 and len(segs) >= MIN_PARALLEL_SEGS * 2:
+        # Enough levels for a few subtrees per worker.
+        defer_at = max(1, math.ceil(math.log2(workers * 4)))
+    # The root is the last node appended (or the only subsector); the engine
+    # starts from the last node, so its index need not be kept.
+    top.build(segs, 0, defer_at)
+
+    subtrees: list[tuple[_Tree, _Child]] = []
+    if top.pending:
+        base = org + len(top.new_vertices)
+        jobs = [(p, base) for p in top.pending]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            subtrees = list(pool.map(_build_subtree, jobs))
+
+    new_vertices, nodes, subsector_lists, mixed = _assemble(org, top, subtrees)
+    closer = _SubsectorCloser(vx, vy, new_vertices)
+    return closer.close(nodes, subsector_lists, mixed)
+
+
+def _assemble(org: int, top: _Tree, subtrees: list[tuple[_Tree, _Child]]) -> tuple[list[tuple[int, int]], list[_Node], list[list[_Seg]], int]:
+    """Splice the subtrees back where `top` deferred them.
+
+    Elements are numbered as a serial build would number them: nodes in
+    post-order, subsectors in leaf order and new vertices in the order the
+    splits first produce them. The output is the same for any worker count.
+    """
+    mixed = top.mixed + sum(tree.mixed for tree, _root in subtrees)
+
+    # Vertices: the top tree's, with each subtree's inserted at its deferral
+    # point; a repeat of an earlier vertex reuses its index.
+    new_vertices: list[tuple[int, int]] = []
+    vertex_index: dict[tuple[int, int], int] = {}
+
+    def add_vertices(vertices: list[tuple[int, int]], base: int, local: dict[int, int]) -> None:
+        for i, v in enumerate(vertices):
+            g = vertex_index.get(v)
+            if g is None:
+                g = vertex_index[v] = org + len(new_vertices)
+                new_vertices.append(v)
+            local[base + i] = g
+
+    top_local: dict[int, int] = {}
+    sub_locals: list[dict[int, int]] = [{} for _ in subtrees]
+    done = 0
+    for k, (tree, _root) in enumerate(subtrees):
+        at = top.pending_at[k][2]
+        add_vertices(top.new_vertices[done:at], org + done, top_local)
+        done = at
+        add_vertices(tree.new_vertices, tree.vertex_base, sub_locals[k])
+    add_vertices(top.new_vertices[done:], org + done, top_local)
+
+    # Node / subsector offsets: elements of `top` shift by the subtrees
+    # spliced in before them; subtree k starts at its deferral point.
+    sub_node_off: list[int] = []
+    sub_ss_off: list[int] = []
+    nodes_before = 0
+    ss_before = 0
+    for k, (tree, _root) in enumerate(subtrees):
+        n_at, s_at, _v_at = top.pending_at[k]
+        sub_node_off.append(n_at + nodes_before)
+        sub_ss_off.append(s_at + ss_before)
+        nodes_before += len(tree.nodes)
+        ss_before += len(tree.subsectors)
+
+    def top_node(j: int) -> int:
+        return j + sum(len(tree.nodes) for k, (tree, _r) in enumerate(subtrees) if top.pending_at[k][0] <= j)
+
+    def top_ss(j: int) -> int:
+        return j + sum(len(tree.subsectors) for k, (tree, _r) in enumerate(subtrees) if top.pending_at[k][1] <= j)
+
+    def remap_child(ref: int, node_off: int, ss_off: int) -> int:
+        if ref & NF_SUBSECTOR:
+            return NF_SUBSECTOR | ((ref & ~NF_SUBSECTOR) + ss_off)
+        return ref + node_off
+
+    def top_child(ref: _Child) -> int:
+        if isinstance(ref, tuple):
+            tree, root = subtrees[ref[1]]
+            return remap_child(root, sub_node_off[ref[1]], sub_ss_off[ref[1]])
+        if ref & NF_SUBSECTOR:
+            return NF_SUBSECTOR | top_ss(ref & ~NF_SUBSECTOR)
+        return top_node(ref)
+
+    def remap_segs(lists: list[list[_Seg]], local: dict[int, int]) -> None:
+        for ss in lists:
+            for s in ss:
+                s.v1 = local.get(s.v1, s.v1)
+                s.v2 = local.get(s.v2, s.v2)
+
+    nodes: list[_Node] = [None] * (len(top.nodes) + nodes_before)
+    subsector_lists: list[list[_Seg]] = [None] * (len(top.subsectors) + ss_before)
+    remap_segs(top.subsectors, top_local)
+    for j, (x, y, dx, dy, fbox, bbox, f, b) in enumerate(top.nodes):
+        nodes[top_node(j)] = (x, y, dx, dy, fbox, bbox, top_child(f), top_child(b))
+    for j, ss in enumerate(top.subsectors):
+        subsector_lists[top_ss(j)] = ss
+    for k, (tree, _root) in enumerate(subtrees):
+        # Pending segs carry top-tree vertices as well as the subtree's own.
+        remap_segs(tree.subsectors, {**top_local, **sub_locals[k]})
+        node_off, ss_off = sub_node_off[k], sub_ss_off[k]
+        for j, (x, y, dx, dy, fbox, bbox, f, b) in enumerate(tree.nodes):
+            nodes[node_off + j] = (x, y, dx, dy, fbox, bbox, remap_child(f, node_off, ss_off), remap_child(b, node_off, ss_off))
+        subsector_lists[ss_off:ss_off + len(tree.subsectors)] = tree.subsectors
+    return new_vertices, nodes, subsector_lists, mixed
+
+
+# A convex polygon as (x, y, key) corners; `key` labels the edge from this
+# corner to the next (a `_line_key`, or ('box', k) for the map box).
+_Poly = list
+
+
+def _line_key(px: int, py: int, dx: int, dy: int) -> tuple[int, int, int]:
+    """Direction-free key of the integer line through (px, py) along (dx, dy)."""
+    g = math.gcd(int(dx), int(dy)) or 1
+    a, b = int(dy) // g, -int(dx) // g
+    if a < 0 or (a == 0 and b < 0):
+        a, b = -a, -b
+    return a, b, -(a * int(px) + b * int(py))
+
+
+def _clip(poly: _Poly, px: float, py: float, dx: float, dy: float, key, front: bool) -> _Poly:
+    """Keep the front (right of p->d) or back half of a convex polygon."""
+    if not poly:
+        return poly
+    inv_len = 1.0 / math.hypot(dx, dy)
+    sign = inv_len if front else -inv_len
+    dist = [(dx * (y - py) - dy * (x - px)) * sign for x, y, _k in poly]
+    out: _Poly = []
+    n = len(poly)
+    for i in range(n):
+        x1, y1, k1 = poly[i]
+        j = (i + 1) % n
+        d1, d2 = dist[i], dist[j]
+        if d1 <= CLIP_EPSILON:
+            # Inside (or on the line): the edge onward leaves along the clip
+            # line when the next corner is outside.
+            if d2 > CLIP_EPSILON:
+                if d1 < -CLIP_EPSILON:
+                    out.append((x1, y1, k1))
+                    x2, y2, _k = poly[j]
+                    t = d1 / (d1 - d2)
+                    out.append((x1 + t * (x2 - x1), y1 + t * (y2 - y1), key))
+                else:
+                    out.append((x1, y1, key))
+            else:
+                out.append((x1, y1, k1))
+        elif d2 < -CLIP_EPSILON:
+            x2, y2, _k = poly[j]
+            t = d1 / (d1 - d2)
+            out.append((x1 + t * (x2 - x1), y1 + t * (y2 - y1), k1))
+    # Drop corners that coincide with the next one.
+    clean: _Poly = []
+    for i, c in enumerate(out):
+        nx, ny, _k = out[(i + 1) % len(out)]
+        if abs(c[0] - nx) > CLIP_EPSILON or abs(c[1] - ny) > CLIP_EPSILON:
+            clean.append(c)
+    return clean if len(clean) >= 3 else []
+
+
+class _SubsectorCloser:
+    """Turns the seg-only BSP into GL nodes (closed subsectors, partners)."""
+
+    def __init__(self, vx: list[float], vy: list[float], new_vertices: list[tuple[int, int]]) -> None:
+        self.org = len(vx)
+        self.new_vertices = new_vertices
+        self.xs = list(vx) + [fx / FRACUNIT for fx, _fy in new_vertices]
+        self.ys = list(vy) + [fy / FRACUNIT for _fx, fy in new_vertices]
+        # Vertex lookup by position (cells of SNAP_EPSILON).
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        for i in range(len(self.xs)):
+            self._cells.setdefault(self._cell(self.xs[i], self.ys[i]), []).append(i)
+
+    @staticmethod
+    def _cell(x: float, y: float) -> tuple[int, int]:
+        return int(math.floor(x / SNAP_EPSILON)), int(math.floor(y / SNAP_EPSILON))
+
+    def vertex(self, x: float, y: float) -> int:
+        """Index of the vertex at (x, y), adding a 16.16 vertex if there is none."""
+        cx, cy = self._cell(x, y)
+        best, best_d = -1, SNAP_EPSILON
+        for i in range(cx - 1, cx + 2):
+            for j in range(cy - 1, cy + 2):
+                for v in self._cells.get((i, j), ()):
+                    d = max(abs(self.xs[v] - x), abs(self.ys[v] - y))
+                    if d <= best_d:
+                        best, best_d = v, d
+        if best >= 0:
+            return best
+        fx, fy = int(round(x * FRACUNIT)), int(round(y * FRACUNIT))
+        idx = len(self.xs)
+        self.new_vertices.append((fx, fy))
+        self.xs.append(fx / FRACUNIT)
+        self.ys.append(fy / FRACUNIT)
+        self._cells.setdefault(self._cell(self.xs[idx], self.ys[idx]), []).append(idx)
+        return idx
+
+    def close(self, nodes: list[_Node], subsector_lists: list[list[_Seg]], mixed: int) -> NodeSet:
+        cells = self._leaf_cells(nodes, len(subsector_lists))
+        unclosed = 0
+        # Per subsector: [v1, line, side, key] in clockwise order.
+        loops: list[list[list]] = []
+        for ss, cell in zip(subsector_lists, cells):
+            loop = self._close_leaf(ss, cell)
+            if loop is None:
+                unclosed += 1
+                loop = [[s.v1, s.line, s.side, _line_key(s.px, s.py, s.pdx, s.pdy)] for s in ss]
+            loops.append(loop)
+        loops = self._split_collinear(loops)
+
+        counts: list[int] = []
+        segs: list[tuple[int, int, int, int]] = []
+        sectors: list[int] = []
+        boxes: list[tuple[int, int, int, int]] = []
+        for loop, ss in zip(loops, subsector_lists):
+            # Start each loop on a real seg (the engine takes the subsector's
+            # sector from its first seg).
+            first = next((k for k, e in enumerate(loop) if e[1] != MINISEG_LINE), 0)
+            loop = loop[first:] + loop[:first]
+            counts.append(len(loop))
+            sectors.append(ss[0].sector)
+            for k, (v1, line, side, _key) in enumerate(loop):
+                segs.append((v1, loop[(k + 1) % len(loop)][0], line, side))
+            xs = [self.xs[e[0]] for e in loop]
+            ys = [self.ys[e[0]] for e in loop]
+            boxes.append((
+                _clamp16(math.ceil(max(ys))), _clamp16(math.floor(min(ys))),
+                _clamp16(math.floor(min(xs))), _clamp16(math.ceil(max(xs))),
+            ))
+
+        # Match by position: the map may hold several vertices at one point.
+        pos = [self._cell(x, y) for x, y in zip(self.xs, self.ys)]
+        index = {(pos[v1], pos[v2]): i for i, (v1, v2, _l, _s) in enumerate(segs)}
+        partners = [index.get((pos[v2], pos[v1]), NO_PARTNER) for v1, v2, _l, _s in segs]
+
+        return NodeSet(
+            self.org, self.new_vertices, counts, segs, partners,
+            self._node_boxes(nodes, boxes), sectors, mixed, unclosed,
+        )
+
+    def _leaf_cells(self, nodes: list[_Node], n_subsectors: int) -> list[_Poly]:
+        """Each subsector's cell: the map box clipped by the partitions above it."""
+        margin = 64.0
+        x0, x1 = min(self.xs) - margin, max(self.xs) + margin
+        y0, y1 = min(self.ys) - margin, max(self.ys) + margin
+        # Clockwise (interior on the right of every edge).
+        box = [(x0, y1, ('box', 0)), (x1, y1, ('box', 1)), (x1, y0, ('box', 2)), (x0, y0, ('box', 3))]
+        cells: list[_Poly] = [[] for _ in range(n_subsectors)]
+        stack = [(len(nodes) - 1 if nodes else NF_SUBSECTOR, box)]
+        while stack:
+            child, poly = stack.pop()
+            if child & NF_SUBSECTOR:
+                cells[child & ~NF_SUBSECTOR] = poly
+                continue
+            x, y, dx, dy, _fbox, _bbox, f, b = nodes[child]
+            key = _line_key(x, y, dx, dy)
+            stack.append((f, _clip(poly, x, y, dx, dy, key, True)))
+            stack.append((b, _clip(poly, x, y, dx, dy, key, False)))
+        return cells
+
+    def _close_leaf(self, segs: list[_Seg], cell: _Poly) -> Optional[list[list]]:
+        """Clockwise [v1, line, side, key] loop around a leaf, or None if it does not close."""
+        keys = [_line_key(s.px, s.py, s.pdx, s.pdy) for s in segs]
+        poly = cell
+        for s, key in zip(segs, keys):
+            poly = _clip(poly, s.px, s.py, s.pdx, s.pdy, key, True)
+        # Empty, or open to the map box (segs do not enclose the leaf).
+        if not poly or any(not isinstance(k[0], int) for _x, _y, k in poly):
+            return None
+
+        loop: list[list] = []
+        used = 0
+        cur = self.vertex(poly[0][0], poly[0][1])
+        n = len(poly)
+        for i in range(n):
+            x1, y1, key = poly[i]
+            x2, y2, _k = poly[(i + 1) % n]
+            ex, ey = x2 - x1, y2 - y1
+            on_edge = sorted(
+                (
+                    ((s.x1 - x1) * ex + (s.y1 - y1) * ey, k)
+                    for k, s in enumerate(segs)
+                    if keys[k] == key and (s.x2 - s.x1) * ex + (s.y2 - s.y1) * ey > 0
+                ),
+            )
+            for _t, k in on_edge:
+                s = segs[k]
+                if not self._same(cur, s.v1):
+                    loop.append([cur, MINISEG_LINE, 0, key])
+                loop.append([s.v1, s.line, s.side, key])
+                cur = s.v2
+                used += 1
+            if not self._near(cur, x2, y2):
+                loop.append([cur, MINISEG_LINE, 0, key])
+                cur = self.vertex(x2, y2)
+        if used != len(segs) or not loop or not self._same(cur, loop[0][0]):
+            return None
+        return loop
+
+    def _near(self, v: int, x: float, y: float) -> bool:
+        return abs(self.xs[v] - x) <= SNAP_EPSILON and abs(self.ys[v] - y) <= SNAP_EPSILON
+
+    def _same(self, a: int, b: int) -> bool:
+        return a == b or self._near(a, self.xs[b], self.ys[b])
+
+    def _split_collinear(self, loops: list[list[list]]) -> list[list[list]]:
+        """Split every seg at the vertices other segs on its line end at."""
+        # Per line key: sorted (t, vertex) of every seg endpoint on it.
+        on_line: dict = {}
+        for loop in loops:
+            for k, (v1, _line, _side, key) in enumerate(loop):
+                v2 = loop[(k + 1) % len(loop)][0]
+                pts = on_line.setdefault(key, {})
+                for v in (v1, v2):
+                    pts[v] = self._along(key, v)
+        stops = {}
+        for key, pts in on_line.items():
+            row = sorted((t, v) for v, t in pts.items())
+            stops[key] = ([t for t, _v in row], [v for _t, v in row])
+
+        out: list[list[list]] = []
+        for loop in loops:
+            new_loop: list[list] = []
+            for k, (v1, line, side, key) in enumerate(loop):
+                new_loop.append([v1, line, side, key])
+                v2 = loop[(k + 1) % len(loop)][0]
+                t1, t2 = self._along(key, v1), self._along(key, v2)
+                lo, hi = (t1, t2) if t1 < t2 else (t2, t1)
+                ts, vs = stops[key]
+                inner = vs[bisect.bisect_right(ts, lo + SNAP_EPSILON):bisect.bisect_left(ts, hi - SNAP_EPSILON)]
+                if t1 > t2:
+                    inner.reverse()
+                for v in inner:
+                    new_loop.append([v, line, side, key])
+            out.append(new_loop)
+        return out
+
+    def _along(self, key, v: int) -> float:
+        a, b = key[0], key[1]
+        return (-b * self.xs[v] + a * self.ys[v]) / math.hypot(a, b)
+
+    @staticmethod
+    def _node_boxes(nodes: list[_Node], ss_boxes: list[tuple[int, int, int, int]]) -> list[_Node]:
+        """Recompute node child boxes from the closed subsectors (children precede parents)."""
+        node_boxes: list[tuple[int, int, int, int]] = []
+        out: list[_Node] = []
+
+        def box_of(child: int) -> tuple[int, int, int, int]:
+            if child & NF_SUBSECTOR:
+                return ss_boxes[child & ~NF_SUBSECTOR]
+            return node_boxes[child]
+
+        for x, y, dx, dy, _fbox, _bbox, f, b in nodes:
+            fbox, bbox = box_of(f), box_of(b)
+            out.append((x, y, dx, dy, fbox, bbox, f, b))
+            node_boxes.append((max(fbox[0], bbox[0]), min(fbox[1], bbox[1]), min(fbox[2], bbox[2]), max(fbox[3], bbox[3])))
+        return out
@@ -0,0 +1,46 @@
+"""The one place that makes omgifol importable. Import it before any `omg.*` import.
+
+- Puts the vendored `tools/omgifol` on `sys.path` when it holds the package;
+  otherwise an installed `omg` is used.
+- Registers the `omg` package without running its `__init__`. That file
+  star-imports every submodule (wadio, wad, lump, mapedit with its
+  line/thing tables, udmf), so reading one lump would load the whole
+  library. Instead `from omg.wad import WAD` loads only what `omg.wad`
+  needs, and `omg.mapedit` / `omg.udmf` load on their first import.
+- Plain attribute access (`omg.WAD`) and `from omg import *` still work:
+  the first one runs the real `__init__`.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+
+
+OMGIFOL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools/omgifol"))
+
+
+def _install() -> None:
+    if 'omg' in sys.modules:
+        return
+    if os.path.isdir(os.path.join(OMGIFOL_PATH, 'omg')) and OMGIFOL_PATH not in sys.path:
+        sys.path.append(OMGIFOL_PATH)
+    spec = importlib.util.find_spec('omg')
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"omgifol not found: expected {OMGIFOL_PATH}/omg or an installed 'omg' package")
+    package = importlib.util.module_from_spec(spec)
+
+    def __getattr__(name: str):
+        # `__all__` is what `from omg import *` asks for first.
+        if name.startswith('__') and name != '__all__':
+            raise AttributeError(name)
+        del package.__getattr__
+        spec.loader.exec_module(package)
+        return getattr(package, name)
+
+    package.__getattr__ = __getattr__
+    sys.modules['omg'] = package
+
+
+_install()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+# pyright: reportMissingImports=false
+
+import random
+from dataclasses import dataclass
+from typing import Iterable
+
+from modules.geometry import Room
+from thing_buffer import ThingBuffer
+
+
+# Collision radii (map units) from the Doom/Doom II thing tables. Anything not
+# listed uses DEFAULT_THING_RADIUS.
+THING_RADIUS: dict[int, int] = {
+    1: 16,      # Player 1 start
+    9: 20,      # Shotgun guy
+    14: 20,     # Teleport destination (no collision, but keep spawns off it)
+    34: 20,     # Candle ("Chair" furniture)
+    48: 16,     # Tall techno column ("Table" furniture)
+    64: 20,     # Arch-vile (the populator's stairwell "Hell Knight" spots)
+    2028: 16,   # Floor lamp ("Bed"/"Plant" furniture)
+    2035: 10,   # Barrel
+    3001: 20,   # Imp
+    3002: 30,   # Demon (Pinky)
+    3003: 24,   # Baron of Hell
+    3004: 20,   # Zombieman
+}
+DEFAULT_THING_RADIUS = 20
+
+# Grid cell size for the occupancy index. A query scans the cells within
+# (radius + largest reserved radius + spacing) of the candidate.
+_CELL = 64
+
+
+def thing_radius(type_id: int) -> int:
+    return int(THING_RADIUS.get(int(type_id), DEFAULT_THING_RADIUS))
+
+
+@dataclass(frozen=True)
+class PlacementRequest:
+    """Ask for up to `count` things of `type_id` inside `room` (padded)."""
+
+    room: Room
+    type_id: int
+    count: int
+    pad: int = 48
+    # Extra clearance for this request's candidates only: each one keeps a
+    # centre distance of r_a + r_b + spacing from every thing already placed.
+    # Other requests use their own spacing. Used e.g. to spread monsters
+    # across a lawn.
+    spacing: int = 0
+
+
+class ThingPlacer:
+    """Grid-accelerated Poisson-disk (dart throwing) sampler for thing spots.
+
+    Every accepted or reserved thing is stored in a uniform grid keyed by cell,
+    so a candidate is tested only against nearby things. Sampling inside a room
+    rectangle rejects candidates closer than `r_new + r_old + spacing` to any
+    existing thing (furniture, earlier monsters, pickups), giving a blue-noise
+    spread without stacking.
+    """
+
+    def __init__(self, rng: random.Random, *, attempts: int = 30) -> None:
+        self.rng = rng
+        self.attempts = int(attempts)
+        self._grid: dict[tuple[int, int], list[tuple[int, int, int]]] = {}
+        self._max_radius = 0
+        self._synced = 0
+
+    # --- Occupancy ---
+
+    def reserve(self, x: int, y: int, radius: int) -> None:
+        key = (int(x) // _CELL, int(y) // _CELL)
+        self._grid.setdefault(key, []).append((int(x), int(y), int(radius)))
+        if radius > self._max_radius:
+            self._max_radius = int(radius)
+
+    def reserve_thing(self, x: int, y: int, type_id: int) -> None:
+        self.reserve(x, y, thing_radius(type_id))
+
+    def reserve_furniture(self, rooms: Iterable[Room]) -> None:
+        """Reserve furniture things that rooms will emit during `Level.build`."""
+        for room in rooms:
+            for item in getattr(room, 'furniture', ()) or ():
+                self.reserve_thing(int(item.x), int(item.y), int(getattr(item, 'thing_type', 0) or 0))
+
+    def sync_things(self, things: ThingBuffer) -> None:
+        """Reserve things appended to `things` since the last sync."""
+        xs, ys, types = things.x, things.y, things.type
+        for i in range(self._synced, len(things)):
+            self.reserve_thing(xs[i], ys[i], types[i])
+        self._synced = len(things)
+
+    def is_free(self, x: int, y: int, radius: int, spacing: int = 0) -> bool:
+        reach = int(radius) + self._max_radius + int(spacing)
+        cx0 = (int(x) - reach) // _CELL
+        cx1 = (int(x) + reach) // _CELL
+        cy0 = (int(y) - reach) // _CELL
+        cy1 = (int(y) + reach) // _CELL
+        grid = self._grid
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = grid.get((cx, cy))
+                if not cell:
+                    continue
+                for ox, oy, orad in cell:
+                    min_d = radius + orad + spacing
+                    dx = ox - x
+                    dy = oy - y
+                    if dx * dx + dy * dy < min_d * min_d:
+                        return False
+        return True
+
+    # --- Sampling ---
+
+    def sample_rect(
+        self,
+        x0: int,
+        y0: int,
+        x1: int,
+        y1: int,
+        *,
+        type_id: int,
+        count: int,
+        spacing: int = 0,
+    ) -> list[tuple[int, int]]:
+        """Place up to `count` things of `type_id` with centres in [x0,x1]x[y0,y1].
+
+        Returns fewer points when the rectangle is too crowded to fit them.
+        """
+        radius = thing_radius(type_id)
+        x0 = int(x0) + radius
+        y0 = int(y0) + radius
+        x1 = int(x1) - radius
+        y1 = int(y1) - radius
+        if x0 > x1 or y0 > y1 or count <= 0:
+            return []
+
+        rng = self.rng
+        out: list[tuple[int, int]] = []
+        # Each point gets `attempts` darts; stop early once the room saturates.
+        for _ in range(int(count)):
+            for _ in range(self.attempts):
+                x = rng.randint(x0, x1)
+                y = rng.randint(y0, y1)
+                if self.is_free(x, y, radius, spacing):
+                    self.reserve(x, y, radius)
+                    out.append((x, y))
+                    break
+            else:
+                break
+        return out
+
+    def sample_room(self, room: Room, *, type_id: int, count: int, pad: int = 48, spacing: int = 0) -> list[tuple[int, int]]:
+        x0 = int(room.x) + int(pad)
+        y0 = int(room.y) + int(pad)
+        x1 = int(room.x + room.width) - int(pad)
+        y1 = int(room.y + room.height) - int(pad)
+        # The pad already keeps things off the walls; allow centres right at it.
+        r = thing_radius(type_id)
+        return self.sample_rect(x0 - r, y0 - r, x1 + r, y1 + r, type_id=type_id, count=count, spacing=spacing)
+
+    def place_batch(self, requests: Iterable[PlacementRequest]) -> list[list[tuple[int, int]]]:
+        """Fill many rooms in one call; results are in request order.
+
+        Requests share the occupancy grid, so later requests avoid earlier ones.
+        """
+        return [
+            self.sample_room(req.room, type_id=req.type_id, count=req.count, pad=req.pad, spacing=req.spacing)
+            for req in requests
+        ]
+
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+
+@dataclass(frozen=True)
+class Owner:
+    """A generator object (Room, Door, Window, ...) that emitted geometry."""
+
+    index: int
+    kind: str
+    # Human-readable position, e.g. "Bedroom@(512,896,256,256)".
+    label: str
+    x: int = 0
+    y: int = 0
+    width: int = 0
+    height: int = 0
+
+
+@dataclass(frozen=True)
+class SectorHandle:
+    """Geometry emitted by one `WadBuilder.draw_polygon` call.
+
+    `sides[k]` and `lines[k]` belong to polygon edge k. An edge that landed on
+    an existing segment reuses that linedef (our sidedef becomes its back
+    side); `new_lines` lists only the linedefs this call created.
+    """
+
+    sector: int
+    sides: range
+    lines: tuple[int, ...]
+    new_lines: tuple[int, ...]
+
+    def touching_lines(self) -> list[int]:
+        """Every linedef bounding the sector, in editor (index) order."""
+        return sorted(set(self.lines))
+
+
+@dataclass(frozen=True)
+class ProvenanceSpan:
+    """Element index ranges (classic editor order == UDMF order) emitted by one owner."""
+
+    owner: int
+    sectors: range
+    linedefs: range
+    sidedefs: range
+
+
+def _describe(obj: object) -> tuple[str, str, int, int, int, int]:
+    kind = type(obj).__name__
+    if isinstance(obj, str):
+        return obj, obj, 0, 0, 0, 0
+    x = int(getattr(obj, 'x', 0) or 0)
+    y = int(getattr(obj, 'y', 0) or 0)
+    w = int(getattr(obj, 'width', 0) or 0)
+    h = int(getattr(obj, 'height', 0) or 0)
+    return kind, f"{kind}@({x},{y},{w},{h})", x, y, w, h
+
+
+class ProvenanceTable:
+    """Which generator object produced each sector / linedef / sidedef.
+
+    `WadBuilder.owned_by(obj)` brackets an object's build; the table records
+    the element counts before and after as index ranges. Lines are owned by
+    the object that first drew them (a neighbour that later adds the back side
+    only owns that sidedef). Nested brackets are allowed; the innermost owner
+    wins when resolving.
+
+    Every `draw_polygon` handle is also filed under the innermost active
+    owner, so later passes can jump to an object's sectors and lines via
+    `handles_of(obj)` instead of scanning the whole editor.
+
+    Things are not drawn into the editor; `WadBuilder.to_udmf()` files their
+    owners (recorded by `ThingBuffer`) via `set_thing_owners()`.
+    """
+
+    __slots__ = ('owners', 'spans', 'handles', 'thing_owners', '_by_obj', '_stack', '_handles_by_owner', '_remapped')
+
+    def __init__(self) -> None:
+        self.owners: list[Owner] = []
+        self.spans: list[ProvenanceSpan] = []
+        self.handles: list[SectorHandle] = []
+        # Owner index per UDMF thing (None where nothing was tracked).
+        self.thing_owners: list[Optional[int]] = []
+        self._by_obj: dict[int, int] = {}
+        self._stack: list[int] = []
+        self._handles_by_owner: dict[int, list[SectorHandle]] = {}
+        # Owner lists carried through a post-build index remap (see `remap()`).
+        self._remapped: Optional[tuple[list[Optional[int]], list[Optional[int]], list[Optional[int]]]] = None
+
+    def owner_index(self, obj: object) -> int:
+        key = id(obj)
+        idx = self._by_obj.get(key)
+        if idx is None:
+            idx = len(self.owners)
+            kind, label, x, y, w, h = _describe(obj)
+            self.owners.append(Owner(idx, kind, label, x, y, w, h))
+            self._by_obj[key] = idx
+        return idx
+
+    def current(self) -> int:
+        """Index of the innermost active owner, or -1 outside every bracket."""
+        return self._stack[-1] if self._stack else -1
+
+    @contextmanager
+    def track(self, obj: object, editor) -> Iterator[int]:
+        idx = self.owner_index(obj)
+        s0, l0, d0 = len(editor.sectors), len(editor.linedefs), len(editor.sidedefs)
+        self._stack.append(idx)
+        try:
+            yield idx
+        finally:
+            self._stack.pop()
+            s1, l1, d1 = len(editor.sectors), len(editor.linedefs), len(editor.sidedefs)
+            if s1 > s0 or l1 > l0 or d1 > d0:
+                self.spans.append(ProvenanceSpan(idx, range(s0, s1), range(l0, l1), range(d0, d1)))
+
+    def add_handle(self, handle: SectorHandle) -> None:
+        self.handles.append(handle)
+        if self._stack:
+            self._handles_by_owner.setdefault(self._stack[-1], []).append(handle)
+
+    def handles_of(self, obj: object) -> list[SectorHandle]:
+        idx = self._by_obj.get(id(obj))
+        if idx is None:
+            return []
+        return self._handles_by_owner.get(idx, [])
+
+    def spans_of(self, obj: object) -> list[ProvenanceSpan]:
+        idx = self._by_obj.get(id(obj))
+        return [sp for sp in self.spans if sp.owner == idx] if idx is not None else []
+
+    def resolve(self, n_sectors: int, n_linedefs: int, n_sidedefs: int) -> tuple[list[Optional[int]], list[Optional[int]], list[Optional[int]]]:
+        """Per-element owner index lists (None where nothing was tracked)."""
+        if self._remapped is not None:
+            return self._remapped
+        sectors: list[Optional[int]] = [None] * n_sectors
+        linedefs: list[Optional[int]] = [None] * n_linedefs
+        sidedefs: list[Optional[int]] = [None] * n_sidedefs
+        # Inner spans close (and are recorded) before their enclosing span, so
+        # filling only empty slots lets the innermost owner win.
+        for span in self.spans:
+            for out, rng in ((sectors, span.sectors), (linedefs, span.linedefs), (sidedefs, span.sidedefs)):
+                for i in rng:
+                    if i < len(out) and out[i] is None:
+                        out[i] = span.owner
+        return sectors, linedefs, sidedefs
+
+    def set_thing_owners(self, owners: Iterable[int]) -> None:
+        """Owner index per thing, in emission order (-1 = none)."""
+        self.thing_owners = [int(o) if int(o) >= 0 else None for o in owners]
+
+    def remap(self, sector_map: list[int], line_map: list[int], side_map: list[int],
+              thing_map: Optional[list[int]] = None) -> None:
+        """Follow a post-build compaction (old index -> new index, -1 = removed).
+
+        Spans and handles keep their build-time indices; only `resolve()`
+        reflects the remap. Where several old elements land on one new index
+        the first (lowest) one's owner is kept. `thing_map` (a permutation)
+        reorders `thing_owners`.
+        """
+        if thing_map is not None and len(thing_map) == len(self.thing_owners):
+            things: list[Optional[int]] = [None] * len(thing_map)
+            for i, j in enumerate(thing_map):
+                things[j] = self.thing_owners[i]
+            self.thing_owners = things
+        old_sec, old_line, old_side = self.resolve(len(sector_map), len(line_map), len(side_map))
+        out = []
+        for old, mapping in ((old_sec, sector_map), (old_line, line_map), (old_side, side_map)):
+            new: list[Optional[int]] = [None] * (max(mapping, default=-1) + 1)
+            for i, j in enumerate(mapping):
+                if j >= 0 and new[j] is None:
+                    new[j] = old[i]
+            out.append(new)
+        self._remapped = (out[0], out[1], out[2])
@@ -0,0 +1,374 @@
+"""Conservative REJECT table for the UDMF map, written by `WadBuilder.save()`.
+
+REJECT bit (a * numsectors + b) set means "nothing in sector a can see
+sector b", letting the engine skip the line-of-sight trace entirely. A set
+bit must therefore never be wrong; every approximation below errs towards
+"visible".
+
+The portal graph is the finished map's own room/connector structure: every
+two-sided linedef (door, window, corridor joint, lawn edge) is a portal
+between the sectors on its sides. Heights are ignored, so closed doors and
+low walls count as open.
+
+For each source sector, and each portal P0 leaving it, the flow walks
+portal chains in 2D the way Quake's vis does:
+
+- the first portal beyond P0 only has to reach past P0's line;
+- deeper portals are clipped to the anti-penumbra between P0 (the source)
+  and the current pass portal. That is the region some straight line
+  through both can reach. Ignoring the earlier pass portals only makes the
+  region larger.
+
+A sector reached by a non-empty clipped portal is visible. As in vis, every
+directed portal first gets a cheap "might see" set: a flood through the
+portals in front of it (NumPy-vectorized side tests when available). A chain
+stops as soon as the intersection of its portals' sets holds nothing new.
+Sources whose flow still exceeds `MAX_STEPS` fall back to a plain flood fill. Line portals
+(Line_SetPortal) make everything seen from either end visible from the
+other, and the table is finally made symmetric.
+
+Off by default; enable with `save(..., reject=True)` or `H9_REJECT=1`.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    import numpy as np  # type: ignore
+except ModuleNotFoundError:
+    np = None
+
+
+# Inclusive slack (map units) for every side test; errs towards visible.
+EPSILON = 0.01
+# Portal steps per source sector before giving up and flooding.
+MAX_STEPS = 20000
+
+LINE_SET_PORTAL = 156
+
+_Seg = tuple[float, float, float, float]
+
+
+def reject_from_env() -> bool:
+    return str(os.environ.get('H9_REJECT', '')).strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+@dataclass(frozen=True)
+class RejectResult:
+    data: bytes
+    sectors: int
+    # Sector pairs (a, b), a != b, marked as unable to see each other.
+    rejected_pairs: int
+    flooded_sources: int
+
+    def summary(self) -> str:
+        total = self.sectors * (self.sectors - 1)
+        pct = 100.0 * self.rejected_pairs / total if total else 0.0
+        return f"REJECT {self.sectors} sectors, {self.rejected_pairs}/{total} pairs rejected ({pct:.1f}%), {self.flooded_sources} flooded"
+
+
+class _Portal:
+    """A two-sided line crossed from `src` into `dst`; (ax, ay) -> (bx, by) has `dst` on its left."""
+
+    __slots__ = ('index', 'line', 'src', 'dst', 'seg', 'might')
+
+    def __init__(self, index: int, line: int, src: int, dst: int, seg: _Seg) -> None:
+        self.index = index
+        self.line = line
+        self.src = src
+        self.dst = dst
+        self.seg = seg
+        # Sectors any chain starting with this portal could reach (bitset).
+        self.might = 0
+
+
+def _side(ax: float, ay: float, bx: float, by: float, x: float, y: float) -> float:
+    """Signed distance-like value: > 0 left of a -> b."""
+    return (bx - ax) * (y - ay) - (by - ay) * (x - ax)
+
+
+def _clip(seg: _Seg, ax: float, ay: float, bx: float, by: float, keep_positive: bool) -> Optional[_Seg]:
+    """Part of `seg` on the kept side of line a -> b (inclusive, with slack)."""
+    x1, y1, x2, y2 = seg
+    length = ((bx - ax) ** 2 + (by - ay) ** 2) ** 0.5
+    if length == 0.0:
+        return seg
+    d1 = _side(ax, ay, bx, by, x1, y1) / length
+    d2 = _side(ax, ay, bx, by, x2, y2) / length
+    if not keep_positive:
+        d1, d2 = -d1, -d2
+    in1 = d1 >= -EPSILON
+    in2 = d2 >= -EPSILON
+    if in1 and in2:
+        return seg
+    if not in1 and not in2:
+        return None
+    t = (-EPSILON - d1) / (d2 - d1)
+    xm = x1 + t * (x2 - x1)
+    ym = y1 + t * (y2 - y1)
+    return (x1, y1, xm, ym) if in1 else (xm, ym, x2, y2)
+
+
+def _antipenumbra(seg: _Seg, source: _Seg, pas: _Seg) -> Optional[_Seg]:
+    """Clip `seg` to the region reachable by lines through both `source` and `pas`."""
+    src_pts = ((source[0], source[1]), (source[2], source[3]))
+    pas_pts = ((pas[0], pas[1]), (pas[2], pas[3]))
+    out: Optional[_Seg] = seg
+    for i in (0, 1):
+        sx, sy = src_pts[i]
+        ox, oy = src_pts[1 - i]
+        for j in (0, 1):
+            px, py = pas_pts[j]
+            qx, qy = pas_pts[1 - j]
+            length = ((px - sx) ** 2 + (py - sy) ** 2) ** 0.5
+            if length <= EPSILON:
+                continue
+            ds = _side(sx, sy, px, py, ox, oy) / length
+            dp = _side(sx, sy, px, py, qx, qy) / length
+            # A separator has the rest of the source and the rest of the pass
+            # portal strictly on opposite sides; anything else is skipped
+            # (less clipping, still conservative).
+            if ds * dp >= 0.0 or abs(ds) <= EPSILON or abs(dp) <= EPSILON:
+                continue
+            out = _clip(out, sx, sy, px, py, keep_positive=dp > 0.0)
+            if out is None:
+                return None
+    return out
+
+
+def _portals(umap) -> tuple[list[_Portal], list[list[_Portal]]]:
+    vertexes = umap.vertexes
+    sidedefs = umap.sidedefs
+    flat: list[_Portal] = []
+    by_sector: list[list[_Portal]] = [[] for _ in umap.sectors]
+    for j, ld in enumerate(umap.linedefs):
+        if ld.sideback is None or int(ld.sideback) < 0:
+            continue
+        front = int(sidedefs[int(ld.sidefront)].sector)
+        back = int(sidedefs[int(ld.sideback)].sector)
+        if front == back:
+            continue
+        a = vertexes[int(ld.v1)]
+        b = vertexes[int(ld.v2)]
+        ax, ay, bx, by = float(a.x), float(a.y), float(b.x), float(b.y)
+        if (ax, ay) == (bx, by):
+            continue
+        # Front is on the right of v1 -> v2, so crossing front -> back keeps
+        # the destination on the left of v1 -> v2, and vice versa.
+        for src, dst, seg in ((front, back, (ax, ay, bx, by)), (back, front, (bx, by, ax, ay))):
+            p = _Portal(len(flat), j, src, dst, seg)
+            flat.append(p)
+            by_sector[src].append(p)
+    return flat, by_sector
+
+
+def _front_masks(flat: list[_Portal]):
+    """Per portal T, which portals U a sight line could take after T.
+
+    U qualifies if some part of it lies on T's destination side and some part
+    of T lies on U's source side (a line crosses each portal line once).
+    Yields one mask (indexable by portal index) per portal.
+    """
+    if np is not None and flat:
+        seg = np.array([p.seg for p in flat], dtype=np.float64)
+        ax, ay, bx, by = seg[:, 0], seg[:, 1], seg[:, 2], seg[:, 3]
+        length = np.hypot(bx - ax, by - ay)
+        for t in flat:
+            tax, tay, tbx, tby = t.seg
+            tlen = ((tbx - tax) ** 2 + (tby - tay) ** 2) ** 0.5
+            # U's endpoints against T's line (destination side is > 0).
+            u1 = ((tbx - tax) * (ay - tay) - (tby - tay) * (ax - tax)) / tlen
+            u2 = ((tbx - tax) * (by - tay) - (tby - tay) * (bx - tax)) / tlen
+            # T's endpoints against every U's line (source side of U is < 0).
+            t1 = ((bx - ax) * (tay - ay) - (by - ay) * (tax - ax)) / length
+            t2 = ((bx - ax) * (tby - ay) - (by - ay) * (tbx - ax)) / length
+            yield ((u1 > -EPSILON) | (u2 > -EPSILON)) & ((t1 < EPSILON) | (t2 < EPSILON))
+        return
+    for t in flat:
+        tax, tay, tbx, tby = t.seg
+        tlen = ((tbx - tax) ** 2 + (tby - tay) ** 2) ** 0.5
+        mask = []
+        for u in flat:
+            uax, uay, ubx, uby = u.seg
+            ulen = ((ubx - uax) ** 2 + (uby - uay) ** 2) ** 0.5
+            ahead = (_side(tax, tay, tbx, tby, uax, uay) / tlen > -EPSILON
+                     or _side(tax, tay, tbx, tby, ubx, uby) / tlen > -EPSILON)
+            behind = (_side(uax, uay, ubx, uby, tax, tay) / ulen < EPSILON
+                      or _side(uax, uay, ubx, uby, tbx, tby) / ulen < EPSILON)
+            mask.append(ahead and behind)
+        yield mask
+
+
+def _might_see(flat: list[_Portal], by_sector: list[list[_Portal]]) -> None:
+    for t, mask in zip(flat, _front_masks(flat)):
+        seen = 1 << t.dst
+        stack = [t.dst]
+        while stack:
+            s = stack.pop()
+            for u in by_sector[s]:
+                if u.line == t.line or not mask[u.index]:
+                    continue
+                bit = 1 << u.dst
+                if not seen & bit:
+                    seen |= bit
+                    stack.append(u.dst)
+        t.might = seen
+
+
+class _Flow:
+    __slots__ = ('portals', 'steps', 'visible')
+
+    def __init__(self, portals: list[list[_Portal]]) -> None:
+        self.portals = portals
+        self.steps = 0
+        self.visible = 0
+
+    def run(self, sector: int) -> bool:
+        """Visible-sector bitset of `sector` into `self.visible`; False if over budget."""
+        self.steps = 0
+        self.visible = 1 << sector
+        for p0 in self.portals[sector]:
+            self.visible |= 1 << p0.dst
+            if not self._first(p0):
+                return False
+        return True
+
+    def _first(self, p0: _Portal) -> bool:
+        ax, ay, bx, by = p0.seg
+        for t in self.portals[p0.dst]:
+            if t.line == p0.line:
+                continue
+            clipped = _clip(t.seg, ax, ay, bx, by, keep_positive=True)
+            if clipped is None:
+                continue
+            self.visible |= 1 << t.dst
+            might = p0.might & t.might
+            if might & ~self.visible and not self._recurse(p0.seg, clipped, t, might, {p0.line, t.line}):
+                return False
+        return True
+
+    def _recurse(self, source: _Seg, pas: _Seg, pas_portal: _Portal, might: int, chain: set[int]) -> bool:
+        self.steps += 1
+        if self.steps > MAX_STEPS:
+            return False
+        ax, ay, bx, by = pas_portal.seg
+        for t in self.portals[pas_portal.dst]:
+            if t.line in chain or not might & (1 << t.dst):
+                continue
+            clipped = _clip(t.seg, ax, ay, bx, by, keep_positive=True)
+            if clipped is None:
+                continue
+            clipped = _antipenumbra(clipped, source, pas)
+            if clipped is None:
+                continue
+            self.visible |= 1 << t.dst
+            next_might = might & t.might
+            if not next_might & ~self.visible:
+                continue
+            chain.add(t.line)
+            ok = self._recurse(source, clipped, t, next_might, chain)
+            chain.discard(t.line)
+            if not ok:
+                return False
+        return True
+
+
+def _flood(portals: list[list[_Portal]], sector: int) -> int:
+    seen = 1 << sector
+    stack = [sector]
+    while stack:
+        s = stack.pop()
+        for p in portals[s]:
+            bit = 1 << p.dst
+            if not seen & bit:
+                seen |= bit
+                stack.append(p.dst)
+    return seen
+
+
+def _portal_links(umap) -> list[tuple[set[int], set[int]]]:
+    """(sectors at the source line, sectors at the target line) per Line_SetPortal."""
+    sidedefs = umap.sidedefs
+    by_id: dict[int, list[int]] = {}
+    for j, ld in enumerate(umap.linedefs):
+        if ld.id is not None and int(ld.id) > 0:
+            by_id.setdefault(int(ld.id), []).append(j)
+
+    def sectors_of(j: int) -> set[int]:
+        ld = umap.linedefs[j]
+        out = {int(sidedefs[int(ld.sidefront)].sector)}
+        if ld.sideback is not None and int(ld.sideback) >= 0:
+            out.add(int(sidedefs[int(ld.sideback)].sector))
+        return out
+
+    links = []
+    for j, ld in enumerate(umap.linedefs):
+        if int(ld.special or 0) != LINE_SET_PORTAL:
+            continue
+        for k in by_id.get(int(ld.arg0 or 0), []):
+            links.append((sectors_of(j), sectors_of(k)))
+    return links
+
+
+def build_reject(umap) -> RejectResult:
+    """REJECT lump data for `umap` (a `UMapEditor`, in its final element order)."""
+    n = len(umap.sectors)
+    flat, portals = _portals(umap)
+    _might_see(flat, portals)
+    flow = _Flow(portals)
+    rows: list[int] = []
+    flooded = 0
+    for s in range(n):
+        if flow.run(s):
+            rows.append(flow.visible)
+        else:
+            rows.append(_flood(portals, s))
+            flooded += 1
+
+    # Line portals: whoever sees one end sees whatever the other end sees.
+    links = _portal_links(umap)
+    changed = bool(links)
+    while changed:
+        changed = False
+        for ends_a, ends_b in links:
+            seen_a = 0
+            seen_b = 0
+            for s in ends_a:
+                seen_a |= rows[s]
+            for s in ends_b:
+                seen_b |= rows[s]
+            mask_a = sum(1 << s for s in ends_a)
+            mask_b = sum(1 << s for s in ends_b)
+            for s in range(n):
+                row = rows[s]
+                new = row
+                if row & mask_a:
+                    new |= seen_b
+                if row & mask_b:
+                    new |= seen_a
+                if new != row:
+                    rows[s] = new
+                    changed = True
+
+    # Symmetric: a sees b whenever b sees a.
+    for a in range(n):
+        row = rows[a]
+        bit_a = 1 << a
+        while row:
+            low = row & -row
+            b = low.bit_length() - 1
+            rows[b] |= bit_a
+            row ^= low
+
+    full = (1 << n) - 1
+    packed = 0
+    rejected = 0
+    for a in range(n):
+        hidden = full & ~rows[a]
+        rejected += bin(hidden).count('1')
+        packed |= hidden << (a * n)
+    data = packed.to_bytes((n * n + 7) // 8, 'little')
+    return RejectResult(data, n, rejected, flooded)
@@ -0,0 +1,233 @@
+"""Export the final UDMF map to SQLite with R*Tree bounding-box indexes.
+
+Written by `WadBuilder.save()` when `H9_EXPORT_SQLITE=<path>` is set (or
+`save(..., sqlite_path=...)` is passed). Every UDMF block becomes a row; the
+commonly queried fields get real columns and the full block is kept as JSON
+in `props`. `line_rtree` / `sector_rtree` index bounding boxes, and each
+sector / line / side row carries the `owner` (see `provenance.py`) that drew it.
+Things carry the owner active when they were added: the Room whose furniture
+they are, or "GameplayPopulator" for monsters/items. Vertices are shared by
+every line meeting there, so a vertex's `owner` is that of the lowest-index
+line using it.
+
+Example queries:
+
+    -- lines near (x, y) with Line_SetPortal
+    SELECT l.* FROM line_rtree r JOIN lines l ON l.id = r.id
+    WHERE r.max_x >= :x - 256 AND r.min_x <= :x + 256
+      AND r.max_y >= :y - 256 AND r.min_y <= :y + 256 AND l.special = 156;
+
+    -- dark sectors inside a bbox, with the Room that produced them
+    SELECT s.id, o.label FROM sector_rtree r JOIN sectors s ON s.id = r.id
+    LEFT JOIN owners o ON o.id = s.owner
+    WHERE r.min_x >= 0 AND r.max_x <= 4096 AND r.min_y >= 0 AND r.max_y <= 4096
+      AND s.lightlevel = 0;
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from typing import Optional
+
+from provenance import ProvenanceTable
+
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE owners (
+    id INTEGER PRIMARY KEY, kind TEXT, label TEXT,
+    x INTEGER, y INTEGER, width INTEGER, height INTEGER
+);
+CREATE TABLE vertices (id INTEGER PRIMARY KEY, x REAL, y REAL, owner INTEGER REFERENCES owners(id));
+CREATE TABLE sectors (
+    id INTEGER PRIMARY KEY,
+    heightfloor INTEGER, heightceiling INTEGER,
+    texturefloor TEXT, textureceiling TEXT,
+    lightlevel INTEGER, special INTEGER, tag INTEGER,
+    owner INTEGER REFERENCES owners(id),
+    props TEXT
+);
+CREATE TABLE sides (
+    id INTEGER PRIMARY KEY,
+    sector INTEGER REFERENCES sectors(id),
+    texturetop TEXT, texturemiddle TEXT, texturebottom TEXT,
+    offsetx INTEGER, offsety INTEGER,
+    owner INTEGER REFERENCES owners(id),
+    props TEXT
+);
+CREATE TABLE lines (
+    id INTEGER PRIMARY KEY,
+    v1 INTEGER, v2 INTEGER,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    sidefront INTEGER, sideback INTEGER,
+    front_sector INTEGER, back_sector INTEGER,
+    special INTEGER, arg0 INTEGER, arg1 INTEGER, arg2 INTEGER, arg3 INTEGER, arg4 INTEGER,
+    line_id INTEGER,
+    owner INTEGER REFERENCES owners(id),
+    props TEXT
+);
+CREATE TABLE things (
+    id INTEGER PRIMARY KEY,
+    type INTEGER, x REAL, y REAL, angle INTEGER, tid INTEGER, special INTEGER,
+    owner INTEGER REFERENCES owners(id),
+    props TEXT
+);
+CREATE VIRTUAL TABLE line_rtree USING rtree(id, min_x, max_x, min_y, max_y);
+CREATE VIRTUAL TABLE sector_rtree USING rtree(id, min_x, max_x, min_y, max_y);
+CREATE INDEX lines_special ON lines(special);
+CREATE INDEX lines_line_id ON lines(line_id);
+CREATE INDEX lines_front_sector ON lines(front_sector);
+CREATE INDEX lines_back_sector ON lines(back_sector);
+CREATE INDEX sides_sector ON sides(sector);
+CREATE INDEX sectors_tag ON sectors(tag);
+CREATE INDEX things_type ON things(type);
+"""
+
+
+def sqlite_path_from_env() -> Optional[str]:
+    raw = str(os.environ.get('H9_EXPORT_SQLITE', '')).strip()
+    return raw or None
+
+
+def _props(block) -> str:
+    return json.dumps({k: v for k, v in block.__dict__.items() if v is not None}, sort_keys=True)
+
+
+def _int(value, default: int = 0) -> int:
+    return default if value is None else int(value)
+
+
+def export_sqlite(umap, path: str, *, provenance: Optional[ProvenanceTable] = None,
+                  meta: Optional[dict[str, str]] = None) -> None:
+    """Write `umap` (a `UMapEditor`) to a fresh SQLite database at `path`."""
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    vertexes = umap.vertexes
+    linedefs = umap.linedefs
+    sidedefs = umap.sidedefs
+    sectors = umap.sectors
+
+    if provenance is not None:
+        sector_owner, line_owner, side_owner = provenance.resolve(len(sectors), len(linedefs), len(sidedefs))
+        thing_owner = list(provenance.thing_owners)
+    else:
+        sector_owner = [None] * len(sectors)
+        line_owner = [None] * len(linedefs)
+        side_owner = [None] * len(sidedefs)
+        thing_owner = []
+    thing_owner += [None] * (len(umap.things) - len(thing_owner))
+
+    vertex_owner: list = [None] * len(vertexes)
+    for i, ld in enumerate(linedefs):
+        for v in (_int(ld.v1), _int(ld.v2)):
+            if vertex_owner[v] is None:
+                vertex_owner[v] = line_owner[i]
+
+    side_sector = [_int(sd.sector, -1) for sd in sidedefs]
+
+    con = sqlite3.connect(path)
+    try:
+        con.executescript(SCHEMA)
+        with con:
+            rows = {'namespace': str(umap.namespace)}
+            rows.update(meta or {})
+            con.executemany("INSERT INTO meta VALUES (?, ?)", sorted(rows.items()))
+
+            if provenance is not None:
+                con.executemany(
+                    "INSERT INTO owners VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((o.index, o.kind, o.label, o.x, o.y, o.width, o.height) for o in provenance.owners),
+                )
+
+            con.executemany(
+                "INSERT INTO vertices VALUES (?, ?, ?, ?)",
+                ((i, float(v.x), float(v.y), vertex_owner[i]) for i, v in enumerate(vertexes)),
+            )
+
+            con.executemany(
+                "INSERT INTO sectors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        i,
+                        _int(s.heightfloor), _int(s.heightceiling),
+                        s.texturefloor, s.textureceiling,
+                        _int(s.lightlevel, 160), _int(s.special), _int(s.id),
+                        sector_owner[i],
+                        _props(s),
+                    )
+                    for i, s in enumerate(sectors)
+                ),
+            )
+
+            con.executemany(
+                "INSERT INTO sides VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        i, side_sector[i],
+                        sd.texturetop, sd.texturemiddle, sd.texturebottom,
+                        _int(sd.offsetx), _int(sd.offsety),
+                        side_owner[i],
+                        _props(sd),
+                    )
+                    for i, sd in enumerate(sidedefs)
+                ),
+            )
+
+            # Lines plus their bboxes; sector bboxes grow from the lines that bound them.
+            nside = len(sidedefs)
+            inf = float('inf')
+            sec_box = [[inf, -inf, inf, -inf] for _ in sectors]
+            line_rows = []
+            line_boxes = []
+            for i, ld in enumerate(linedefs):
+                a = vertexes[_int(ld.v1)]
+                b = vertexes[_int(ld.v2)]
+                x1, y1, x2, y2 = float(a.x), float(a.y), float(b.x), float(b.y)
+                sf = _int(ld.sidefront, -1)
+                sb = _int(ld.sideback, -1)
+                fs = side_sector[sf] if 0 <= sf < nside else None
+                bs = side_sector[sb] if 0 <= sb < nside else None
+                lo_x, hi_x = min(x1, x2), max(x1, x2)
+                lo_y, hi_y = min(y1, y2), max(y1, y2)
+                for s in (fs, bs):
+                    if s is not None and 0 <= s < len(sec_box):
+                        box = sec_box[s]
+                        box[0] = min(box[0], lo_x)
+                        box[1] = max(box[1], hi_x)
+                        box[2] = min(box[2], lo_y)
+                        box[3] = max(box[3], hi_y)
+                line_id = _int(ld.id, -1)
+                line_rows.append((
+                    i, _int(ld.v1), _int(ld.v2), x1, y1, x2, y2,
+                    sf, sb, fs, bs,
+                    _int(ld.special), _int(ld.arg0), _int(ld.arg1), _int(ld.arg2), _int(ld.arg3), _int(ld.arg4),
+                    line_id if line_id >= 0 else None,
+                    line_owner[i],
+                    _props(ld),
+                ))
+                line_boxes.append((i, lo_x, hi_x, lo_y, hi_y))
+            con.executemany("INSERT INTO lines VALUES (" + ", ".join("?" * 20) + ")", line_rows)
+            con.executemany("INSERT INTO line_rtree VALUES (?, ?, ?, ?, ?)", line_boxes)
+            con.executemany(
+                "INSERT INTO sector_rtree VALUES (?, ?, ?, ?, ?)",
+                ((i, *box) for i, box in enumerate(sec_box) if box[0] <= box[1]),
+            )
+
+            con.executemany(
+                "INSERT INTO things VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        i, _int(th.type), float(th.x), float(th.y),
+                        _int(th.angle), _int(th.id), _int(th.special),
+                        thing_owner[i],
+                        _props(th),
+                    )
+                    for i, th in enumerate(umap.things)
+                ),
+            )
+    finally:
+        con.close()
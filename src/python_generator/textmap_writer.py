@@ -0,0 +1,192 @@
+"""Compact TEXTMAP writer used by `WadBuilder.save()`.
+
+omgifol's `UMapEditor.to_textmap()` writes one field per line, emits a
+separate sidedef for every line side and only knows a handful of defaults
+(untagged lines still get `id=0;`, integral floats become `x=96.0;`). This
+writer produces the same map with:
+
+- shared sidedefs: sides identical in every field (sector included) are
+  written once and referenced by index from every linedef that uses them.
+  UDMF allows this; ZDoom copies a shared side per reference at load time, so
+  switch/scroll behaviour is unchanged;
+- UDMF/ZDoom spec defaults omitted (see `DEFAULTS`);
+- a fixed field order and one block per line, so identical blocks are
+  byte-identical and the lump compresses well;
+- sidedefs ordered by first use, which keeps the `sidefront`/`sideback`
+  indices of consecutive lines close together.
+
+Disable with `H9_COMPACT_TEXTMAP=0` (falls back to `UMapEditor.to_lumps()`).
+"""
+
+from __future__ import annotations
+
+# pyright: reportMissingImports=false
+
+import os
+from dataclasses import dataclass
+
+import omg_bootstrap  # noqa: F401
+from omg.lump import Lump
+from omg.wad import NameGroup
+
+
+# UDMF 1.1 + ZDoom extension defaults for the fields this generator writes.
+# A field equal to its default (or a false boolean flag) is omitted.
+DEFAULTS: dict[str, dict[str, object]] = {
+    'thing': {
+        'id': 0, 'height': 0, 'angle': 0, 'special': 0,
+        'arg0': 0, 'arg1': 0, 'arg2': 0, 'arg3': 0, 'arg4': 0,
+    },
+    'vertex': {},
+    'linedef': {
+        # Classic -> UDMF conversion turns Doom tag 0 ("untagged") into id 0;
+        # the UDMF equivalent is the default id -1.
+        'id': (-1, 0),
+        'special': 0, 'arg0': 0, 'arg1': 0, 'arg2': 0, 'arg3': 0, 'arg4': 0,
+        'sideback': -1, 'alpha': 1.0, 'locknumber': 0,
+    },
+    'sidedef': {
+        'texturetop': '-', 'texturebottom': '-', 'texturemiddle': '-',
+        'offsetx': 0, 'offsety': 0, 'light': 0,
+        'scalex_top': 1.0, 'scaley_top': 1.0,
+        'scalex_mid': 1.0, 'scaley_mid': 1.0,
+        'scalex_bottom': 1.0, 'scaley_bottom': 1.0,
+    },
+    'sector': {
+        'heightfloor': 0, 'heightceiling': 0, 'lightlevel': 160,
+        'special': 0, 'id': 0, 'moreids': '',
+    },
+}
+
+# Fields written first (in this order); everything else follows sorted.
+LEADING: dict[str, tuple[str, ...]] = {
+    'thing': ('type', 'x', 'y', 'angle', 'id'),
+    'vertex': ('x', 'y'),
+    'linedef': ('v1', 'v2', 'sidefront', 'sideback', 'special', 'arg0', 'arg1', 'arg2', 'arg3', 'arg4', 'id'),
+    'sidedef': ('sector', 'texturetop', 'texturemiddle', 'texturebottom', 'offsetx', 'offsety'),
+    'sector': ('heightfloor', 'heightceiling', 'texturefloor', 'textureceiling', 'lightlevel', 'special', 'id'),
+}
+
+
+@dataclass(frozen=True)
+class TextmapStats:
+    sidedefs_in: int
+    sidedefs_out: int
+    size: int
+
+    def summary(self) -> str:
+        return f"TEXTMAP {self.size} bytes, sidedefs {self.sidedefs_in} -> {self.sidedefs_out}"
+
+
+def compact_textmap_from_env() -> bool:
+    return str(os.environ.get('H9_COMPACT_TEXTMAP', '1')).strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def _value(value) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        # ZDoom accepts integer literals for float fields.
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, str):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    raise TypeError(f"Unsupported UDMF value {value!r}")
+
+
+_MISSING = object()
+
+
+def _is_default(kind: str, key: str, value) -> bool:
+    if isinstance(value, bool):
+        return not value
+    default = DEFAULTS[kind].get(key, _MISSING)
+    if isinstance(default, tuple):
+        return value in default
+    return default is not _MISSING and value == default
+
+
+def _block(kind: str, fields: dict, overrides: dict | None = None) -> str:
+    if overrides:
+        fields = {**fields, **overrides}
+    leading = LEADING[kind]
+    parts = []
+    for key in leading:
+        value = fields.get(key)
+        if value is not None and not _is_default(kind, key, value):
+            parts.append(f"{key}={_value(value)};")
+    for key in sorted(fields):
+        if key in leading:
+            continue
+        value = fields[key]
+        if value is None or _is_default(kind, key, value):
+            continue
+        parts.append(f"{key}={_value(value)};")
+    return kind + '{' + ''.join(parts) + '}\n'
+
+
+def write_textmap(umap, *, share_sidedefs: bool = True) -> tuple[bytes, TextmapStats]:
+    """Serialize `umap` (a `UMapEditor`) to TEXTMAP bytes without mutating it."""
+    out: list[str] = [f'namespace="{umap.namespace}";\n']
+    out.extend(_block('thing', th.__dict__) for th in umap.things)
+    out.extend(_block('vertex', v.__dict__) for v in umap.vertexes)
+
+    # Serialize every sidedef once; identical text means identical side.
+    side_text = [_block('sidedef', sd.__dict__) for sd in umap.sidedefs]
+    side_index: dict[str, int] = {}
+    side_map = [-1] * len(side_text)
+    sides_out: list[str] = []
+
+    def side_ref(i: int) -> int:
+        if side_map[i] < 0:
+            text = side_text[i]
+            j = side_index.get(text) if share_sidedefs else None
+            if j is None:
+                j = len(sides_out)
+                sides_out.append(text)
+                side_index[text] = j
+            side_map[i] = j
+        return side_map[i]
+
+    line_text = []
+    for ld in umap.linedefs:
+        overrides = {'sidefront': side_ref(int(ld.sidefront))}
+        sb = -1 if ld.sideback is None else int(ld.sideback)
+        if sb >= 0:
+            overrides['sideback'] = side_ref(sb)
+        line_text.append(_block('linedef', ld.__dict__, overrides))
+    # Sides no line refers to are kept (after the used ones) so nothing is lost.
+    for i in range(len(side_text)):
+        side_ref(i)
+
+    out.extend(sides_out)
+    out.extend(line_text)
+    out.extend(_block('sector', sec.__dict__) for sec in umap.sectors)
+
+    data = ''.join(out).encode('utf-8')
+    return data, TextmapStats(len(side_text), len(sides_out), len(data))
+
+
+def textmap_lumps(umap, *, compact: bool = True, share_sidedefs: bool = True,
+                  extra: dict[str, bytes] | None = None) -> tuple[NameGroup, TextmapStats | None]:
+    """Drop-in replacement for `umap.to_lumps()`.
+
+    `compact=False` keeps omgifol's TEXTMAP (stats is then None). `extra`
+    lumps (ZNODES, BLOCKMAP, ...) go right after TEXTMAP, in the given order.
+    """
+    if compact:
+        data, stats = write_textmap(umap, share_sidedefs=share_sidedefs)
+    else:
+        data, stats = umap.to_textmap().encode('utf-8'), None
+    m = NameGroup()
+    m['_HEADER_'] = Lump()
+    m['TEXTMAP'] = Lump(data)
+    for name, lump_data in (extra or {}).items():
+        m[name] = Lump(lump_data)
+    if umap.behavior:
+        m['BEHAVIOR'] = umap.behavior
+    if umap.scripts:
+        m['SCRIPTS'] = umap.scripts
+    m['ENDMAP'] = Lump()
+    return m, stats
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+# pyright: reportMissingImports=false
+
+from array import array
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+import omg_bootstrap  # noqa: F401
+from omg.udmf import UThing
+
+
+# Classic Doom thing flags: easy | medium | hard.
+DEFAULT_THING_FLAGS = 7
+
+# UDMF game-mode flags forced on for every emitted thing. omgifol's classic ->
+# ZDoom conversion derives them from bits the Doom flags word doesn't have,
+# which leaves them false (some ports then never spawn the thing).
+_GAME_MODE_FLAGS = ('single', 'coop', 'dm')
+
+
+def _flag_bits(namespace: str) -> list[tuple[int, str, bool]]:
+    # (bit, udmf_flag, inverted) in the same order omgifol's converter assigns
+    # them, so emitted blocks serialize identically.
+    out: list[tuple[int, str, bool]] = []
+    for bit, names in enumerate(UThing.flags[namespace]):
+        if not names:
+            continue
+        for name in names.split(','):
+            if name[0] == '!':
+                out.append((bit, name[1:], True))
+            else:
+                out.append((bit, name, False))
+    return out
+
+
+class ThingBuffer:
+    """Array-backed thing list (type, x, y, angle, flags, tid columns).
+
+    Replaces per-thing omgifol `Thing` allocation + `editor.things.append`.
+    `WadBuilder.save()` emits the buffer straight into UDMF things, setting the
+    game-mode flags and TIDs at that point (no post-conversion fix-up loops).
+
+    The `owner` column holds the provenance owner index active when each
+    thing was added (-1 for none), read from `owner_of` (see
+    `ProvenanceTable.current`). It is not emitted into the map.
+    """
+
+    __slots__ = ('type', 'x', 'y', 'angle', 'flags', 'tid', 'owner', 'owner_of')
+
+    def __init__(self, owner_of: Optional[Callable[[], int]] = None) -> None:
+        self.type = array('i')
+        self.x = array('i')
+        self.y = array('i')
+        self.angle = array('i')
+        self.flags = array('i')
+        self.tid = array('i')
+        self.owner = array('i')
+        self.owner_of = owner_of
+
+    def _current_owner(self) -> int:
+        return int(self.owner_of()) if self.owner_of is not None else -1
+
+    def __len__(self) -> int:
+        return len(self.type)
+
+    def __iter__(self) -> Iterator[tuple[int, int, int, int, int, int]]:
+        """Rows as (type, x, y, angle, flags, tid)."""
+        return zip(self.type, self.x, self.y, self.angle, self.flags, self.tid)
+
+    # --- Adding ---
+
+    def add(self, type_id: int, x: int, y: int, angle: int = 0, flags: int = DEFAULT_THING_FLAGS, tid: int = 0) -> int:
+        """Append one thing; returns its index."""
+        self.type.append(int(type_id))
+        self.x.append(int(x))
+        self.y.append(int(y))
+        self.angle.append(int(angle))
+        self.flags.append(int(flags))
+        self.tid.append(int(tid))
+        self.owner.append(self._current_owner())
+        return len(self.type) - 1
+
+    def add_many(
+        self,
+        type_id: int,
+        xs: Sequence[int],
+        ys: Sequence[int],
+        angles: Optional[Sequence[int]] = None,
+        flags: int = DEFAULT_THING_FLAGS,
+    ) -> range:
+        """Append many things of one type; returns the index range."""
+        n = len(xs)
+        if len(ys) != n or (angles is not None and len(angles) != n):
+            raise ValueError("ThingBuffer.add_many: column lengths differ")
+        start = len(self.type)
+        self.type.extend([int(type_id)] * n)
+        self.x.extend(int(v) for v in xs)
+        self.y.extend(int(v) for v in ys)
+        if angles is None:
+            self.angle.extend([0] * n)
+        else:
+            self.angle.extend(int(v) for v in angles)
+        self.flags.extend([int(flags)] * n)
+        self.tid.extend([0] * n)
+        self.owner.extend([self._current_owner()] * n)
+        return range(start, start + n)
+
+    def add_rows(self, rows: Iterable[tuple[int, int, int, int]]) -> range:
+        """Append (type, x, y, angle) rows with default flags; returns the index range."""
+        start = len(self.type)
+        for type_id, x, y, angle in rows:
+            self.type.append(int(type_id))
+            self.x.append(int(x))
+            self.y.append(int(y))
+            self.angle.append(int(angle))
+        n = len(self.type) - start
+        self.flags.extend([DEFAULT_THING_FLAGS] * n)
+        self.tid.extend([0] * n)
+        self.owner.extend([self._current_owner()] * n)
+        return range(start, start + n)
+
+    # --- Queries ---
+
+    def find(self, type_id: int, x: int, y: int) -> int:
+        """Index of the first thing with this type at (x, y), or -1."""
+        type_id, x, y = int(type_id), int(x), int(y)
+        types, xs, ys = self.type, self.x, self.y
+        for i in range(len(types)):
+            if types[i] == type_id and xs[i] == x and ys[i] == y:
+                return i
+        return -1
+
+    def set_tid(self, index: int, tid: int) -> None:
+        self.tid[index] = int(tid)
+
+    # --- Emission ---
+
+    def to_udmf(self, namespace: str = "ZDoom") -> list[UThing]:
+        """UDMF thing blocks in insertion order, game-mode flags set."""
+        bits = _flag_bits(namespace)
+        out: list[UThing] = []
+        for type_id, x, y, angle, flags, tid in self:
+            block = UThing(float(x), float(y), type_id)
+            if angle != 0:
+                block.angle = angle
+            d = block.__dict__
+            for bit, name, inverted in bits:
+                on = bool(flags & (1 << bit))
+                d[name] = (not on) if inverted else on
+            for name in _GAME_MODE_FLAGS:
+                d[name] = True
+            if tid:
+                block.id = tid
+            out.append(block)
+        return out
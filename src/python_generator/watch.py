@@ -0,0 +1,271 @@
+"""Watch mode (`main_hostel.py --watch`): a resident process that rebuilds on save.
+
+It polls `src/python_generator/**/*.py` and `assets/**` (mtime + size,
+stdlib only) and, after a change, re-runs as little as it can in the
+already-warm interpreter (omgifol and every untouched module stay imported):
+
+- only writer-side modules changed (`WRITE_STAGE_MODULES`: simplify,
+  reorder, lint, nodes, blockmap, reject, TEXTMAP writer, SQLite export):
+  reload just those, point their importers' `from x import y` names at the
+  new objects and re-run `WadBuilder.write_udmf()` on a copy of the UDMF
+  model cached from the last full build;
+- any other module: reload it and every project module that imports it
+  (transitively, found by an `ast` scan), dependencies first, then
+  regenerate and write;
+- assets only: regenerate and write with the modules as they are;
+- the entry script or this file: restart the process.
+
+A failing build prints its traceback and waits for the next save.
+"""
+
+from __future__ import annotations
+
+import ast
+import copy
+import importlib
+import os
+import sys
+import time
+import traceback
+from typing import Callable, Iterable, Optional
+
+
+GENERATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.abspath(os.path.join(GENERATOR_DIR, '..', '..', 'assets'))
+
+# Modules only used by `WadBuilder.write_udmf()`: editing them never changes
+# the UDMF model produced by `to_udmf()`.
+WRITE_STAGE_MODULES = frozenset({
+    'map_simplify', 'map_reorder', 'map_lint', 'nodebuilder', 'blockmap',
+    'reject', 'textmap_writer', 'sqlite_export',
+})
+
+
+def _module_name(path: str) -> str:
+    rel = os.path.relpath(path, GENERATOR_DIR)[:-3].replace(os.sep, '.')
+    return rel[:-len('.__init__')] if rel.endswith('.__init__') else rel
+
+
+def _snapshot() -> dict[str, tuple[int, int]]:
+    files: dict[str, tuple[int, int]] = {}
+    for root, pattern in ((GENERATOR_DIR, '.py'), (ASSETS_DIR, '')):
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d != '__pycache__']
+            for name in filenames:
+                if name.endswith(pattern):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files[path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+def _changed(before: dict[str, tuple[int, int]], after: dict[str, tuple[int, int]]) -> list[str]:
+    return sorted(p for p in before.keys() | after.keys() if before.get(p) != after.get(p))
+
+
+def import_graph() -> dict[str, set[str]]:
+    """Project module -> project modules it imports (from the source, not sys.modules)."""
+    paths: dict[str, str] = {}
+    for dirpath, dirnames, filenames in os.walk(GENERATOR_DIR):
+        dirnames[:] = [d for d in dirnames if d != '__pycache__']
+        for name in filenames:
+            if name.endswith('.py'):
+                path = os.path.join(dirpath, name)
+                paths[_module_name(path)] = path
+
+    graph: dict[str, set[str]] = {}
+    for mod, path in paths.items():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read(), path)
+        except (OSError, SyntaxError):
+            graph[mod] = set()
+            continue
+        package = mod if path.endswith('__init__.py') else mod.rpartition('.')[0]
+        deps: set[str] = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                deps.update(a.name for a in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = package.split('.') if package else []
+                    base = base[:len(base) - (node.level - 1)] if node.level > 1 else base
+                    target = '.'.join(base + ([node.module] if node.module else []))
+                else:
+                    target = node.module or ''
+                deps.add(target)
+                # `from pkg import submodule`
+                deps.update(f'{target}.{a.name}' for a in node.names)
+        graph[mod] = {d for d in deps if d in paths and d != mod}
+    return graph
+
+
+def _dependents(graph: dict[str, set[str]], roots: Iterable[str]) -> set[str]:
+    users: dict[str, set[str]] = {}
+    for mod, deps in graph.items():
+        for dep in deps:
+            users.setdefault(dep, set()).add(mod)
+    out = set(roots)
+    stack = list(out)
+    while stack:
+        for user in users.get(stack.pop(), ()):
+            if user not in out:
+                out.add(user)
+                stack.append(user)
+    return out
+
+
+def _topo(graph: dict[str, set[str]], mods: set[str]) -> list[str]:
+    """`mods` with every module after the modules it imports."""
+    order: list[str] = []
+    seen: set[str] = set()
+
+    def visit(mod: str) -> None:
+        if mod in seen:
+            return
+        seen.add(mod)
+        for dep in sorted(graph.get(mod, ())):
+            if dep in mods:
+                visit(dep)
+        order.append(mod)
+
+    for mod in sorted(mods):
+        visit(mod)
+    return order
+
+
+def _rebind(reloaded: dict[str, object]) -> None:
+    """Point `from x import y` names in every loaded module at the reloaded objects."""
+    names = set(reloaded)
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, '__dict__', None)
+        if namespace is None:
+            continue
+        for name, value in list(namespace.items()):
+            owner = getattr(value, '__module__', None)
+            if owner in names and not isinstance(value, type(sys)):
+                fresh = getattr(reloaded[owner], getattr(value, '__name__', name), None)
+                if fresh is not None and fresh is not value:
+                    namespace[name] = fresh
+
+
+def reload_modules(mods: Iterable[str], graph: dict[str, set[str]]) -> list[str]:
+    """Reload the loaded modules among `mods`, dependencies first; returns their names."""
+    order = [m for m in _topo(graph, set(mods)) if m in sys.modules]
+    reloaded: dict[str, object] = {}
+    for mod in order:
+        reloaded[mod] = importlib.reload(sys.modules[mod])
+    _rebind(reloaded)
+    return order
+
+
+def _copy_block(block):
+    # omgifol's UBlock answers every missing attribute with None (including
+    # `__setstate__`), so copy.deepcopy() can't handle it; fields are scalars.
+    out = object.__new__(type(block))
+    out.__dict__.update(block.__dict__)
+    return out
+
+
+def copy_umap(umap):
+    """Independent copy of a `UMapEditor` model (element lists and blocks)."""
+    out = copy.copy(umap)
+    for attr in ('vertexes', 'sidedefs', 'linedefs', 'sectors', 'things'):
+        setattr(out, attr, [_copy_block(b) for b in getattr(umap, attr)])
+    return out
+
+
+class _Session:
+    def __init__(self, generate: Callable[[], object], output_path: str, restart_files: set[str]):
+        self.generate = generate
+        self.output_path = output_path
+        self.restart_files = restart_files
+        # (umap, provenance) straight out of `to_udmf()`, plus the builder they came from.
+        self.cached: Optional[tuple[object, object, object]] = None
+
+    def full(self) -> None:
+        builder = self.generate()
+        umap = builder.to_udmf()
+        # remap() only swaps in a new resolved table, so a shallow copy is enough.
+        self.cached = (builder, copy_umap(umap), copy.copy(builder.provenance))
+        self.write(builder, umap)
+
+    def write_only(self) -> None:
+        if self.cached is None:
+            self.full()
+            return
+        builder, umap, provenance = self.cached
+        builder.provenance = copy.copy(provenance)
+        self.write(builder, copy_umap(umap))
+
+    def write(self, builder, umap) -> None:
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        builder.write_udmf(umap, self.output_path)
+
+    def run(self, stage: Callable[[], None], label: str) -> None:
+        start = time.perf_counter()
+        try:
+            stage()
+        except Exception:  # noqa: BLE001 - keep watching after a broken edit
+            traceback.print_exc()
+            print(f"[watch] {label} failed; waiting for the next change.", flush=True)
+            return
+        print(f"[watch] {label}: wrote {self.output_path} in {time.perf_counter() - start:.2f}s", flush=True)
+
+    def on_change(self, paths: list[str]) -> None:
+        if any(os.path.abspath(p) in self.restart_files for p in paths):
+            print("[watch] entry point changed; restarting.", flush=True)
+            os.execv(sys.executable, [sys.executable] + sys.argv)
+
+        mods = {_module_name(p) for p in paths if p.startswith(GENERATOR_DIR + os.sep) and p.endswith('.py')}
+        graph = import_graph()
+        try:
+            if mods and mods <= WRITE_STAGE_MODULES:
+                reload_modules(mods, graph)
+                label, stage = 'write stage', self.write_only
+            else:
+                reload_modules(_dependents(graph, mods), graph)
+                label, stage = 'full build', self.full
+        except Exception:  # noqa: BLE001 - e.g. a syntax error mid-edit
+            traceback.print_exc()
+            print("[watch] reload failed; waiting for the next change.", flush=True)
+            return
+        if mods:
+            print(f"[watch] reloaded {', '.join(sorted(mods))}", flush=True)
+        self.run(stage, label)
+
+
+def watch(generate: Callable[[], object], output_path: str, *, interval: float = 0.3) -> None:
+    """Build once, then rebuild on every change until interrupted.
+
+    `generate()` returns a populated `WadBuilder`; it must look its
+    dependencies up through module globals (as `main_hostel.generate` does)
+    so reloaded classes are picked up.
+    """
+    restart_files = {os.path.abspath(__file__)}
+    main = sys.modules.get('__main__')
+    if getattr(main, '__file__', None):
+        restart_files.add(os.path.abspath(main.__file__))
+
+    session = _Session(generate, output_path, restart_files)
+    session.run(session.full, 'full build')
+    print(f"[watch] watching {GENERATOR_DIR} and {ASSETS_DIR} (Ctrl+C to stop)", flush=True)
+    state = _snapshot()
+    try:
+        while True:
+            time.sleep(interval)
+            current = _snapshot()
+            changed = _changed(state, current)
+            if not changed:
+                continue
+            # Let editors finish writing (save-as-rename, formatters) before reloading.
+            time.sleep(interval)
+            current = _snapshot()
+            changed = _changed(state, current)
+            state = current
+            session.on_change(changed)
+    except KeyboardInterrupt:
+        print("[watch] stopped.")
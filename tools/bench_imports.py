@@ -0,0 +1,111 @@
+"""Import-time benchmark and guard for the generator's startup path.
+
+Each case imports something in a fresh interpreter (so nothing is cached
+in-process), several times, and reports the median wall time of the import.
+It also checks that the case did not drag in modules it should never need:
+the lazy `omg` bootstrap (`omg_bootstrap.py`) and the write-stage imports
+inside `WadBuilder.write_udmf()` are what keep those out. A forbidden module
+showing up is a regression and makes the script exit 1. Timing only fails
+when `--budget-ms` is given, since it depends on the machine.
+
+Usage:
+    python tools/bench_imports.py [--runs 5] [--budget-ms 120] [--top 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+GENERATOR_DIR = os.path.join(REPO, 'src', 'python_generator')
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    code: str
+    # Modules that must not be imported by `code`.
+    forbidden: tuple[str, ...]
+
+
+CASES = (
+    Case('omg.wad (read lumps)', 'import omg_bootstrap\nfrom omg.wad import WAD',
+         ('omg.mapedit', 'omg.udmf', 'omg.lineinfo', 'omg.thinginfo')),
+    Case('builder', 'import builder',
+         ('numpy', 'sqlite3', 'concurrent.futures.process', 'nodebuilder', 'reject',
+          'blockmap', 'map_lint', 'sqlite_export', 'map_simplify', 'map_reorder', 'textmap_writer')),
+    Case('hostel_generator', 'import hostel_generator',
+         ('sqlite3', 'concurrent.futures.process', 'nodebuilder', 'reject', 'sqlite_export')),
+)
+
+_PROBE = r'''
+import json, sys, time
+sys.path.insert(0, {gen!r})
+t0 = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"ms": elapsed * 1000.0, "modules": sorted(sys.modules)}}))
+'''
+
+
+def _probe(case: Case) -> tuple[float, list[str]]:
+    code = _PROBE.format(gen=GENERATOR_DIR, code=case.code)
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=REPO)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{case.name}: import failed:\n{proc.stderr.strip()}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return float(result['ms']), result['modules']
+
+
+def _slowest(case: Case, top: int) -> list[tuple[int, str]]:
+    """(self us, module) of the most expensive imports at any depth, from `-X importtime`."""
+    code = f'import sys; sys.path.insert(0, {GENERATOR_DIR!r})\n{case.code}'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, cwd=REPO)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        if own.strip().isdigit():
+            rows.append((int(own), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per case (default 5)')
+    parser.add_argument('--budget-ms', type=float, default=None, help='fail if a median exceeds this')
+    parser.add_argument('--top', type=int, default=0, help='also list the N most expensive modules per case (own import time)')
+    args = parser.parse_args(argv)
+
+    failures = []
+    for case in CASES:
+        times = []
+        modules: list[str] = []
+        for _ in range(max(1, args.runs)):
+            ms, modules = _probe(case)
+            times.append(ms)
+        median = statistics.median(times)
+        leaked = [m for m in case.forbidden if m in modules]
+        print(f"{case.name:<22} median {median:7.1f} ms  (min {min(times):.1f}, {len(modules)} modules)")
+        if leaked:
+            failures.append(f"{case.name}: imported {', '.join(leaked)}")
+        if args.budget_ms is not None and median > args.budget_ms:
+            failures.append(f"{case.name}: {median:.1f} ms > budget {args.budget_ms:.1f} ms")
+        for us, name in _slowest(case, args.top):
+            print(f"    {us / 1000.0:7.1f} ms  {name}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,394 @@
+"""Cross-platform build driver: the `compile_py_map.bat` pipeline as a task DAG.
+
+    acs ──> pk3
+    map ──> nodes
+
+Every task declares its inputs (files/globs) and outputs. A task is skipped
+when the hash of its inputs, its dependencies' outputs and its signature
+(command line, resolved tool, H9_* environment) matches the last successful
+run and its outputs are still on disk unchanged. Independent tasks run
+concurrently, so the ACS compile and the PK3 overlap the map generation.
+The PK3 is written in-process by `pk3_writer.py`.
+State lives in `build/.h9build.json`.
+
+External tools are looked up in this order: environment variable, PATH,
+the Ultimate Doom Builder paths from the batch files. When a tool is
+missing a local stand-in runs instead:
+
+- `acc` (H9_ACC, include dir H9_ACS_INC): skipped with a warning, as the
+  batch file does. A previously compiled `h9_intro.o` is kept and still
+  packed; without one the intro text will not appear.
+- `zdbsp` (H9_ZDBSP): the in-process `nodebuilder.py`/`blockmap.py`
+  (BLOCKMAP and ZNODES as compressed GL nodes, ZGLN, which is what zdbsp
+  writes for UDMF maps). Set H9_ZDBSP=python to force the stand-in where
+  zdbsp is installed. The two builders do not produce identical lumps, so
+  switching between them invalidates the `nodes` cache.
+
+Usage:
+    python tools/build_map.py              # build everything that changed
+    python tools/build_map.py nodes        # only the playable WAD
+    python tools/build_map.py --run        # build, then launch (H9_DOOM_EXE, H9_IWAD)
+    python tools/build_map.py --force      # ignore the cache
+    python tools/build_map.py --dry-run    # list what would run
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from pk3_writer import ACS_OBJ, DEFS_FILES, DEFS_PK3, defs_entries, write_pk3
+
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BUILD = os.path.join(REPO, 'build')
+STATE_PATH = os.path.join(BUILD, '.h9build.json')
+
+RAW_WAD = 'build/py_hostel_full_raw.wad'
+OUT_WAD = 'build/py_hostel_full.wad'
+
+UDB_COMPILERS = r'C:\Games\Ultimate Doom Builder\Compilers'
+# Tool override value that selects the in-process stand-in.
+STAND_IN = 'python'
+
+
+class BuildError(Exception):
+    pass
+
+
+def _path(rel: str) -> str:
+    return os.path.join(REPO, *rel.split('/'))
+
+
+@dataclass(frozen=True)
+class Tool:
+    """An external program: env override, then PATH, then known install paths."""
+
+    name: str
+    env: str
+    defaults: tuple[str, ...] = ()
+
+    def resolve(self) -> Optional[str]:
+        override = os.environ.get(self.env, '').strip()
+        if override:
+            if override.lower() == STAND_IN:
+                return None
+            return override if os.path.isfile(override) else shutil.which(override)
+        found = shutil.which(self.name)
+        if found:
+            return found
+        for candidate in self.defaults:
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+
+ACC = Tool('acc', 'H9_ACC', (
+    UDB_COMPILERS + r'\ZDoom\acc.exe',
+    UDB_COMPILERS + r'\ACS\acc.exe',
+))
+ZDBSP = Tool('zdbsp', 'H9_ZDBSP', (UDB_COMPILERS + r'\Nodebuilders\zdbsp.exe',))
+DOOM = Tool('uzdoom', 'H9_DOOM_EXE', (r'C:\Games\Windows-UZDoom-4.14.3\uzdoom.exe',))
+
+
+def _acs_include(acc: str) -> str:
+    inc = os.environ.get('H9_ACS_INC', '').strip()
+    if inc:
+        return inc
+    # UDB keeps zcommon.acs in Compilers\ACS; otherwise look next to acc.
+    udb_inc = os.path.join(os.path.dirname(os.path.dirname(acc)), 'ACS')
+    return udb_inc if os.path.isdir(udb_inc) else os.path.dirname(acc)
+
+
+@dataclass
+class Task:
+    name: str
+    inputs: list[str]
+    outputs: list[str]
+    action: Callable[['Task'], None]
+    deps: tuple[str, ...] = ()
+    # Extra text that invalidates the cache when it changes (command, tool, env).
+    signature: Callable[[], str] = lambda: ''
+    # Outputs may legitimately be absent (e.g. no ACS compiler).
+    optional_outputs: bool = False
+    status: str = field(default='pending', init=False)
+
+
+def _file_hash(path: str) -> Optional[str]:
+    if not os.path.isfile(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _expand(patterns: list[str]) -> list[str]:
+    files: set[str] = set()
+    for pattern in patterns:
+        for match in glob.glob(_path(pattern), recursive=True):
+            if os.path.isfile(match) and '__pycache__' not in match:
+                files.add(os.path.relpath(match, REPO).replace(os.sep, '/'))
+    return sorted(files)
+
+
+# Tool locations only matter to the tasks that run those tools.
+_TOOL_ENV = {'H9_ACC', 'H9_ACS_INC', 'H9_ZDBSP', 'H9_DOOM_EXE', 'H9_IWAD'}
+
+
+def _env_signature() -> str:
+    return ';'.join(f'{k}={v}' for k, v in sorted(os.environ.items()) if k.startswith('H9_') and k not in _TOOL_ENV)
+
+
+class Graph:
+    def __init__(self, tasks: list[Task]):
+        self.tasks = {t.name: t for t in tasks}
+        self._lock = threading.Lock()
+        try:
+            with open(STATE_PATH, 'r', encoding='utf-8') as f:
+                self.state: dict = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def closure(self, targets: list[str]) -> list[str]:
+        """`targets` and everything they depend on, in dependency order."""
+        order: list[str] = []
+        seen: set[str] = set()
+
+        def visit(name: str, stack: tuple[str, ...]) -> None:
+            if name not in self.tasks:
+                raise BuildError(f"Unknown task {name!r} (known: {', '.join(self.tasks)})")
+            if name in stack:
+                raise BuildError(f"Dependency cycle: {' -> '.join(stack + (name,))}")
+            if name in seen:
+                return
+            for dep in self.tasks[name].deps:
+                visit(dep, stack + (name,))
+            seen.add(name)
+            order.append(name)
+
+        for target in targets:
+            visit(target, ())
+        return order
+
+    def input_hash(self, task: Task) -> str:
+        h = hashlib.sha256()
+        h.update(task.signature().encode('utf-8'))
+        files = _expand(task.inputs) + [o for d in task.deps for o in self.tasks[d].outputs]
+        for rel in files:
+            h.update(f'\0{rel}\0{_file_hash(_path(rel))}'.encode('utf-8'))
+        return h.hexdigest()
+
+    def up_to_date(self, task: Task, digest: str) -> bool:
+        entry = self.state.get(task.name)
+        if not entry or entry.get('inputs') != digest:
+            return False
+        recorded = entry.get('outputs', {})
+        return all(_file_hash(_path(o)) == recorded.get(o) for o in task.outputs)
+
+    def record(self, task: Task, digest: str) -> None:
+        outputs = {o: _file_hash(_path(o)) for o in task.outputs}
+        missing = [o for o, h in outputs.items() if h is None]
+        if missing and not task.optional_outputs:
+            raise BuildError(f"{task.name}: declared outputs not produced: {', '.join(missing)}")
+        with self._lock:
+            self.state[task.name] = {'inputs': digest, 'outputs': outputs}
+            os.makedirs(BUILD, exist_ok=True)
+            tmp = STATE_PATH + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=1, sort_keys=True)
+            os.replace(tmp, STATE_PATH)
+
+    def _execute(self, task: Task, force: bool, dry_run: bool) -> str:
+        if dry_run and any(self.tasks[d].status == 'would run' for d in task.deps):
+            # Its inputs will change once the dependency actually runs.
+            return 'would run'
+        digest = self.input_hash(task)
+        if not force and self.up_to_date(task, digest):
+            return 'up to date'
+        if dry_run:
+            return 'would run'
+        print(f"[{task.name}] running", flush=True)
+        task.action(task)
+        self.record(task, digest)
+        return 'built'
+
+    def run(self, targets: list[str], *, jobs: int, force: bool = False, dry_run: bool = False) -> None:
+        order = self.closure(targets)
+        waiting = {name: set(self.tasks[name].deps) for name in order}
+        failed: Optional[BaseException] = None
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            running = {}
+            while waiting or running:
+                if failed is None:
+                    for name in [n for n, deps in waiting.items() if not deps]:
+                        del waiting[name]
+                        running[pool.submit(self._execute, self.tasks[name], force, dry_run)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    task = self.tasks[name]
+                    try:
+                        task.status = fut.result()
+                    except BaseException as e:  # noqa: BLE001 - reported below, after running tasks finish
+                        task.status = 'failed'
+                        failed = failed or e
+                        print(f"[{name}] failed: {e}", flush=True)
+                        continue
+                    print(f"[{name}] {task.status}", flush=True)
+                    for deps in waiting.values():
+                        deps.discard(name)
+        if failed is not None:
+            raise BuildError(str(failed)) from failed
+
+
+def _run(cmd: list[str]) -> None:
+    print('  $ ' + subprocess.list2cmdline(cmd), flush=True)
+    proc = subprocess.run(cmd, cwd=REPO)
+    if proc.returncode != 0:
+        raise BuildError(f"{os.path.basename(cmd[0])} exited with {proc.returncode}")
+
+
+# ---------------------------------------------------------------------------
+# Actions
+# ---------------------------------------------------------------------------
+
+def _acs(task: Task) -> None:
+    out = _path(ACS_OBJ)
+    acc = ACC.resolve()
+    if acc is None:
+        if os.path.isfile(out):
+            print(f"  Warning: acc not found (set H9_ACC); packing the existing {ACS_OBJ}, which may be stale.")
+        else:
+            print("  Warning: acc not found (set H9_ACC); skipping ACS, intro text will not appear.")
+        return
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    _run([acc, '-i', _acs_include(acc), _path('src/acs/h9_intro.acs'), out])
+
+
+def _map(task: Task) -> None:
+    _run([sys.executable, _path('src/python_generator/main_hostel.py')])
+
+
+def _nodes(task: Task) -> None:
+    zdbsp = ZDBSP.resolve()
+    if zdbsp is not None:
+        _run([zdbsp, '-c', '-X', '-o' + _path(OUT_WAD), _path(RAW_WAD)])
+    else:
+        print("  zdbsp not found (set H9_ZDBSP); using the Python node builder.")
+        python_nodebuilder(_path(RAW_WAD), _path(OUT_WAD))
+
+
+def python_nodebuilder(raw_path: str, out_path: str) -> None:
+    """Stand-in for zdbsp: add ZGLN ZNODES and BLOCKMAP to every UDMF map, TEXTMAP untouched."""
+    gen_dir = _path('src/python_generator')
+    if gen_dir not in sys.path:
+        sys.path.append(gen_dir)
+    import omg_bootstrap  # noqa: F401
+    from omg.lump import Lump  # type: ignore
+    from omg.udmf import UMapEditor  # type: ignore
+    from omg.wad import WAD, NameGroup  # type: ignore
+    from blockmap import build_blockmap
+    from nodebuilder import build_nodes, node_workers_from_env
+
+    wad = WAD(raw_path)
+    for name, group in list(wad.udmfmaps.items()):
+        umap = UMapEditor(group)
+        nodes = build_nodes(umap, workers=node_workers_from_env())
+        print(f"  {name}: {nodes.summary()}", flush=True)
+        extra = {'ZNODES': nodes.to_znodes(compress=True)}
+        blockmap = build_blockmap(umap)
+        if blockmap is not None:
+            extra['BLOCKMAP'] = blockmap
+        rebuilt = NameGroup()
+        for lump_name, lump in group.items():
+            if lump_name in extra:
+                continue
+            rebuilt[lump_name] = lump
+            if lump_name == 'TEXTMAP':
+                for extra_name, data in extra.items():
+                    rebuilt[extra_name] = Lump(data)
+        wad.udmfmaps[name] = rebuilt
+    wad.to_file(out_path)
+
+
+def _pk3(task: Task) -> None:
+    print(f"  {write_pk3(_path(DEFS_PK3), defs_entries()).summary()}")
+
+
+def _tool_signature(tool: Tool, *args: str) -> Callable[[], str]:
+    return lambda: '|'.join((tool.name, str(tool.resolve()), *args))
+
+
+def _nodes_signature() -> str:
+    zdbsp = ZDBSP.resolve()
+    if zdbsp is not None:
+        return '|'.join(('zdbsp', zdbsp, '-c', '-X'))
+    # The stand-in's output depends on its own source, not on a tool binary.
+    # H9_NODE_WORKERS is left out: `_assemble` numbers a parallel build like
+    # a serial one, so the lump is the same for any worker count.
+    sources = ('src/python_generator/nodebuilder.py', 'src/python_generator/blockmap.py')
+    return '|'.join((STAND_IN, 'zgln', *(str(_file_hash(_path(p))) for p in sources)))
+
+
+def default_tasks() -> list[Task]:
+    return [
+        Task('acs', ['src/acs/**/*.acs'], [ACS_OBJ], _acs,
+             signature=_tool_signature(ACC), optional_outputs=True),
+        Task('map', ['src/python_generator/**/*.py', 'assets/**/*'], [RAW_WAD], _map,
+             signature=lambda: f'{sys.executable}|{_env_signature()}'),
+        Task('nodes', [], [OUT_WAD], _nodes, deps=('map',),
+             signature=_nodes_signature),
+        Task('pk3', list(DEFS_FILES) + ['tools/pk3_writer.py'], [DEFS_PK3], _pk3, deps=('acs',)),
+    ]
+
+
+def launch() -> None:
+    exe = DOOM.resolve() or shutil.which('gzdoom')
+    if exe is None:
+        raise BuildError("Doom executable not found (set H9_DOOM_EXE)")
+    iwad = os.environ.get('H9_IWAD', '').strip() or os.path.join(os.path.dirname(exe), 'DOOM2.WAD')
+    if not os.path.isfile(iwad):
+        raise BuildError(f"IWAD not found at {iwad} (set H9_IWAD)")
+    # Vulkan shows dark flashes on some systems; prefer OpenGL (see run_map.bat).
+    cmd = [exe, '-iwad', iwad, '-file', _path(OUT_WAD), _path(DEFS_PK3), '-warp', '1', '+vid_preferbackend', '0']
+    print('Launching: ' + subprocess.list2cmdline(cmd))
+    subprocess.Popen(cmd, cwd=REPO)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    tasks = default_tasks()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('targets', nargs='*', help=f"tasks to build (default: nodes pk3; known: {', '.join(t.name for t in tasks)})")
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='tasks run concurrently (default 4)')
+    parser.add_argument('--force', action='store_true', help='rebuild even if inputs are unchanged')
+    parser.add_argument('--dry-run', action='store_true', help='only report which tasks would run')
+    parser.add_argument('--run', action='store_true', help='launch the engine after a successful build')
+    args = parser.parse_args(argv)
+
+    graph = Graph(tasks)
+    try:
+        graph.run(args.targets or ['nodes', 'pk3'], jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+        if args.run and not args.dry_run:
+            launch()
+    except BuildError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,14 @@
 import os
-import sys
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "omgifol")))
-from omg import WAD  # type: ignore
+from udmf_tables import parse_textmap, read_textmap
 
 wad_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "build", "py_hostel_full.wad"))
-w = WAD(wad_path)
-
-m = next(iter(w.udmfmaps.keys()))
-t = w.udmfmaps[m]["TEXTMAP"].data.decode("utf-8", errors="replace")
+m, textmap = read_textmap(wad_path)
+tables = parse_textmap(textmap)
 
 print("WAD:", wad_path)
 print("UDMF map lump:", m)
 print("Has any 'texturefloor = \"F_SKY1\"'?")
-print("texturefloor = \"F_SKY1\"" in t)
+print("F_SKY1" in tables.sectors.col("texturefloor"))
 print("Has any 'textureceiling = \"F_SKY1\"'?")
-print("textureceiling = \"F_SKY1\"" in t)
+print("F_SKY1" in tables.sectors.col("textureceiling"))
@@ -1,55 +1,23 @@
 import os
-import sys
 from collections import Counter
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "omgifol")))
-from omg import WAD  # type: ignore
+from udmf_tables import parse_textmap, read_textmap
 
 wad_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "build", "py_hostel_full.wad"))
-wad = WAD(); wad.from_file(wad_path)
+map_name, textmap = read_textmap(wad_path)
+tables = parse_textmap(textmap)
 
-# For UDMF maps, omgifol stores them under `udmfmaps` (TEXTMAP...ENDMAP)
-map_name = None
-for name in wad.udmfmaps.keys():
-    map_name = name
-    break
-
-if not map_name:
-    raise RuntimeError("No UDMF maps found in WAD")
-
-textmap = wad.udmfmaps[map_name]["TEXTMAP"].data.decode("utf-8", errors="replace")
+floors: list[str] = tables.sectors.col("texturefloor", "")
+ceils: list[str] = tables.sectors.col("textureceiling", "")
+walls: list[str] = [
+    tex
+    for key in ("texturetop", "texturemiddle", "texturebottom")
+    for tex in tables.sidedefs.col(key, "")
+]
 
 print("WAD:", wad_path)
-print("GRASS1 occurrences in TEXTMAP:", textmap.count('"GRASS1"'))
-print("F_SKY1 occurrences in TEXTMAP:", textmap.count('"F_SKY1"'))
-
-floors: list[str] = []
-ceils: list[str] = []
-
-# UDMF emitted by omgifol uses:
-#   sector // 0
-#   {
-#     texturefloor = "...";
-#     ...
-#   }
-pending_sector = False
-in_sector = False
-for line in textmap.splitlines():
-    s = line.strip()
-    if not in_sector and s.startswith("sector"):
-        pending_sector = True
-        continue
-    if pending_sector and s == "{":
-        in_sector = True
-        pending_sector = False
-        continue
-    if in_sector:
-        if s.startswith("texturefloor"):
-            floors.append(s.split("=", 1)[1].strip().strip(";").strip().strip('"'))
-        elif s.startswith("textureceiling"):
-            ceils.append(s.split("=", 1)[1].strip().strip(";").strip().strip('"'))
-        elif s == "}":
-            in_sector = False
+print("GRASS1 occurrences in TEXTMAP:", walls.count("GRASS1") + floors.count("GRASS1") + ceils.count("GRASS1"))
+print("F_SKY1 occurrences in TEXTMAP:", floors.count("F_SKY1") + ceils.count("F_SKY1"))
 
 print("\nTop floor textures:")
 for tex, count in Counter(floors).most_common(20):
@@ -1,14 +1,11 @@
 from __future__ import annotations
 
 import os
-import re
 import sys
 from collections import Counter
-from typing import Any, Iterable, Mapping, Optional, Protocol, TypedDict, TypeVar, cast
+from typing import Any, Iterable, Optional, TypedDict, TypeVar
 
-
-class _Lump(Protocol):
-    data: bytes
+from udmf_tables import parse_textmap, read_textmap
 
 
 SectorInfo = tuple[
@@ -66,28 +63,19 @@ def main() -> int:
     repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     wad_path = os.path.join(repo_root, "build", "py_hostel_full.wad")
 
-    sys.path.append(os.path.join(repo_root, "tools", "omgifol"))
-    from omg import WAD  # type: ignore
-
-    # `omgifol` ships without type hints; isolate it behind `Any`/casts.
-    w: Any = WAD(wad_path)
-    udmfmaps: Mapping[str, Mapping[str, _Lump]] = cast(Mapping[str, Mapping[str, _Lump]], getattr(w, "udmfmaps", {}))
-
-    if not udmfmaps:
-        print("No UDMF maps found in:", wad_path)
-        return 1
-
-    mapname: str = next(iter(udmfmaps.keys()))
-    textmap = udmfmaps[mapname].get("TEXTMAP")
-    if not textmap:
-        print("UDMF map is missing TEXTMAP in:", wad_path)
+    try:
+        mapname, textmap = read_textmap(wad_path)
+    except RuntimeError as e:
+        print(e)
         return 1
 
-    text: str = textmap.data.decode("utf-8", errors="replace")
+    # Single pass over the TEXTMAP; everything below reads typed columns.
+    tables = parse_textmap(textmap)
 
     print("WAD:", wad_path)
     print("UDMF map:", mapname)
 
+    present = tables.keys_present()
     suspects = []
     for key in [
         "fadecolor",
@@ -101,39 +89,22 @@ def main() -> int:
         "renderstyle",
         "alpha",
     ]:
-        if key in text:
+        if key in present:
             suspects.append(key)
     print("Contains keys:", suspects)
 
-    sectors: list[SectorInfo] = []
-
-    def get_str(block: str, k: str) -> Optional[str]:
-        m = re.search(rf"\b{k}\s*=\s*\"([^\"]*)\"\s*;", block)
-        return m.group(1) if m else None
-
-    def get_int(block: str, k: str) -> Optional[int]:
-        m = re.search(rf"\b{k}\s*=\s*(-?\d+)\s*;", block)
-        return int(m.group(1)) if m else None
-
-    # UDMF blocks are typically written like:
-    #   sector // 123
-    #   {
-    #     ...
-    #   }
-    # Important: avoid matching `sector = 0;` (a sidedef property).
-    sector_pat = re.compile(r"(?ms)^\s*sector\b[^\r\n]*\r?\n\{(.*?)\r?\n\}")
-    for m in sector_pat.finditer(text):
-        block = m.group(1)
-        floor_tex = get_str(block, "texturefloor")
-        ceil_tex = get_str(block, "textureceiling")
-        light = get_int(block, "lightlevel")
-        zf = get_int(block, "heightfloor")
-        zc = get_int(block, "heightceiling")
-        sec_id = get_int(block, "id")  # sector tag in UDMF
-        special = get_int(block, "special")
-        fade = get_str(block, "fadecolor")
-        cmap = get_str(block, "colormap")
-        sectors.append((floor_tex, ceil_tex, light, zf, zc, sec_id, special, fade, cmap))
+    sec = tables.sectors
+    sectors: list[SectorInfo] = list(zip(
+        sec.col("texturefloor"),
+        sec.col("textureceiling"),
+        sec.col("lightlevel"),
+        sec.col("heightfloor"),
+        sec.col("heightceiling"),
+        sec.col("id"),  # sector tag in UDMF
+        sec.col("special"),
+        sec.col("fadecolor"),
+        sec.col("colormap"),
+    ))
 
     print("Total sectors:", len(sectors))
 
@@ -196,55 +167,41 @@ def main() -> int:
         print(f"  {cnt:4d} {tex}")
 
     # Scan sidedefs for empty texture strings (""), which can produce weird visuals.
-    empty_tex = 0
-    sidedef_pat = re.compile(r"(?ms)^\s*sidedef\b[^\r\n]*\r?\n\{(.*?)\r?\n\}")
-    sidedefs: list[SidedefInfo] = []
-    for m in sidedef_pat.finditer(text):
-        block = m.group(1)
-        tex_mid = get_str(block, "texturemiddle")
-        tex_top = get_str(block, "texturetop")
-        tex_bot = get_str(block, "texturebottom")
-        sec = get_int(block, "sector")
-        sidedef: SidedefInfo = {
-            "texturemiddle": tex_mid,
-            "texturetop": tex_top,
-            "texturebottom": tex_bot,
-            "sector": sec,
-        }
-        sidedefs.append(sidedef)
-        for k in ["texturetop", "texturemiddle", "texturebottom"]:
-            if re.search(rf"\b{k}\s*=\s*\"\"\s*;", block):
-                empty_tex += 1
+    sd = tables.sidedefs
+    tex_cols = [sd.col(k) for k in ("texturetop", "texturemiddle", "texturebottom")]
+    empty_tex = sum(1 for col in tex_cols for v in col if v == "")
+    sidedefs: list[SidedefInfo] = [
+        {"texturemiddle": mid, "texturetop": top, "texturebottom": bot, "sector": sec_ref}
+        for top, mid, bot, sec_ref in zip(*tex_cols, sd.col("sector"))
+    ]
     print('Empty texture fields count (""):', empty_tex)
 
-    # Parse vertices so we can locate portal linedefs in world space.
-    vertex_pat = re.compile(r"(?ms)^\s*vertex\b[^\r\n]*\r?\n\{(.*?)\r?\n\}")
-    vertices: list[tuple[float, float]] = []
-    for m in vertex_pat.finditer(text):
-        block = m.group(1)
-        mx = re.search(r"\bx\s*=\s*([-0-9.]+)\s*;", block)
-        my = re.search(r"\by\s*=\s*([-0-9.]+)\s*;", block)
-        if not (mx and my):
-            continue
-        vertices.append((float(mx.group(1)), float(my.group(1))))
+    # Vertices, so we can locate portal linedefs in world space.
+    vertices: list[tuple[float, float]] = [
+        (float(x), float(y))
+        for x, y in zip(tables.vertices.col("x"), tables.vertices.col("y"))
+        if x is not None and y is not None
+    ]
 
     # Analyze linedef specials (3D floors / portals live here, not in sectors).
-    linedef_pat = re.compile(r"(?ms)^\s*linedef\b[^\r\n]*\r?\n\{(.*?)\r?\n\}")
+    ld_tab = tables.linedefs
+    arg_cols = [ld_tab.col(f"arg{i}", 0) for i in range(5)]
     linedefs: list[LinedefInfo] = []
     linedefs_full: list[LinedefFull] = []
     hom_prone = 0
     hom_samples: list[dict[str, Any]] = []
     portal_samples: list[PortalSample] = []
-    for m in linedef_pat.finditer(text):
-        block = m.group(1)
-        special = get_int(block, "special") or 0
-        args: LinedefArgs = tuple((get_int(block, f"arg{i}") or 0) for i in range(5))  # type: ignore[assignment]
-        lid = get_int(block, "id")
-        flags = get_int(block, "flags") or 0
-        sf = get_int(block, "sidefront")
-        sb = get_int(block, "sideback")
-        v1 = get_int(block, "v1")
-        v2 = get_int(block, "v2")
+    for special, args_row, lid, flags, sf, sb, v1, v2 in zip(
+        ld_tab.col("special", 0),
+        zip(*arg_cols),
+        ld_tab.col("id"),
+        ld_tab.col("flags", 0),
+        ld_tab.col("sidefront"),
+        ld_tab.col("sideback"),
+        ld_tab.col("v1"),
+        ld_tab.col("v2"),
+    ):
+        args: LinedefArgs = tuple(args_row)  # type: ignore[assignment]
         linedefs.append((special, args, lid, flags))
         linedef_full: LinedefFull = {
             "id": lid,
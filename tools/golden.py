@@ -0,0 +1,352 @@
+"""Golden-output regression harness for `WadBuilder.save()`.
+
+Builds the hostel under a few reference configs (`CONFIGS`: sets of `H9_*`
+options), hashes every lump of the written WAD and compares against
+`tools/golden/<config>.json`. A performance refactor is output-identical
+when every config still matches.
+
+Besides the lump hashes, each golden file points at a records file
+(`records-<hash>.json.gz`, shared by configs that produce the same map
+model) holding one short digest per map element, keyed by position and
+provenance (see `provenance.py`):
+
+- sector: owner label + bounding box of its lines (+ `#n` if repeated)
+- linedef: owner label + its two vertices
+- thing: type + position
+
+On a mismatch the harness diffs those records instead of bytes and lists
+the sectors, lines and things that were added, removed or changed (with the
+new element's fields), which is usually enough to see what a change did. If
+every record matches but lumps differ, only ordering or encoding changed
+(e.g. `H9_MORTON`, the TEXTMAP writer, nodes).
+
+Usage:
+    python tools/golden.py                 # check every config, exit 1 on mismatch
+    python tools/golden.py default         # check some configs
+    python tools/golden.py --update        # rewrite the golden files after an intended change
+    python tools/golden.py --keep build/golden   # also keep the built WADs
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from wad_reader import WadReader
+
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+GENERATOR_DIR = os.path.join(REPO, 'src', 'python_generator')
+GOLDEN_DIR = os.path.join(REPO, 'tools', 'golden')
+
+# Config name -> environment for the build. Every other H9_* variable is
+# cleared so the caller's shell can't leak into the result.
+CONFIGS: dict[str, dict[str, str]] = {
+    'default': {},
+    'omgifol_textmap': {'H9_COMPACT_TEXTMAP': '0'},
+    'simplify_morton': {'H9_SIMPLIFY': '1', 'H9_MORTON': '1'},
+    # Pin the node workers so the build does not depend on the machine's CPU count.
+    'nodes_reject': {'H9_NODES': 'zgln', 'H9_REJECT': '1', 'H9_NODE_WORKERS': '1'},
+}
+
+RECORD_KINDS = ('sectors', 'linedefs', 'things')
+_DIGEST_LEN = 10
+
+
+@dataclass
+class Build:
+    config: str
+    lumps: list[dict]
+    records: dict[str, dict[str, str]]
+    # Fields of every record, for describing changes (not stored in golden files).
+    fields: dict[str, dict[str, dict]] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def _digest(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _canonical(fields: dict) -> str:
+    return json.dumps(fields, sort_keys=True, separators=(',', ':'))
+
+
+def _fields(block, drop: tuple[str, ...] = ()) -> dict:
+    return {k: v for k, v in block.__dict__.items() if v is not None and k not in drop}
+
+
+def _unique(keys: list[str]) -> list[str]:
+    """Suffix repeated keys with `#n` in element order."""
+    seen: dict[str, int] = {}
+    out = []
+    for key in keys:
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        out.append(key if n == 0 else f'{key}#{n}')
+    return out
+
+
+def element_records(umap, provenance) -> tuple[dict[str, dict[str, str]], dict[str, dict[str, dict]]]:
+    """(kind -> {key: digest}, kind -> {key: fields}) for the final UDMF model."""
+    verts = umap.vertexes
+    sectors, lines, sides = umap.sectors, umap.linedefs, umap.sidedefs
+    sec_owner, line_owner, _ = provenance.resolve(len(sectors), len(lines), len(sides))
+    labels = [o.label for o in provenance.owners]
+
+    def owner(idx: Optional[int]) -> str:
+        return labels[idx] if idx is not None else '-'
+
+    def point(v: int) -> str:
+        return f'{verts[v].x:g},{verts[v].y:g}'
+
+    # Sector bounding boxes from the lines that reference them.
+    boxes: list[Optional[list[float]]] = [None] * len(sectors)
+    for line in lines:
+        a, b = verts[line.v1], verts[line.v2]
+        for side in (line.sidefront, line.sideback):
+            if side is None or side < 0:
+                continue
+            s = sides[side].sector
+            box = boxes[s]
+            if box is None:
+                boxes[s] = [min(a.x, b.x), min(a.y, b.y), max(a.x, b.x), max(a.y, b.y)]
+            else:
+                box[0] = min(box[0], a.x, b.x)
+                box[1] = min(box[1], a.y, b.y)
+                box[2] = max(box[2], a.x, b.x)
+                box[3] = max(box[3], a.y, b.y)
+    sector_keys = _unique([
+        f"{owner(sec_owner[i])} [{','.join(f'{c:g}' for c in box)}]" if box else f'{owner(sec_owner[i])} [-]'
+        for i, box in enumerate(boxes)
+    ])
+
+    def side_fields(side: Optional[int]) -> Optional[dict]:
+        if side is None or side < 0:
+            return None
+        out = _fields(sides[side], ('sector',))
+        out['sector'] = sector_keys[sides[side].sector]
+        return out
+
+    line_keys = _unique([f'{owner(line_owner[i])} {point(l.v1)} {point(l.v2)}' for i, l in enumerate(lines)])
+    thing_keys = _unique([f'{t.type} @{t.x:g},{t.y:g}' for t in umap.things])
+
+    fields: dict[str, dict[str, dict]] = {
+        'sectors': {k: _fields(s) for k, s in zip(sector_keys, sectors)},
+        'linedefs': {
+            k: dict(_fields(l, ('v1', 'v2', 'sidefront', 'sideback')),
+                    front=side_fields(l.sidefront), back=side_fields(l.sideback))
+            for k, l in zip(line_keys, lines)
+        },
+        'things': {k: _fields(t) for k, t in zip(thing_keys, umap.things)},
+    }
+    records = {
+        kind: {k: _digest(_canonical(f).encode())[:_DIGEST_LEN] for k, f in items.items()}
+        for kind, items in fields.items()
+    }
+    return records, fields
+
+
+def lump_hashes(path: str) -> list[dict]:
+    with WadReader(path) as wad:
+        out = []
+        for entry in wad:
+            view = wad.lump(entry)
+            out.append({'name': entry.name, 'size': entry.size, 'sha256': _digest(view)})
+            view.release()
+        return out
+
+
+@contextlib.contextmanager
+def _config_env(env: dict[str, str]):
+    saved = {k: v for k, v in os.environ.items() if k.startswith('H9_')}
+    for k in saved:
+        del os.environ[k]
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for k in [k for k in os.environ if k.startswith('H9_')]:
+            del os.environ[k]
+        os.environ.update(saved)
+
+
+def build(config: str, out_path: str) -> Build:
+    """Generate and save the hostel under `config` in-process; hash and record the result."""
+    if GENERATOR_DIR not in sys.path:
+        sys.path.append(GENERATOR_DIR)
+    import main_hostel
+
+    start = time.perf_counter()
+    with _config_env(CONFIGS[config]), contextlib.redirect_stdout(io.StringIO()):
+        builder = main_hostel.generate()
+        umap = builder.to_udmf()
+        builder.write_udmf(umap, out_path)
+    records, fields = element_records(umap, builder.provenance)
+    return Build(config, lump_hashes(out_path), records, fields, time.perf_counter() - start)
+
+
+def golden_path(config: str) -> str:
+    return os.path.join(GOLDEN_DIR, f'{config}.json')
+
+
+def save_golden(result: Build) -> None:
+    """Write `<config>.json` (lump hashes) and its records file (shared by configs with the same model)."""
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    records = _canonical({kind: result.records[kind] for kind in RECORD_KINDS}).encode()
+    records_name = f'records-{_digest(records)[:_DIGEST_LEN]}.json.gz'
+    records_path = os.path.join(GOLDEN_DIR, records_name)
+    if not os.path.isfile(records_path):
+        with open(records_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0, filename='') as f:
+            f.write(records)
+    data = {
+        'config': result.config,
+        'env': CONFIGS[result.config],
+        'lumps': result.lumps,
+        'records': records_name,
+    }
+    with open(golden_path(result.config), 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(data, f, indent=1)
+        f.write('\n')
+
+
+def prune_records() -> None:
+    """Delete records files no golden file refers to any more."""
+    used = set()
+    for name in os.listdir(GOLDEN_DIR):
+        if name.endswith('.json'):
+            with open(os.path.join(GOLDEN_DIR, name), 'r', encoding='utf-8') as f:
+                used.add(json.load(f).get('records'))
+    for name in os.listdir(GOLDEN_DIR):
+        if name.startswith('records-') and name not in used:
+            os.remove(os.path.join(GOLDEN_DIR, name))
+
+
+def load_golden(config: str) -> Optional[dict]:
+    try:
+        with open(golden_path(config), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load_records(golden: dict) -> dict[str, dict[str, str]]:
+    name = golden.get('records')
+    if not name:
+        return {}
+    with gzip.open(os.path.join(GOLDEN_DIR, name), 'rb') as f:
+        return json.loads(f.read())
+
+
+def lump_diff(golden: list[dict], current: list[dict]) -> list[str]:
+    """Human-readable lines for lumps that differ (by position, then name)."""
+    out = []
+    if [l['name'] for l in golden] != [l['name'] for l in current]:
+        out.append(f"lump list changed: {len(golden)} -> {len(current)} lumps")
+    old = {}
+    for lump in golden:
+        old.setdefault(lump['name'], []).append(lump)
+    for i, lump in enumerate(current):
+        prev = old.get(lump['name'])
+        if not prev:
+            out.append(f"  + {lump['name']} ({lump['size']} bytes)")
+            continue
+        ref = prev.pop(0)
+        if ref['sha256'] != lump['sha256']:
+            out.append(f"  ~ {lump['name']}: {ref['size']} -> {lump['size']} bytes")
+    for name, rest in old.items():
+        for lump in rest:
+            out.append(f"  - {name} ({lump['size']} bytes)")
+    return out
+
+
+def structural_diff(golden: dict[str, dict[str, str]], result: Build, limit: int) -> tuple[list[str], bool]:
+    """(report lines, any element differs) comparing record digests per kind."""
+    out = []
+    differs = False
+    for kind in RECORD_KINDS:
+        old = golden.get(kind, {})
+        new = result.records[kind]
+        added = sorted(new.keys() - old.keys())
+        removed = sorted(old.keys() - new.keys())
+        changed = sorted(k for k in new.keys() & old.keys() if new[k] != old[k])
+        if not (added or removed or changed):
+            continue
+        differs = True
+        out.append(f"{kind}: {len(old)} -> {len(new)}  "
+                   f"(+{len(added)} added, -{len(removed)} removed, ~{len(changed)} changed)")
+        for sign, keys in (('+', added), ('-', removed), ('~', changed)):
+            for key in keys[:limit]:
+                detail = '' if sign == '-' else '  ' + _canonical(result.fields[kind][key])
+                if len(detail) > 160:
+                    detail = detail[:157] + '...'
+                out.append(f"  {sign} {key}{detail}")
+            if len(keys) > limit:
+                out.append(f"  {sign} ... {len(keys) - limit} more")
+    return out, differs
+
+
+def check(config: str, result: Build, limit: int) -> bool:
+    golden = load_golden(config)
+    if golden is None:
+        print(f"[{config}] no golden file; run with --update to create {os.path.relpath(golden_path(config), REPO)}")
+        return False
+    if golden['lumps'] == result.lumps:
+        print(f"[{config}] OK  {len(result.lumps)} lumps identical ({result.seconds:.1f}s)")
+        return True
+    print(f"[{config}] MISMATCH ({result.seconds:.1f}s)")
+    for line in lump_diff(golden['lumps'], result.lumps):
+        print(f"  {line}")
+    lines, differs = structural_diff(load_records(golden), result, limit)
+    if not differs:
+        print("  all sectors, lines and things match: only element order or lump encoding changed")
+    for line in lines:
+        print(f"  {line}")
+    return False
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('configs', nargs='*', help=f"configs to run (default: all of {', '.join(CONFIGS)})")
+    parser.add_argument('--update', action='store_true', help='write the results as the new golden files')
+    parser.add_argument('--limit', type=int, default=10, help='elements listed per added/removed/changed group')
+    parser.add_argument('--keep', metavar='DIR', default=None, help='keep the built WADs in DIR as <config>.wad')
+    args = parser.parse_args(argv)
+
+    unknown = [c for c in args.configs if c not in CONFIGS]
+    if unknown:
+        parser.error(f"unknown config(s): {', '.join(unknown)} (known: {', '.join(CONFIGS)})")
+
+    ok = True
+    with tempfile.TemporaryDirectory(prefix='h9golden') as tmp:
+        out_dir = os.path.abspath(args.keep) if args.keep else tmp
+        os.makedirs(out_dir, exist_ok=True)
+        for config in args.configs or list(CONFIGS):
+            try:
+                result = build(config, os.path.join(out_dir, f'{config}.wad'))
+            except Exception as e:  # noqa: BLE001 - report and keep checking the other configs
+                print(f"[{config}] build failed: {e!r}")
+                ok = False
+                continue
+            if args.update:
+                save_golden(result)
+                print(f"[{config}] wrote {os.path.relpath(golden_path(config), REPO)} "
+                      f"({len(result.lumps)} lumps, {result.seconds:.1f}s)")
+            else:
+                ok = check(config, result, args.limit) and ok
+    if args.update:
+        prune_records()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
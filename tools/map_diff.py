@@ -0,0 +1,361 @@
+"""Visual regression diff between two built maps (UDMF TEXTMAP).
+
+Both maps are rasterized onto the same grid (the union of their bounds) into
+per-pixel channels:
+
+- `sector`: which side of the map edge the pixel is on (inside a sector or void)
+- `floor` / `ceiling`: sector heights
+- `sector_special`: sector special
+- `walls`: linedefs crossing the pixel (2 = one-sided, 1 = two-sided)
+- `line_special`: the largest line special crossing the pixel
+
+Sectors are filled with a scanline pass: every non-horizontal linedef is
+intersected with every pixel-row centre it spans, the sector on the +x side
+of each crossing is recorded at the first pixel after it, and a running
+maximum along each row carries it to the next crossing. Lines are sampled
+at half a pixel. Everything is NumPy; no per-pixel Python loops.
+
+Pixels whose channels differ are painted on a heat map (`<out>.png`) over a
+dim copy of the new map, and grouped into changed regions (connected
+`--merge`-pixel tiles) whose bounding boxes, in map units, are printed and
+written to `<out>.json`. The exit status is 1 when anything changed, like
+`diff`.
+
+Usage:
+    python tools/map_diff.py OLD.wad NEW.wad [--map MAP01] [--scale 8] [--out build/map_diff]
+
+e.g. keep a copy of `build/py_hostel_full_raw.wad` from before a layout
+refactor and diff it against the regenerated one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    import numpy as np  # type: ignore
+except ModuleNotFoundError:
+    np = None
+
+from udmf_tables import parse_textmap, read_textmap
+
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+GENERATOR_DIR = os.path.join(REPO, 'src', 'python_generator')
+
+CHANNELS = ('sector', 'floor', 'ceiling', 'sector_special', 'walls', 'line_special')
+
+# Heat-map colour per channel; earlier channels win where several differ.
+CHANNEL_COLORS = {
+    'sector': (255, 0, 255),
+    'walls': (255, 255, 255),
+    'floor': (255, 60, 0),
+    'ceiling': (255, 200, 0),
+    'sector_special': (0, 230, 0),
+    'line_special': (0, 200, 255),
+}
+_PAINT_ORDER = ('line_special', 'sector_special', 'ceiling', 'floor', 'walls', 'sector')
+
+VOID = -1
+
+
+@dataclass(frozen=True)
+class Grid:
+    x0: float
+    y1: float
+    scale: float
+    width: int
+    height: int
+
+    @classmethod
+    def covering(cls, bounds: list[tuple[float, float, float, float]], scale: float, margin: float) -> 'Grid':
+        x0 = min(b[0] for b in bounds) - margin
+        y0 = min(b[1] for b in bounds) - margin
+        x1 = max(b[2] for b in bounds) + margin
+        y1 = max(b[3] for b in bounds) + margin
+        return cls(x0, y1, float(scale), max(1, int(np.ceil((x1 - x0) / scale))), max(1, int(np.ceil((y1 - y0) / scale))))
+
+    def to_world(self, c0: int, r0: int, c1: int, r1: int) -> tuple[int, int, int, int]:
+        """Pixel box (inclusive) -> (x0, y0, x1, y1) in map units."""
+        s = self.scale
+        return (int(self.x0 + c0 * s), int(self.y1 - (r1 + 1) * s), int(self.x0 + (c1 + 1) * s), int(self.y1 - r0 * s))
+
+
+class MapGeometry:
+    """The columns of one TEXTMAP that the rasterizer needs, as arrays."""
+
+    def __init__(self, path: str, map_name: Optional[str] = None) -> None:
+        self.path = path
+        self.map_name, textmap = read_textmap(path, map_name)
+        tables = parse_textmap(textmap)
+        # Kept for tools that need more columns (see render_cost.py).
+        self.tables = tables
+        self.vx = np.asarray(tables.vertices.col('x', 0.0), dtype=np.float64)
+        self.vy = np.asarray(tables.vertices.col('y', 0.0), dtype=np.float64)
+        lines = tables.linedefs
+        self.v1 = np.asarray(lines.col('v1', 0), dtype=np.int64)
+        self.v2 = np.asarray(lines.col('v2', 0), dtype=np.int64)
+        self.front = np.asarray(lines.col('sidefront', -1), dtype=np.int64)
+        self.back = np.asarray(lines.col('sideback', -1), dtype=np.int64)
+        self.line_special = np.asarray(lines.col('special', 0), dtype=np.int64)
+        side_sector = np.asarray(tables.sidedefs.col('sector', VOID) + [VOID], dtype=np.int64)
+        # Side -1 indexes the appended VOID.
+        self.front_sector = side_sector[self.front]
+        self.back_sector = side_sector[self.back]
+        sectors = tables.sectors
+        self.floor = np.asarray(sectors.col('heightfloor', 0), dtype=np.int64)
+        self.ceiling = np.asarray(sectors.col('heightceiling', 0), dtype=np.int64)
+        self.sector_special = np.asarray(sectors.col('special', 0), dtype=np.int64)
+
+    def bounds(self) -> tuple[float, float, float, float]:
+        if not self.vx.size:
+            return 0.0, 0.0, 0.0, 0.0
+        return float(self.vx.min()), float(self.vy.min()), float(self.vx.max()), float(self.vy.max())
+
+    def sector_raster(self, grid: Grid):
+        """(H, W) sector index per pixel centre, VOID outside the map."""
+        ax, ay = self.vx[self.v1], self.vy[self.v1]
+        bx, by = self.vx[self.v2], self.vy[self.v2]
+        s = grid.scale
+        lo = np.minimum(ay, by)
+        hi = np.maximum(ay, by)
+        # Rows whose centre y = y1 - (r + 0.5) * s lies in [lo, hi).
+        r_first = np.floor((grid.y1 - hi) / s - 0.5).astype(np.int64) + 1
+        r_last = np.floor((grid.y1 - lo) / s - 0.5).astype(np.int64)
+        counts = np.where(hi > lo, np.maximum(r_last - r_first + 1, 0), 0)
+        line = np.repeat(np.arange(len(counts)), counts)
+        starts = np.cumsum(counts) - counts
+        rows = r_first[line] + (np.arange(line.size) - starts[line])
+        yc = grid.y1 - (rows + 0.5) * s
+        xs = ax[line] + (yc - ay[line]) * (bx[line] - ax[line]) / (by[line] - ay[line])
+        # The front (right-hand) side faces +x on lines drawn upwards.
+        after = np.where(by[line] > ay[line], self.front_sector[line], self.back_sector[line])
+
+        order = np.lexsort((xs, rows))
+        rows, xs, after = rows[order], xs[order], after[order]
+        cols = np.clip(np.ceil((xs - grid.x0) / s - 0.5).astype(np.int64), 0, grid.width)
+        keep = (rows >= 0) & (rows < grid.height)
+        events = np.full((grid.height, grid.width + 1), -1, dtype=np.int64)
+        # Crossing ids grow with x along a row, so the running maximum is the
+        # last crossing to the left of each pixel.
+        np.maximum.at(events, (rows[keep], cols[keep]), np.flatnonzero(keep))
+        np.maximum.accumulate(events, axis=1, out=events)
+        lookup = np.append(after, VOID)
+        return lookup[events[:, :grid.width]]
+
+    def line_rasters(self, grid: Grid):
+        """(walls, line_special) (H, W) arrays from sampling every linedef at half a pixel."""
+        ax, ay = self.vx[self.v1], self.vy[self.v1]
+        bx, by = self.vx[self.v2], self.vy[self.v2]
+        step = grid.scale / 2.0
+        counts = np.ceil(np.hypot(bx - ax, by - ay) / step).astype(np.int64) + 1
+        line = np.repeat(np.arange(len(counts)), counts)
+        starts = np.cumsum(counts) - counts
+        t = (np.arange(line.size) - starts[line]) / np.maximum(counts[line] - 1, 1)
+        px = ax[line] + (bx[line] - ax[line]) * t
+        py = ay[line] + (by[line] - ay[line]) * t
+        cols = np.floor((px - grid.x0) / grid.scale).astype(np.int64)
+        rows = np.floor((grid.y1 - py) / grid.scale).astype(np.int64)
+        ok = (rows >= 0) & (rows < grid.height) & (cols >= 0) & (cols < grid.width)
+        rows, cols, line = rows[ok], cols[ok], line[ok]
+        walls = np.zeros((grid.height, grid.width), dtype=np.int64)
+        specials = np.zeros((grid.height, grid.width), dtype=np.int64)
+        np.maximum.at(walls, (rows, cols), np.where(self.back[line] < 0, 2, 1))
+        np.maximum.at(specials, (rows, cols), self.line_special[line])
+        return walls, specials
+
+    def channels(self, grid: Grid) -> dict[str, object]:
+        sector = self.sector_raster(grid)
+        inside = sector != VOID
+        idx = np.where(inside, sector, 0)
+
+        def per_sector(values):
+            return np.where(inside, values[idx], 0) if values.size else np.zeros(sector.shape, dtype=np.int64)
+
+        walls, line_special = self.line_rasters(grid)
+        return {
+            'sector': inside,
+            'floor': per_sector(self.floor),
+            'ceiling': per_sector(self.ceiling),
+            'sector_special': per_sector(self.sector_special),
+            'walls': walls,
+            'line_special': line_special,
+        }
+
+
+@dataclass(frozen=True)
+class Region:
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    pixels: int
+    channels: tuple[str, ...]
+    max_floor_delta: int
+
+    def describe(self) -> str:
+        text = (f"({self.x0}, {self.y0})..({self.x1}, {self.y1})  {self.x1 - self.x0}x{self.y1 - self.y0}  "
+                f"{self.pixels} px  {', '.join(self.channels)}")
+        if self.max_floor_delta:
+            text += f"  |dfloor| <= {self.max_floor_delta}"
+        return text
+
+
+def _regions(grid: Grid, diffs: dict[str, object], changed, floor_delta, merge: int) -> list[Region]:
+    """Bounding boxes of 8-connected groups of changed `merge` x `merge` pixel tiles."""
+    th = -(-grid.height // merge)
+    tw = -(-grid.width // merge)
+    padded = np.zeros((th * merge, tw * merge), dtype=bool)
+    padded[:grid.height, :grid.width] = changed
+    tiles = padded.reshape(th, merge, tw, merge).any(axis=(1, 3))
+
+    todo = set(zip(*(a.tolist() for a in np.nonzero(tiles))))
+    out: list[Region] = []
+    while todo:
+        stack = [todo.pop()]
+        r0 = r1 = stack[0][0]
+        c0 = c1 = stack[0][1]
+        while stack:
+            r, c = stack.pop()
+            r0, r1, c0, c1 = min(r0, r), max(r1, r), min(c0, c), max(c1, c)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    nb = (r + dr, c + dc)
+                    if nb in todo:
+                        todo.remove(nb)
+                        stack.append(nb)
+        pr0, pr1 = r0 * merge, min(grid.height, (r1 + 1) * merge)
+        pc0, pc1 = c0 * merge, min(grid.width, (c1 + 1) * merge)
+        window = changed[pr0:pr1, pc0:pc1]
+        names = tuple(ch for ch in CHANNELS if diffs[ch][pr0:pr1, pc0:pc1].any())
+        out.append(Region(
+            *grid.to_world(pc0, pr0, pc1 - 1, pr1 - 1),
+            pixels=int(np.count_nonzero(window)),
+            channels=names,
+            max_floor_delta=int(floor_delta[pr0:pr1, pc0:pc1].max(initial=0)),
+        ))
+    out.sort(key=lambda reg: (-reg.pixels, reg.y0, reg.x0))
+    return out
+
+
+def heat_map(grid: Grid, new: dict[str, object], diffs: dict[str, object], floor_delta, regions: list[Region]):
+    """(H, W, 3) uint8: dim grey new map, changed pixels coloured by channel, region boxes."""
+    img = np.zeros((grid.height, grid.width, 3), dtype=np.uint8)
+    img[:] = (16, 16, 20)
+    floors = new['floor']
+    inside = new['sector']
+    if inside.any():
+        lo, hi = floors[inside].min(), floors[inside].max()
+        shade = 40 + (30 * (floors - lo) / max(1, hi - lo)).astype(np.int64)
+        img[inside] = np.repeat(shade[inside][:, None], 3, axis=1).astype(np.uint8)
+    img[new['walls'] > 0] = (96, 96, 104)
+
+    # Floor/ceiling changes get brighter with the height difference.
+    strength = 0.45 + 0.55 * np.clip(floor_delta / max(1, int(floor_delta.max(initial=0))), 0, 1)
+    for name in _PAINT_ORDER:
+        mask = diffs[name]
+        color = np.asarray(CHANNEL_COLORS[name], dtype=np.float64)
+        if name in ('floor', 'ceiling'):
+            img[mask] = (color[None, :] * strength[mask][:, None]).astype(np.uint8)
+        else:
+            img[mask] = color.astype(np.uint8)
+
+    for reg in regions:
+        c0 = int((reg.x0 - grid.x0) / grid.scale)
+        c1 = min(grid.width - 1, int((reg.x1 - grid.x0) / grid.scale) - 1)
+        r0 = int((grid.y1 - reg.y1) / grid.scale)
+        r1 = min(grid.height - 1, int((grid.y1 - reg.y0) / grid.scale) - 1)
+        box = (255, 255, 0)
+        img[r0, c0:c1 + 1] = box
+        img[r1, c0:c1 + 1] = box
+        img[r0:r1 + 1, c0] = box
+        img[r0:r1 + 1, c1] = box
+    return img
+
+
+def diff_maps(old: MapGeometry, new: MapGeometry, *, scale: float = 8.0, margin: float = 64.0, merge: int = 4):
+    """Rasterize both maps on one grid; returns (grid, new channels, per-channel diffs, floor delta, regions)."""
+    grid = Grid.covering([old.bounds(), new.bounds()], scale, margin)
+    a = old.channels(grid)
+    b = new.channels(grid)
+    diffs = {name: a[name] != b[name] for name in CHANNELS}
+    changed = np.logical_or.reduce([diffs[name] for name in CHANNELS])
+    floor_delta = np.abs(a['floor'] - b['floor'])
+    regions = _regions(grid, diffs, changed, floor_delta, max(1, int(merge)))
+    return grid, b, diffs, floor_delta, regions
+
+
+def _write_png(path: str, img) -> None:
+    if GENERATOR_DIR not in sys.path:
+        sys.path.append(GENERATOR_DIR)
+    from layout_preview import write_png
+
+    write_png(path, img)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('old', help='reference WAD')
+    parser.add_argument('new', help='WAD to compare against it')
+    parser.add_argument('--map', default=None, help='UDMF map name (default: first map in each WAD)')
+    parser.add_argument('--scale', type=float, default=8.0, help='map units per pixel (default 8)')
+    parser.add_argument('--merge', type=int, default=4,
+                        help='changed pixels within this many pixels join one region (default 4)')
+    parser.add_argument('--out', default=os.path.join(REPO, 'build', 'map_diff'),
+                        help='output prefix for .png and .json (default build/map_diff)')
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("map_diff needs NumPy (pip install numpy).")
+        return 2
+
+    start = time.perf_counter()
+    try:
+        old = MapGeometry(args.old, args.map)
+        new = MapGeometry(args.new, args.map)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(e)
+        return 2
+    grid, channels, diffs, floor_delta, regions = diff_maps(old, new, scale=args.scale, merge=args.merge)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    _write_png(args.out + '.png', heat_map(grid, channels, diffs, floor_delta, regions))
+    report = {
+        'old': os.path.abspath(args.old),
+        'new': os.path.abspath(args.new),
+        'map': new.map_name,
+        'scale': grid.scale,
+        'grid': [grid.width, grid.height],
+        'changed_pixels': {name: int(np.count_nonzero(diffs[name])) for name in CHANNELS},
+        'regions': [
+            {'x0': r.x0, 'y0': r.y0, 'x1': r.x1, 'y1': r.y1, 'pixels': r.pixels,
+             'channels': list(r.channels), 'max_floor_delta': r.max_floor_delta}
+            for r in regions
+        ],
+    }
+    with open(args.out + '.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+    print(f"{old.map_name}: {args.old} -> {args.new}")
+    print(f"grid {grid.width}x{grid.height} px at {grid.scale:g} units/px, {time.perf_counter() - start:.2f}s")
+    if not regions:
+        print("no geometry differences")
+        return 0
+    counts = ', '.join(f"{name} {n}" for name, n in report['changed_pixels'].items() if n)
+    print(f"changed pixels: {counts}")
+    print(f"{len(regions)} changed region(s):")
+    for reg in regions:
+        print(f"  {reg.describe()}")
+    print(f"wrote {args.out}.png and {args.out}.json")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
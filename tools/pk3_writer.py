@@ -0,0 +1,173 @@
+"""Deterministic PK3 (zip) writer for `build/hostel_defs.pk3`.
+
+Replaces the staging copy + PowerShell `Compress-Archive` step. Sources are
+read straight from `src/` and written with:
+
+- entries sorted by archive name, a fixed 1980-01-01 timestamp and fixed
+  attributes, so the same inputs always give the same bytes;
+- compressed data reused from the previous PK3 for every entry whose CRC
+  and size are unchanged (no recompression, and stable across zlib versions);
+- a temp file + `os.replace()`, retried briefly while the engine still has
+  the old PK3 open on Windows.
+
+Usage:
+    python tools/pk3_writer.py [out.pk3]    # defaults to build/hostel_defs.pk3
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import sys
+import time
+import zlib
+import zipfile
+from dataclasses import dataclass
+from typing import Optional
+
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFS_PK3 = 'build/hostel_defs.pk3'
+
+# Source -> path inside the PK3 (see compile_py_map.bat).
+DEFS_FILES = {
+    'src/decorate/decorate.txt': 'decorate.txt',
+    'src/decorate/player.txt': 'decorate/player.txt',
+    'src/mapinfo.txt': 'mapinfo.txt',
+    'src/mapinfo/mapinfo.txt': 'mapinfo/mapinfo.txt',
+    'src/acs/h9_intro.acs': 'acs/h9_intro.acs',
+}
+# acc writes the compiled intro script here; it is packed when present. The
+# PK3 is zipped straight from the sources above, so this is the only file
+# left in the old staging directory.
+ACS_OBJ = 'build/_defs_pk3/acs/h9_intro.o'
+
+# DOS date/time of 1980-01-01 00:00, the earliest a zip can express.
+_DOS_DATE = (0 << 9) | (1 << 5) | 1
+_DOS_TIME = 0
+_VERSION = 20
+_EXTERNAL_ATTR = 0o100644 << 16
+_CREATE_SYSTEM = 3  # unix, so the attributes above mean the same everywhere
+_REPLACE_RETRIES = 10
+
+
+@dataclass(frozen=True)
+class Pk3Stats:
+    entries: int
+    reused: int
+    size: int
+
+    def summary(self) -> str:
+        return f"PK3 {self.size} bytes, {self.entries} entries ({self.reused} reused)"
+
+
+def _path(rel: str) -> str:
+    return os.path.join(REPO, *rel.split('/'))
+
+
+def defs_entries() -> dict[str, str]:
+    """Archive name -> absolute source path for the defs PK3."""
+    entries = {arcname: _path(src) for src, arcname in DEFS_FILES.items()}
+    if os.path.isfile(_path(ACS_OBJ)):
+        entries['acs/h9_intro.o'] = _path(ACS_OBJ)
+    return entries
+
+
+def _previous_entries(path: str) -> dict[str, tuple[int, int, int, bytes]]:
+    """Archive name -> (crc, size, compress_type, raw compressed bytes) from an existing zip."""
+    out: dict[str, tuple[int, int, int, bytes]] = {}
+    try:
+        with open(path, 'rb') as f, zipfile.ZipFile(f) as zf:
+            for info in zf.infolist():
+                # Only entries this writer produced: reusing another tool's
+                # compression would make the output depend on history.
+                if info.date_time != (1980, 1, 1, 0, 0, 0) or info.create_system != _CREATE_SYSTEM:
+                    continue
+                if info.flag_bits & 0x1 or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                    continue
+                f.seek(info.header_offset)
+                header = f.read(30)
+                if len(header) != 30 or header[:4] != b'PK\x03\x04':
+                    continue
+                name_len, extra_len = struct.unpack('<HH', header[26:30])
+                f.seek(info.header_offset + 30 + name_len + extra_len)
+                out[info.filename] = (info.CRC, info.file_size, info.compress_type, f.read(info.compress_size))
+    except (OSError, zipfile.BadZipFile):
+        return {}
+    return out
+
+
+def _compress(data: bytes) -> tuple[int, bytes]:
+    comp = zlib.compressobj(9, zlib.DEFLATED, -15)
+    packed = comp.compress(data) + comp.flush()
+    if len(packed) >= len(data):
+        return zipfile.ZIP_STORED, data
+    return zipfile.ZIP_DEFLATED, packed
+
+
+def pk3_bytes(entries: dict[str, str], previous: Optional[str] = None) -> tuple[bytes, Pk3Stats]:
+    """Zip `entries` (archive name -> source path) deterministically."""
+    reusable = _previous_entries(previous) if previous else {}
+    local = bytearray()
+    central = bytearray()
+    reused = 0
+    for arcname in sorted(entries):
+        with open(entries[arcname], 'rb') as f:
+            data = f.read()
+        crc = zlib.crc32(data) & 0xFFFFFFFF
+        old = reusable.get(arcname)
+        if old is not None and old[0] == crc and old[1] == len(data):
+            method, packed = old[2], old[3]
+            reused += 1
+        else:
+            method, packed = _compress(data)
+        name = arcname.encode('utf-8')
+        flags = 0x800 if not name.isascii() else 0
+        fields = (_VERSION, flags, method, _DOS_TIME, _DOS_DATE, crc, len(packed), len(data), len(name))
+        offset = len(local)
+        local += struct.pack('<4s5HIIIHH', b'PK\x03\x04', *fields, 0) + name + packed
+        central += struct.pack(
+            '<4sBB5HIII5HII', b'PK\x01\x02', _VERSION, _CREATE_SYSTEM, *fields, 0, 0, 0, 0,
+            _EXTERNAL_ATTR, offset,
+        ) + name
+    end = struct.pack('<4s4HIIH', b'PK\x05\x06', 0, 0, len(entries), len(entries), len(central), len(local), 0)
+    data = bytes(local + central + end)
+    return data, Pk3Stats(len(entries), reused, len(data))
+
+
+def write_pk3(out_path: str, entries: dict[str, str]) -> Pk3Stats:
+    """Write `entries` to `out_path` atomically, reusing unchanged entries of the old file."""
+    data, stats = pk3_bytes(entries, previous=out_path if os.path.isfile(out_path) else None)
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    try:
+        with open(out_path, 'rb') as f:
+            if f.read() == data:
+                return stats
+    except OSError:
+        pass
+    tmp = out_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    for attempt in range(_REPLACE_RETRIES):
+        try:
+            os.replace(tmp, out_path)
+            return stats
+        except PermissionError:
+            # Windows: the engine may still be closing and holding the old PK3.
+            if attempt == _REPLACE_RETRIES - 1:
+                os.remove(tmp)
+                raise
+            time.sleep(1)
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    out = os.path.abspath(argv[0]) if argv else _path(DEFS_PK3)
+    stats = write_pk3(out, defs_entries())
+    print(f"{stats.summary()} -> {out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
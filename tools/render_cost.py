@@ -0,0 +1,312 @@
+"""Offline render-cost estimate for a built map: where will the frame rate drop?
+
+Viewpoints are sampled on a grid (`--spacing`) inside every walkable sector
+on every floor (the upper floors are separate areas of the same 2D map).
+From each one, `--rays` rays are cast over the 2D geometry with NumPy (each
+line is only intersected with the rays inside the angle it subtends), and
+each ray stops at the first opaque line. Opaque means one-sided, closed (no gap between the higher floor and
+the lower ceiling, e.g. a shut door) or a line portal. Per viewpoint this
+estimates:
+
+- `lines`: linedefs hit before the ray was blocked
+- `sectors`: sectors on either side of those lines
+- `floors3d`: 3D floors (Sector_Set3dFloor) in those sectors; facade
+  windows carry several filler bands each
+- `portals`: line portals in view, each of which renders another view
+
+`cost` combines them with the rough relative weights in `COST_WEIGHTS`. It is
+a proxy for comparing areas and builds, not a frame time. What is behind a
+portal is not followed.
+
+Writes a heat map of `cost` (or `--metric`) over the map to `<out>.png` and
+the top-N hotspots (neighbours within `--spread` units suppressed) to stdout
+and `<out>.json`. `--max-cost N` makes the exit status 1 when any viewpoint
+costs more than N, for catching regressions before a playtest.
+
+Usage:
+    python tools/render_cost.py [WAD] [--spacing 128] [--rays 180] [--top 15] [--out build/render_cost]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from map_diff import VOID, Grid, MapGeometry, _write_png, np
+
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_WAD = os.path.join(REPO, 'build', 'py_hostel_full_raw.wad')
+
+SECTOR_SET_3D_FLOOR = 160
+PORTAL_SPECIALS = frozenset({156, 301})  # Line_SetPortal, Line_QuickPortal
+
+METRICS = ('cost', 'lines', 'sectors', 'floors3d', 'portals')
+# Relative weights for `cost`: a 3D floor adds planes and side walls to every
+# sector it is in; a portal renders a second view.
+COST_WEIGHTS = {'lines': 1.0, 'sectors': 2.0, 'floors3d': 6.0, 'portals': 40.0}
+
+# Heat-map stops from cheap to expensive.
+_RAMP = np.asarray([(20, 30, 120), (0, 160, 200), (60, 200, 60), (250, 220, 0), (255, 40, 0)], dtype=np.float64) if np else None
+
+
+@dataclass(frozen=True)
+class Viewpoint:
+    x: float
+    y: float
+    sector: int
+    floor: int
+    lines: int
+    sectors: int
+    floors3d: int
+    portals: int
+    cost: float
+
+
+class RenderModel:
+    """Per-line and per-sector facts the ray caster needs."""
+
+    def __init__(self, geo: MapGeometry) -> None:
+        self.geo = geo
+        lines = geo.tables.linedefs
+        sectors = geo.tables.sectors
+        n_sec = len(geo.floor)
+        self.ax, self.ay = geo.vx[geo.v1], geo.vy[geo.v1]
+        self.bx, self.by = geo.vx[geo.v2], geo.vy[geo.v2]
+
+        # Sector tags: `id` plus the space-separated `moreids`.
+        by_tag: dict[int, list[int]] = {}
+        for s, (sid, more) in enumerate(zip(sectors.col('id', 0), sectors.col('moreids', ''))):
+            tags = [int(sid)] if sid else []
+            tags += [int(t) for t in str(more).split() if t.lstrip('-').isdigit()]
+            for tag in tags:
+                by_tag.setdefault(tag, []).append(s)
+
+        self.floors3d = np.zeros(n_sec, dtype=np.int64)
+        control = np.zeros(n_sec, dtype=bool)
+        arg0 = lines.col('arg0', 0)
+        for i in np.flatnonzero(geo.line_special == SECTOR_SET_3D_FLOOR).tolist():
+            for s in by_tag.get(int(arg0[i]), ()):
+                self.floors3d[s] += 1
+            if geo.front_sector[i] != VOID:
+                control[geo.front_sector[i]] = True
+
+        front, back = geo.front_sector, geo.back_sector
+        two_sided = (front != VOID) & (back != VOID)
+        f = np.where(front != VOID, front, 0)
+        b = np.where(back != VOID, back, 0)
+        gap = np.minimum(geo.ceiling[f], geo.ceiling[b]) - np.maximum(geo.floor[f], geo.floor[b])
+        self.portal = np.isin(geo.line_special, list(PORTAL_SPECIALS))
+        self.opaque = ~two_sided | (gap <= 0) | self.portal
+        # Viewpoints go in open sectors that are not 3D-floor control sectors.
+        self.walkable = (geo.ceiling > geo.floor) & ~control
+
+    def cast(self, x: float, y: float, rays: int, max_dist: float):
+        """Indices of the lines visible from (x, y) along `rays` evenly spaced rays.
+
+        A line can only meet the rays inside the angle it subtends, so each
+        line is expanded into just those (ray, line) pairs, and the caster
+        never builds a full rays x lines matrix.
+        """
+        ax, ay, bx, by = self.ax, self.ay, self.bx, self.by
+        near = ((np.minimum(ax, bx) - x < max_dist) & (x - np.maximum(ax, bx) < max_dist)
+                & (np.minimum(ay, by) - y < max_dist) & (y - np.maximum(ay, by) < max_dist))
+        idx = np.flatnonzero(near)
+        wx, wy = ax[idx] - x, ay[idx] - y
+        ex, ey = bx[idx] - ax[idx], by[idx] - ay[idx]
+        step = 2.0 * np.pi / rays
+        a1 = np.arctan2(wy, wx)
+        sweep = np.arctan2(wy + ey, wx + ex) - a1
+        sweep = (sweep + np.pi) % (2.0 * np.pi) - np.pi
+        lo = np.minimum(a1, a1 + sweep)
+        first = np.ceil(lo / step).astype(np.int64)
+        counts = np.maximum(np.floor((lo + np.abs(sweep)) / step).astype(np.int64) - first + 1, 0)
+
+        pair_line = np.repeat(np.arange(idx.size), counts)
+        starts = np.cumsum(counts) - counts
+        ray = (first[pair_line] + np.arange(pair_line.size) - starts[pair_line]) % rays
+        theta = ray * step
+        dx, dy = np.cos(theta), np.sin(theta)
+        ex_p, ey_p = ex[pair_line], ey[pair_line]
+        denom = dx * ey_p - dy * ex_p
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (wx[pair_line] * ey_p - wy[pair_line] * ex_p) / denom
+        t = np.where((denom != 0) & (t > 0) & (t <= max_dist), t, np.inf)
+
+        blocked = np.full(rays, np.inf)
+        opaque = self.opaque[idx][pair_line]
+        np.minimum.at(blocked, ray[opaque], t[opaque])
+        seen = np.isfinite(t) & (t <= blocked[ray])
+        return idx[np.unique(pair_line[seen])]
+
+
+def sample_viewpoints(model: RenderModel, spacing: float):
+    """(x, y, sector) arrays: grid-cell centres that fall inside walkable sectors."""
+    # Offset the centres off the 8-unit grid the geometry is drawn on, so no
+    # viewpoint sits exactly on a line.
+    grid = Grid.covering([model.geo.bounds()], spacing, spacing / 2.0 + 5.0)
+    sectors = model.geo.sector_raster(grid)
+    rows, cols = np.nonzero(sectors != VOID)
+    sec = sectors[rows, cols]
+    keep = model.walkable[sec]
+    xs = grid.x0 + (cols[keep] + 0.5) * spacing
+    ys = grid.y1 - (rows[keep] + 0.5) * spacing
+    return xs, ys, sec[keep]
+
+
+def analyze(geo: MapGeometry, *, spacing: float = 128.0, rays: int = 180, max_dist: float = 8192.0) -> list[Viewpoint]:
+    model = RenderModel(geo)
+    xs, ys, secs = sample_viewpoints(model, spacing)
+    front, back = geo.front_sector, geo.back_sector
+    out = []
+    for x, y, sec in zip(xs.tolist(), ys.tolist(), secs.tolist()):
+        seen = model.cast(x, y, int(rays), max_dist)
+        visible = np.union1d(front[seen], back[seen])
+        visible = np.union1d(visible[visible != VOID], [sec])
+        metrics = {
+            'lines': int(seen.size),
+            'sectors': int(visible.size),
+            'floors3d': int(model.floors3d[visible].sum()),
+            'portals': int(np.count_nonzero(model.portal[seen])),
+        }
+        cost = sum(COST_WEIGHTS[k] * v for k, v in metrics.items())
+        out.append(Viewpoint(x, y, int(sec), int(geo.floor[sec]), cost=float(cost), **metrics))
+    return out
+
+
+def hotspots(points: list[Viewpoint], top: int, spread: float, metric: str = 'cost') -> list[Viewpoint]:
+    """The `top` most expensive viewpoints, skipping any within `spread` of one already picked."""
+    picked: list[Viewpoint] = []
+    for vp in sorted(points, key=lambda p: -getattr(p, metric)):
+        if len(picked) >= top:
+            break
+        if all((vp.x - p.x) ** 2 + (vp.y - p.y) ** 2 > spread * spread for p in picked):
+            picked.append(vp)
+    return picked
+
+
+def _ramp(values):
+    """Map 0..1 to RGB along `_RAMP`."""
+    pos = np.clip(values, 0.0, 1.0) * (len(_RAMP) - 1)
+    lo = np.minimum(pos.astype(np.int64), len(_RAMP) - 2)
+    frac = (pos - lo)[:, None]
+    return (_RAMP[lo] * (1 - frac) + _RAMP[lo + 1] * frac).astype(np.uint8)
+
+
+def heat_map(geo: MapGeometry, points: list[Viewpoint], spacing: float, metric: str, scale: float,
+             marks: list[Viewpoint]):
+    """(H, W, 3) uint8: each viewpoint's cell coloured by `metric`, walls on top, hotspots boxed."""
+    grid = Grid.covering([geo.bounds()], scale, 64.0)
+    img = np.zeros((grid.height, grid.width, 3), dtype=np.uint8)
+    img[:] = (16, 16, 20)
+    sector = geo.sector_raster(grid)
+    img[sector != VOID] = (40, 40, 44)
+    if points:
+        values = np.asarray([getattr(p, metric) for p in points], dtype=np.float64)
+        colors = _ramp(values / max(values.max(), 1e-9))
+        half = spacing / 2.0
+        xs = np.asarray([p.x for p in points])
+        ys = np.asarray([p.y for p in points])
+        c0 = np.floor((xs - half - grid.x0) / scale).astype(np.int64)
+        r0 = np.floor((grid.y1 - (ys + half)) / scale).astype(np.int64)
+        size = max(1, int(round(spacing / scale)))
+        off = np.arange(size)
+        rr = np.clip(r0[:, None, None] + off[None, :, None], 0, grid.height - 1)
+        cc = np.clip(c0[:, None, None] + off[None, None, :], 0, grid.width - 1)
+        rr, cc = np.broadcast_arrays(rr, cc)
+        inside = sector[rr, cc] != VOID
+        img[rr[inside], cc[inside]] = np.broadcast_to(colors[:, None, None, :], rr.shape + (3,))[inside]
+    walls, _ = geo.line_rasters(grid)
+    img[walls == 2] = (200, 200, 200)
+    for vp in marks:
+        c = int((vp.x - grid.x0) / scale)
+        r = int((grid.y1 - vp.y) / scale)
+        r0, r1 = max(0, r - 6), min(grid.height - 1, r + 6)
+        c0, c1 = max(0, c - 6), min(grid.width - 1, c + 6)
+        img[r0, c0:c1 + 1] = img[r1, c0:c1 + 1] = (255, 255, 255)
+        img[r0:r1 + 1, c0] = img[r0:r1 + 1, c1] = (255, 255, 255)
+    return img
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('wad', nargs='?', default=DEFAULT_WAD, help='map WAD (default build/py_hostel_full_raw.wad)')
+    parser.add_argument('--map', default=None, help='UDMF map name (default: first map)')
+    parser.add_argument('--spacing', type=float, default=128.0, help='viewpoint grid spacing in map units (default 128)')
+    parser.add_argument('--rays', type=int, default=180, help='rays per viewpoint (default 180)')
+    parser.add_argument('--max-dist', type=float, default=8192.0, help='ray length in map units (default 8192)')
+    parser.add_argument('--metric', choices=METRICS, default='cost', help='heat-map and ranking metric (default cost)')
+    parser.add_argument('--top', type=int, default=15, help='hotspots to list (default 15)')
+    parser.add_argument('--spread', type=float, default=512.0, help='min distance between listed hotspots (default 512)')
+    parser.add_argument('--scale', type=float, default=16.0, help='heat-map units per pixel (default 16)')
+    parser.add_argument('--max-cost', type=float, default=None, help='exit 1 if any viewpoint costs more than this')
+    parser.add_argument('--out', default=os.path.join(REPO, 'build', 'render_cost'),
+                        help='output prefix for .png and .json (default build/render_cost)')
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("render_cost needs NumPy (pip install numpy).")
+        return 2
+
+    start = time.perf_counter()
+    try:
+        geo = MapGeometry(args.wad, args.map)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(e)
+        return 2
+    points = analyze(geo, spacing=args.spacing, rays=args.rays, max_dist=args.max_dist)
+    top = hotspots(points, args.top, args.spread, args.metric)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    _write_png(args.out + '.png', heat_map(geo, points, args.spacing, args.metric, args.scale, top))
+
+    floors: dict[int, list[Viewpoint]] = {}
+    for vp in points:
+        floors.setdefault(vp.floor, []).append(vp)
+    summary = {
+        str(z): {'viewpoints': len(vps), 'max_cost': max(v.cost for v in vps),
+                 'mean_cost': round(sum(v.cost for v in vps) / len(vps), 1)}
+        for z, vps in sorted(floors.items())
+    }
+    report = {
+        'wad': os.path.abspath(args.wad),
+        'map': geo.map_name,
+        'spacing': args.spacing,
+        'rays': args.rays,
+        'weights': COST_WEIGHTS,
+        'floors': summary,
+        'hotspots': [asdict(vp) for vp in top],
+    }
+    with open(args.out + '.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+    print(f"{geo.map_name}: {len(points)} viewpoints x {args.rays} rays in {elapsed:.1f}s")
+    for z, row in summary.items():
+        if row['viewpoints'] >= 8:
+            print(f"  floor z={z:>4}: {row['viewpoints']:5d} viewpoints, cost mean {row['mean_cost']:7.1f}, max {row['max_cost']:7.1f}")
+    print(f"top {len(top)} hotspots by {args.metric}:")
+    print(f"  {'x':>7} {'y':>7} {'z':>5} {'cost':>7} {'lines':>6} {'sectors':>7} {'3d':>4} {'portals':>7}  sector")
+    for vp in top:
+        print(f"  {vp.x:7.0f} {vp.y:7.0f} {vp.floor:5d} {vp.cost:7.1f} {vp.lines:6d} {vp.sectors:7d} "
+              f"{vp.floors3d:4d} {vp.portals:7d}  {vp.sector}")
+    print(f"wrote {args.out}.png and {args.out}.json")
+
+    if args.max_cost is not None:
+        over = [p for p in points if p.cost > args.max_cost]
+        if over:
+            worst = max(over, key=lambda p: p.cost)
+            print(f"FAIL {len(over)} viewpoint(s) over --max-cost {args.max_cost:g} "
+                  f"(worst {worst.cost:.1f} at {worst.x:.0f},{worst.y:.0f})")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
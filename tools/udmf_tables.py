@@ -0,0 +1,207 @@
+"""Single-pass UDMF TEXTMAP parser producing columnar tables.
+
+Shared by the `tools/debug_*` scripts. One regex-driven scan walks the TEXTMAP
+once and collects every block's fields; each block type (vertex, linedef,
+sidedef, sector, thing) then becomes a `Table` of per-key columns.
+
+Handles the writers we see in practice:
+
+- textmap_writer (`sector{...}` one block per line), used for `build/py_hostel_full_raw.wad`
+- omgifol (`sector\\n{\\n...}`), used with `H9_COMPACT_TEXTMAP=0`
+- zdbsp (`sector // 12\\n{\\n...}`), used for `build/py_hostel_full.wad`
+
+Usage:
+
+    tables = parse_textmap(data)
+    floors = tables.sectors.col("texturefloor", "")
+    print(len(tables.linedefs), tables.namespace)
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Iterator, Optional, Union
+
+from wad_reader import WadReader
+
+
+# One token per match; leading whitespace and comments are skipped by the same
+# match so the scan never revisits input.
+_TOKEN_RE = re.compile(
+    r"""
+    (?:\s+|//[^\n]*|/\*.*?\*/)*
+    (?:
+        (?P<assign>(?P<key>[A-Za-z0-9_]+)\s*=\s*(?P<val>"(?:[^"\\]|\\.)*"|[^;"\s]+)\s*;)
+      | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<open>\{)
+      | (?P<close>\})
+      | (?P<end>\Z)
+    )
+    """,
+    re.S | re.X,
+)
+
+_ESCAPE_RE = re.compile(r"\\(.)", re.S)
+_HEX_RE = re.compile(r"[+-]?0[xX][0-9A-Fa-f]+\Z")
+_OCT_RE = re.compile(r"[+-]?0[0-7]+\Z")
+_DEC_RE = re.compile(r"[+-]?[0-9]+\Z")
+
+Value = Union[int, float, str, bool]
+
+# Block keyword -> `UdmfTables` attribute.
+BLOCK_TABLES = {
+    "vertex": "vertices",
+    "linedef": "linedefs",
+    "sidedef": "sidedefs",
+    "sector": "sectors",
+    "thing": "things",
+}
+
+
+def _convert(raw: str) -> Value:
+    if raw[0] == '"':
+        return _ESCAPE_RE.sub(r"\1", raw[1:-1])
+    low = raw.lower()
+    if low == "true":
+        return True
+    if low == "false":
+        return False
+    if _DEC_RE.match(raw):
+        return int(raw, 8) if _OCT_RE.match(raw) else int(raw)
+    if _HEX_RE.match(raw):
+        return int(raw, 16)
+    try:
+        return float(raw)
+    except ValueError:
+        # Bare keyword value (allowed by the UDMF grammar); keep it as text.
+        return raw
+
+
+class Table:
+    """Columnar view of one block type: `columns[key][i]` is block i's value (or None)."""
+
+    __slots__ = ("kind", "columns", "_rows")
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.columns: dict[str, list[Optional[Value]]] = {}
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.columns
+
+    def _append(self, fields: dict[str, Value]) -> None:
+        n = self._rows
+        columns = self.columns
+        for key, value in fields.items():
+            col = columns.get(key)
+            if col is None:
+                col = columns[key] = [None] * n
+            col.append(value)
+        n += 1
+        for col in columns.values():
+            if len(col) < n:
+                col.append(None)
+        self._rows = n
+
+    def col(self, key: str, default: Any = None) -> list[Any]:
+        """Column `key` with missing values replaced by `default`."""
+        col = self.columns.get(key)
+        if col is None:
+            return [default] * self._rows
+        if default is None:
+            return col
+        return [default if v is None else v for v in col]
+
+    def row(self, index: int) -> dict[str, Value]:
+        return {k: col[index] for k, col in self.columns.items() if col[index] is not None}
+
+    def rows(self) -> Iterator[dict[str, Value]]:
+        for i in range(self._rows):
+            yield self.row(i)
+
+
+class UdmfTables:
+    __slots__ = ("namespace", "vertices", "linedefs", "sidedefs", "sectors", "things", "other")
+
+    def __init__(self) -> None:
+        self.namespace: Optional[str] = None
+        self.vertices = Table("vertex")
+        self.linedefs = Table("linedef")
+        self.sidedefs = Table("sidedef")
+        self.sectors = Table("sector")
+        self.things = Table("thing")
+        # Non-standard block types, keyed by block name.
+        self.other: dict[str, Table] = {}
+
+    def table(self, kind: str) -> Table:
+        attr = BLOCK_TABLES.get(kind)
+        if attr is not None:
+            return getattr(self, attr)
+        t = self.other.get(kind)
+        if t is None:
+            t = self.other[kind] = Table(kind)
+        return t
+
+    def keys_present(self) -> set[str]:
+        """Every field name used by any block."""
+        out: set[str] = set()
+        for t in (self.vertices, self.linedefs, self.sidedefs, self.sectors, self.things, *self.other.values()):
+            out.update(t.columns)
+        return out
+
+
+def parse_textmap(data: Union[bytes, memoryview, str]) -> UdmfTables:
+    """Parse a TEXTMAP lump in one pass."""
+    text = data if isinstance(data, str) else str(data, "utf-8", errors="replace")
+
+    out = UdmfTables()
+    match = _TOKEN_RE.match
+    pos = 0
+    pending: Optional[str] = None
+    block: Optional[str] = None
+    fields: dict[str, Value] = {}
+
+    while True:
+        m = match(text, pos)
+        if m is None:
+            line = text.count("\n", 0, pos) + 1
+            raise ValueError(f"UDMF parse error at line {line}: {text[pos:pos + 40]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+
+        if kind == "assign":
+            value = _convert(m.group("val"))
+            if block is not None:
+                fields[m.group("key").lower()] = value
+            elif m.group("key").lower() == "namespace":
+                out.namespace = str(value)
+        elif kind == "ident":
+            pending = m.group("ident").lower()
+        elif kind == "open":
+            if block is not None or pending is None:
+                raise ValueError(f"UDMF parse error: unexpected '{{' at offset {m.start('open')}")
+            block = pending
+            pending = None
+            fields = {}
+        elif kind == "close":
+            if block is None:
+                raise ValueError(f"UDMF parse error: unexpected '}}' at offset {m.start('close')}")
+            out.table(block)._append(fields)
+            block = None
+        else:  # end
+            if block is not None:
+                raise ValueError("UDMF parse error: unterminated block at end of TEXTMAP")
+            return out
+
+
+def read_textmap(wad_path: str, map_name: Optional[str] = None) -> tuple[str, memoryview]:
+    """Return (map name, TEXTMAP view) for the first (or named) UDMF map in a WAD.
+
+    Only the WAD directory is parsed; the view maps the file directly.
+    """
+    with WadReader(wad_path) as wad:
+        return wad.textmap(map_name)
@@ -0,0 +1,219 @@
+"""Memory-mapped, lazy WAD reader for the `tools/` analysis scripts.
+
+`omg.WAD` reads and wraps every lump up front. The debug scripts usually want
+one map's TEXTMAP or the `TX_START` namespace, so this reader only parses the
+header and directory; lumps are handed out as zero-copy `memoryview`s over an
+`mmap` of the file and decoded only when a tool asks for them.
+
+Usage:
+
+    with WadReader("build/py_hostel_full_raw.wad") as wad:
+        print(wad.udmf_maps())
+        name, textmap = wad.textmap()
+        print("PLUTOSGN" in wad.namespace("TX"))
+
+Lump views stay valid until `close()`; release (or copy) them before closing
+if you need the file unmapped promptly.
+"""
+
+from __future__ import annotations
+
+import mmap
+import struct
+from typing import Iterator, NamedTuple, Optional, Union
+
+
+_HEADER = struct.Struct("<4sii")
+_ENTRY = struct.Struct("<ii8s")
+
+# Classic map lumps in directory order (first two are enough to detect a map,
+# matching omgifol's HeaderGroup heuristic).
+CLASSIC_MAP_LUMPS = (
+    "THINGS",
+    "LINEDEFS",
+    "SIDEDEFS",
+    "VERTEXES",
+    "SEGS",
+    "SSECTORS",
+    "NODES",
+    "SECTORS",
+    "REJECT",
+    "BLOCKMAP",
+    "BEHAVIOR",
+    "SCRIPTS",
+)
+
+
+class LumpEntry(NamedTuple):
+    index: int
+    name: str
+    offset: int
+    size: int
+
+
+class WadReader:
+    """Read-only view of a WAD: directory parsed eagerly, lump data on demand."""
+
+    __slots__ = ("path", "kind", "entries", "_mm", "_by_name")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            # mmap keeps its own handle; the file object can close right away.
+            self._mm: Optional[mmap.mmap] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+
+        if len(mm) < _HEADER.size:
+            raise ValueError(f"Not a WAD (too short): {path}")
+        magic, numlumps, dir_offset = _HEADER.unpack_from(mm, 0)
+        if magic not in (b"IWAD", b"PWAD"):
+            raise ValueError(f"Not a WAD (bad magic {magic!r}): {path}")
+        if numlumps < 0 or dir_offset < 0 or dir_offset + numlumps * _ENTRY.size > len(mm):
+            raise ValueError(f"Corrupt WAD directory: {path}")
+        self.kind = magic.decode("ascii")
+
+        self.entries: list[LumpEntry] = []
+        # First index of each lump name (later duplicates are reachable via find()).
+        self._by_name: dict[str, int] = {}
+        view = memoryview(mm)[dir_offset : dir_offset + numlumps * _ENTRY.size]
+        try:
+            for i, (offset, size, raw_name) in enumerate(_ENTRY.iter_unpack(view)):
+                name = raw_name.split(b"\0", 1)[0].decode("ascii", errors="replace").upper()
+                self.entries.append(LumpEntry(i, name, offset, size))
+                self._by_name.setdefault(name, i)
+        finally:
+            view.release()
+
+    # --- Lifetime ---
+
+    def close(self) -> None:
+        mm, self._mm = self._mm, None
+        if mm is None:
+            return
+        try:
+            mm.close()
+        except BufferError:
+            # A caller still holds a lump view; the map is released with it.
+            pass
+
+    def __enter__(self) -> "WadReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # --- Directory ---
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[LumpEntry]:
+        return iter(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name.upper() in self._by_name
+
+    def find(self, name: str, start: int = 0) -> int:
+        """Index of the first lump called `name` at or after `start`, or -1."""
+        name = name.upper()
+        if start == 0:
+            return self._by_name.get(name, -1)
+        for e in self.entries[start:]:
+            if e.name == name:
+                return e.index
+        return -1
+
+    def entry(self, key: Union[str, int]) -> LumpEntry:
+        if isinstance(key, int):
+            return self.entries[key]
+        i = self.find(key)
+        if i < 0:
+            raise KeyError(f"lump {key!r} not found in {self.path}")
+        return self.entries[i]
+
+    # --- Lump data ---
+
+    def lump(self, key: Union[str, int, LumpEntry]) -> memoryview:
+        """Zero-copy view of a lump's bytes."""
+        if self._mm is None:
+            raise ValueError("WadReader is closed")
+        e = key if isinstance(key, LumpEntry) else self.entry(key)
+        if e.offset < 0 or e.size < 0 or e.offset + e.size > len(self._mm):
+            raise ValueError(f"lump {e.name} (#{e.index}) points outside {self.path}")
+        return memoryview(self._mm)[e.offset : e.offset + e.size]
+
+    def text(self, key: Union[str, int, LumpEntry], encoding: str = "utf-8") -> str:
+        """Decode a text lump (TEXTMAP, MAPINFO, ...)."""
+        view = self.lump(key)
+        try:
+            return str(view, encoding, errors="replace")
+        finally:
+            view.release()
+
+    # --- Structure ---
+
+    def namespace(self, prefix: str) -> dict[str, LumpEntry]:
+        """Non-empty lumps between `<prefix>_START` and `<prefix>_END` markers.
+
+        `namespace("TX")` is omgifol's `ztextures`; `"F"` also matches
+        `FF_START`/`F_END` pairs like omgifol's MarkerGroup.
+        """
+        prefix = prefix.upper()
+        out: dict[str, LumpEntry] = {}
+        end: Optional[str] = None
+        abs_end = prefix + "_END"
+        for e in self.entries:
+            if end is not None:
+                if e.name == end or e.name == abs_end:
+                    end = None
+                elif e.size:
+                    out[e.name] = e
+            elif e.name.startswith(prefix) and e.name.endswith("_START"):
+                end = e.name[: -len("START")] + "END"
+        return out
+
+    def maps(self) -> dict[str, dict[str, LumpEntry]]:
+        """Map marker -> {lump name: entry} for classic and UDMF maps."""
+        entries = self.entries
+        out: dict[str, dict[str, LumpEntry]] = {}
+        i = 0
+        n = len(entries)
+        while i < n - 1:
+            head = entries[i]
+            nxt = entries[i + 1].name
+            if nxt == "TEXTMAP":
+                lumps: dict[str, LumpEntry] = {}
+                j = i + 1
+                while j < n:
+                    lumps[entries[j].name] = entries[j]
+                    j += 1
+                    if entries[j - 1].name == "ENDMAP":
+                        break
+                out[head.name] = lumps
+                i = j
+            elif i < n - 2 and nxt == CLASSIC_MAP_LUMPS[0] and entries[i + 2].name == CLASSIC_MAP_LUMPS[1]:
+                lumps = {}
+                j = i + 1
+                while j < n and entries[j].name in CLASSIC_MAP_LUMPS:
+                    lumps[entries[j].name] = entries[j]
+                    j += 1
+                out[head.name] = lumps
+                i = j
+            else:
+                i += 1
+        return out
+
+    def udmf_maps(self) -> list[str]:
+        return [name for name, lumps in self.maps().items() if "TEXTMAP" in lumps]
+
+    def textmap(self, map_name: Optional[str] = None) -> tuple[str, memoryview]:
+        """(map name, TEXTMAP view) for the first (or named) UDMF map."""
+        maps = self.maps()
+        udmf = [name for name, lumps in maps.items() if "TEXTMAP" in lumps]
+        if not udmf:
+            raise RuntimeError(f"No UDMF maps found in: {self.path}")
+        name = (map_name or udmf[0]).upper()
+        lumps = maps.get(name)
+        if lumps is None or "TEXTMAP" not in lumps:
+            raise RuntimeError(f"UDMF map {name} is missing TEXTMAP in: {self.path}")
+        return name, self.lump(lumps["TEXTMAP"])